@@ -0,0 +1,11 @@
+"""Benchmarks for the synthetic home library.
+
+Each module can be run directly from the project root e.g.:
+
+```bash
+$ python -m benchmarks.registry_load
+```
+
+`benchmarks.suite` runs a benchmark of each stage of the home pipeline on a
+generated home and compares the results with a stored baseline.
+"""
@@ -0,0 +1,68 @@
+"""Benchmark for loading homes from a directory of files or an archive.
+
+Writes an inventory for each of the test homes many times over as a directory
+of yaml files and as a single archive, then compares the time to load a random
+selection of homes by id from each.
+"""
+
+import argparse
+import pathlib
+import random
+import tempfile
+import time
+
+from synthetic_home import archive, inventory, synthetic_home
+
+TEST_HOMES = pathlib.Path("tests/homes")
+
+
+def main() -> None:
+    """Run the archive load benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--copies", type=int, default=100)
+    parser.add_argument("--loads", type=int, default=500)
+    args = parser.parse_args()
+
+    inventories = [
+        (
+            f"{home_filename.stem}-{copy}",
+            synthetic_home.build_inventory(
+                synthetic_home.load_synthetic_home(home_filename)
+            ),
+        )
+        for home_filename in sorted(TEST_HOMES.glob("*.yaml"))
+        for copy in range(args.copies)
+    ]
+    home_ids = random.Random(1).choices(
+        [home_id for home_id, _ in inventories], k=args.loads
+    )
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        yaml_dir = pathlib.Path(tmp_dir) / "homes"
+        yaml_dir.mkdir()
+        for home_id, inv in inventories:
+            (yaml_dir / f"{home_id}.yaml").write_text(inv.yaml())
+        archive_path = pathlib.Path(tmp_dir) / "homes.archive"
+        archive.append_archive(archive_path, inventories)
+        print(f"{len(inventories)} homes, {args.loads} loads")
+
+        start = time.perf_counter()
+        for home_id in home_ids:
+            inventory.load_inventory(yaml_dir / f"{home_id}.yaml")
+        elapsed = time.perf_counter() - start
+        print(f"{'yaml files':>16}: {elapsed / args.loads * 1_000_000:8.1f} us/home")
+
+        with archive.InventoryArchive(archive_path) as reader:
+            for name, load in (
+                ("archive", reader.load),
+                ("archive entities", reader.load_entities),
+            ):
+                start = time.perf_counter()
+                for home_id in home_ids:
+                    load(home_id)
+                elapsed = time.perf_counter() - start
+                print(f"{name:>16}: {elapsed / args.loads * 1_000_000:8.1f} us/home")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Benchmark for applying one device state assignment to many homes.
+
+Generates a batch of homes, then compares setting every light, lock and hvac
+in every home to a device state by rebuilding each home with
+`SyntheticHome.__post_init__` and with `apply_device_states`.
+"""
+
+import argparse
+import time
+
+from synthetic_home import device_types, synthetic_home
+
+from .generator import generate_config, generate_home
+
+DEVICE_STATES = {"light": "on", "smart-lock": "unlocked", "hvac": "cooling"}
+
+
+def rebuild(
+    configs: list[dict], registry: device_types.DeviceTypeRegistry
+) -> list[synthetic_home.SyntheticHome]:
+    """Build each home again with the devices in the assigned device states."""
+    return [
+        synthetic_home.SyntheticHome(
+            name=config["name"],
+            devices={
+                area: [
+                    synthetic_home.Device(
+                        **{
+                            **device,
+                            "device_state": DEVICE_STATES.get(
+                                device["device_type"], device["device_state"]
+                            ),
+                        }
+                    )
+                    for device in devices
+                ]
+                for area, devices in config["devices"].items()
+            },
+            device_type_registry=registry,
+        )
+        for config in configs
+    ]
+
+
+def main() -> None:
+    """Run the bulk device state benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--homes", type=int, default=1000)
+    parser.add_argument("--areas", type=int, default=5)
+    parser.add_argument("--devices-per-area", type=int, default=10)
+    args = parser.parse_args()
+
+    registry = device_types.load_registry_snapshot()
+    configs = [
+        generate_config(registry, args.areas, args.devices_per_area, seed)
+        for seed in range(args.homes)
+    ]
+    homes = [
+        generate_home(registry, args.areas, args.devices_per_area, seed)
+        for seed in range(args.homes)
+    ]
+    devices = args.homes * args.areas * args.devices_per_area
+    print(f"{args.homes} homes, {devices} devices")
+
+    for name, func in (
+        ("rebuild", lambda: rebuild(configs, registry)),
+        (
+            "apply",
+            lambda: synthetic_home.apply_device_states(homes, DEVICE_STATES, registry),
+        ),
+    ):
+        start = time.perf_counter()
+        func()
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>8}: {elapsed * 1000:8.1f} ms, {devices / elapsed:10.0f} devices/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,97 @@
+"""Micro-benchmark for building device states in large homes.
+
+Builds a home with hundreds of devices per area using every device type in the
+registry and times `build_device_state` for the whole home. It also compares
+merging entity states using a linear scan of the states with the `domain.key`
+index.
+"""
+
+import argparse
+import itertools
+import timeit
+
+from synthetic_home import device_types, synthetic_home
+
+
+def build_devices(
+    registry: device_types.DeviceTypeRegistry, areas: int, devices_per_area: int
+) -> dict[str, list[synthetic_home.Device]]:
+    """Return devices for a home cycling through every device type and state."""
+    choices = itertools.cycle(
+        (device_type.device_type, device_state.name)
+        for device_type in registry.device_types.values()
+        for device_state in device_type.device_states
+    )
+    return {
+        f"Area {area}": [
+            synthetic_home.Device(
+                name=f"Device {area} {index}",
+                device_type=device_type,
+                device_state=device_state,
+            )
+            for index, (device_type, device_state) in zip(
+                range(devices_per_area), choices
+            )
+        ]
+        for area in range(areas)
+    }
+
+
+def main() -> None:
+    """Run the device state benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=5)
+    parser.add_argument("--devices-per-area", type=int, default=200)
+    parser.add_argument("--number", type=int, default=5, help="Iterations per run")
+    args = parser.parse_args()
+
+    registry = device_types.load_device_type_registry()
+    devices = build_devices(registry, args.areas, args.devices_per_area)
+    total_devices = args.areas * args.devices_per_area
+
+    elapsed = timeit.timeit(
+        lambda: [
+            synthetic_home.build_device_state(device, registry)
+            for area_devices in devices.values()
+            for device in area_devices
+        ],
+        number=args.number,
+    )
+    per_device = elapsed / args.number / total_devices * 1_000_000
+    print(f"build_device_state: {total_devices} devices, {per_device:8.2f} us/device")
+    print(f"device state cache: {synthetic_home.device_state_cache.cache_info()}")
+
+    # Compare merging using the list of states with the domain.key index, for
+    # the device state with the most entity states
+    device_type, device_state = max(
+        (
+            (device_type, device_state)
+            for device_type in registry.device_types.values()
+            for device_state in device_type.device_states
+        ),
+        key=lambda item: len(item[1].entity_states),
+    )
+    entries = [
+        (platform, entry)
+        for platform, entity_entries in device_type.entities.items()
+        for entry in entity_entries
+    ]
+    for name, entity_states in (
+        ("list scan", device_state.entity_states),
+        ("index", device_state.entity_states_dict),
+    ):
+        elapsed = timeit.timeit(
+            lambda entity_states=entity_states: [
+                device_types.merge_entity_state_attributes(
+                    platform, entry, entity_states
+                )
+                for platform, entry in entries
+            ],
+            number=total_devices,
+        )
+        per_device = elapsed / total_devices * 1_000_000
+        print(f"merge {device_type.device_type} ({name}): {per_device:8.2f} us/device")
+
+
+if __name__ == "__main__":
+    main()
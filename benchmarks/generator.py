@@ -0,0 +1,81 @@
+"""Generates synthetic homes of any size for benchmarks.
+
+A home has a number of areas each with a number of devices. Each device has a
+device type drawn at random from the registry and one of its device states,
+so the same seed always generates the same home.
+
+```bash
+$ python -m benchmarks.generator --areas 20 --devices-per-area 100 > large-home.yaml
+```
+"""
+
+import argparse
+import random
+import sys
+from typing import Any
+
+from synthetic_home import device_types, synthetic_home, yaml_util
+
+
+def generate_config(
+    registry: device_types.DeviceTypeRegistry,
+    areas: int,
+    devices_per_area: int,
+    seed: int = 0,
+) -> dict[str, Any]:
+    """Return a synthetic home config with random device types and states."""
+    rng = random.Random(seed)
+    choices = [
+        (name, [device_state.name for device_state in device_type.device_states])
+        for name, device_type in sorted(registry.device_types.items())
+        if device_type.device_states
+    ]
+    devices: dict[str, list[dict[str, Any]]] = {}
+    for area in range(areas):
+        area_devices = devices[f"Area {area}"] = []
+        for index in range(devices_per_area):
+            device_type, device_states = rng.choice(choices)
+            area_devices.append(
+                {
+                    "name": f"{device_type.replace('-', ' ').title()} {area} {index}",
+                    "device_type": device_type,
+                    "device_state": rng.choice(device_states),
+                }
+            )
+    return {"name": f"Generated {areas}x{devices_per_area}", "devices": devices}
+
+
+def generate_home(
+    registry: device_types.DeviceTypeRegistry,
+    areas: int,
+    devices_per_area: int,
+    seed: int = 0,
+) -> synthetic_home.SyntheticHome:
+    """Return a synthetic home with random device types and states."""
+    config = generate_config(registry, areas, devices_per_area, seed)
+    return synthetic_home.SyntheticHome(
+        name=config["name"],
+        devices={
+            area: [synthetic_home.Device(**device) for device in area_devices]
+            for area, area_devices in config["devices"].items()
+        },
+        device_type_registry=registry,
+    )
+
+
+def main() -> None:
+    """Write a generated synthetic home config as yaml."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=10)
+    parser.add_argument("--devices-per-area", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registry = device_types.load_registry_snapshot()
+    config = generate_config(registry, args.areas, args.devices_per_area, args.seed)
+    sys.stdout.write("---\n")
+    sys.stdout.write(yaml_util.dump(config))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+"""Benchmark for generating area, device and entity ids in large homes.
+
+Builds a home with about 10k entities using every device type and state in the
+registry, then compares the time to generate ids for all of its names with
+python-slugify and with `inventory.slugify_id` with a cold and a warm cache.
+The time to build the inventory for the home is also reported.
+"""
+
+import argparse
+import time
+from collections.abc import Callable
+
+import slugify
+
+from synthetic_home import device_types, inventory, synthetic_home
+
+from .device_state import build_devices
+
+
+def time_ids(names: list[str], slugify_fn: Callable[[str], str]) -> float:
+    """Return the seconds to generate an id for each name."""
+    start = time.perf_counter()
+    for name in names:
+        slugify_fn(name)
+    return time.perf_counter() - start
+
+
+def main() -> None:
+    """Run the id generation benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=10)
+    parser.add_argument("--devices-per-area", type=int, default=400)
+    args = parser.parse_args()
+
+    registry = device_types.load_device_type_registry()
+    home = synthetic_home.SyntheticHome(
+        name="Benchmark",
+        devices=build_devices(registry, args.areas, args.devices_per_area),
+        device_type_registry=registry,
+    )
+    inventory._slugify_id.cache_clear()
+    start = time.perf_counter()
+    inv = synthetic_home.build_inventory(home)
+    build_elapsed = time.perf_counter() - start
+    print(f"{len(inv.devices)} devices, {len(inv.entities)} entities")
+
+    # The names that build_inventory generates ids for
+    names = [
+        *(area.name for area in inv.areas),
+        *(device.name for device in inv.devices for _ in range(2)),
+        *(entity.name or "" for entity in inv.entities),
+    ]
+    slugify_elapsed = time_ids(names, lambda name: slugify.slugify(name, separator="_"))
+    inventory._slugify_id.cache_clear()
+    cold_elapsed = time_ids(names, inventory.slugify_id)
+    warm_elapsed = time_ids(names, inventory.slugify_id)
+    for name, elapsed in (
+        ("python-slugify", slugify_elapsed),
+        ("slugify_id cold", cold_elapsed),
+        ("slugify_id warm", warm_elapsed),
+    ):
+        print(
+            f"{name:>16}: {elapsed * 1000:8.1f} ms, "
+            f"{elapsed / len(names) * 1_000_000:6.2f} us/id"
+        )
+    print(f"{'build_inventory':>16}: {build_elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
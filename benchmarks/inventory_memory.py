@@ -0,0 +1,77 @@
+"""Benchmark for the memory used by inventories of large homes.
+
+Builds an inventory for a home with many devices using every device type and
+state in the registry, then compares the memory retained by the `Inventory`
+decoded from yaml with the equivalent `CompactInventory`. The time to convert
+between the two representations is also reported.
+"""
+
+import argparse
+import gc
+import time
+import tracemalloc
+from collections.abc import Callable
+from typing import Any
+
+from synthetic_home import compact_inventory, device_types, inventory, synthetic_home
+
+from .device_state import build_devices
+
+
+def retained_memory(build: Callable[[], Any]) -> tuple[Any, int]:
+    """Return the result of the build and the memory it retains in bytes."""
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    gc.collect()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, size
+
+
+def main() -> None:
+    """Run the inventory memory benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=20)
+    parser.add_argument("--devices-per-area", type=int, default=500)
+    args = parser.parse_args()
+
+    registry = device_types.load_device_type_registry()
+    home = synthetic_home.SyntheticHome(
+        name="Benchmark",
+        devices=build_devices(registry, args.areas, args.devices_per_area),
+        device_type_registry=registry,
+    )
+    content = synthetic_home.build_inventory(home).yaml()
+    del home
+
+    inv, inventory_size = retained_memory(lambda: inventory.decode_inventory(content))
+    compact, compact_size = retained_memory(
+        lambda: compact_inventory.CompactInventory.from_inventory(
+            inventory.decode_inventory(content)
+        )
+    )
+    entities = len(inv.entities)
+    print(f"{len(inv.devices)} devices, {entities} entities")
+    for name, size in (
+        ("Inventory", inventory_size),
+        ("CompactInventory", compact_size),
+    ):
+        print(
+            f"{name:>16}: {size / 1024 / 1024:8.2f} MiB, "
+            f"{size / entities:8.1f} bytes/entity"
+        )
+    print(f"{'ratio':>16}: {compact_size / inventory_size:8.2f}")
+
+    start = time.perf_counter()
+    compact_inventory.CompactInventory.from_inventory(inv)
+    from_elapsed = time.perf_counter() - start
+    start = time.perf_counter()
+    compact.to_inventory()
+    to_elapsed = time.perf_counter() - start
+    print(f"from_inventory: {from_elapsed * 1000:8.1f} ms")
+    print(f"  to_inventory: {to_elapsed * 1000:8.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""Benchmark for the content-addressed inventory store.
+
+Generates a corpus of homes and device state variations of each, as produced
+when building a dataset, then reports the deduplication ratio of the store and
+the throughput of storing the inventories, loading them in full, and loading
+only their devices.
+"""
+
+import argparse
+import pathlib
+import tempfile
+import time
+
+from synthetic_home import device_types, inventory, store, variations
+
+from .generator import generate_home
+
+
+def generate_corpus(
+    registry: device_types.DeviceTypeRegistry,
+    homes: int,
+    variations_per_home: int,
+    areas: int,
+    devices_per_area: int,
+) -> dict[str, inventory.Inventory]:
+    """Return the inventories of state variations of generated homes by id."""
+    corpus = {}
+    for seed in range(homes):
+        state_variations = variations.StateVariations(
+            generate_home(registry, areas, devices_per_area, seed)
+        )
+        for index, variation in enumerate(
+            state_variations.variations(variations.Strategy.PAIRWISE)
+        ):
+            if index >= variations_per_home:
+                break
+            corpus[f"home{seed}-{index}"] = state_variations.inventory(variation)
+    return corpus
+
+
+def report(name: str, elapsed: float, count: int, entities: int) -> None:
+    """Print the throughput of an operation."""
+    print(
+        f"{name:>8}: {elapsed * 1000:8.1f} ms, {count / elapsed:8.0f} inventories/s, "
+        f"{entities / elapsed:10.0f} entities/s"
+    )
+
+
+def main() -> None:
+    """Run the inventory store benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--homes", type=int, default=20)
+    parser.add_argument("--variations", type=int, default=50)
+    parser.add_argument("--areas", type=int, default=5)
+    parser.add_argument("--devices-per-area", type=int, default=10)
+    args = parser.parse_args()
+
+    registry = device_types.load_registry_snapshot()
+    corpus = generate_corpus(
+        registry, args.homes, args.variations, args.areas, args.devices_per_area
+    )
+    entities = sum(len(inv.entities) for inv in corpus.values())
+    yaml_bytes = sum(len(inv.yaml().encode()) for inv in corpus.values())
+    print(f"{len(corpus)} inventories, {entities} entities, {yaml_bytes} bytes of yaml")
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        store_file = pathlib.Path(tmp_dir) / "inventories.db"
+        with store.InventoryStore(store_file) as inventory_store:
+            start = time.perf_counter()
+            inventory_store.put_many(corpus.items())
+            report("store", time.perf_counter() - start, len(corpus), entities)
+            stats = inventory_store.stats()
+        print(
+            f"{stats.objects} objects, {stats.stored_bytes} bytes stored of "
+            f"{stats.logical_bytes} ({stats.dedup_ratio:.1f}x deduplication), "
+            f"{store_file.stat().st_size} bytes on disk"
+        )
+
+        for name, func in (
+            ("load", lambda s, i: s.get(i)),
+            ("devices", lambda s, i: s.load(i).devices),
+        ):
+            # A new store for each run so objects are read from disk
+            with store.InventoryStore(store_file) as inventory_store:
+                start = time.perf_counter()
+                for inventory_id in corpus:
+                    func(inventory_store, inventory_id)
+                report(name, time.perf_counter() - start, len(corpus), entities)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark for device type registry startup time.
+
+Compares a cold load that parses every registry yaml file with a load from the
+precompiled registry snapshot, and with a lazy load that only parses the
+device types that are used.
+"""
+
+import argparse
+import tempfile
+import timeit
+from pathlib import Path
+
+from synthetic_home import device_types
+
+
+def main() -> None:
+    """Run the registry load benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--number", type=int, default=20, help="Iterations per run")
+    args = parser.parse_args()
+
+    registry_path = device_types.DEVICE_TYPES_RESOURCE_PATH
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cache_dir = Path(tmp_dir)
+        # Build the snapshot once before timing
+        device_types.load_registry_snapshot(registry_path, cache_dir)
+
+        cold = timeit.timeit(
+            lambda: device_types.load_registry_snapshot(registry_path, None),
+            number=args.number,
+        )
+        snapshot = timeit.timeit(
+            lambda: device_types.load_registry_snapshot(registry_path, cache_dir),
+            number=args.number,
+        )
+
+        lazy = timeit.timeit(
+            lambda: device_types.load_lazy_registry(registry_path).device_types[
+                "light"
+            ],
+            number=args.number,
+        )
+
+    print(f"yaml load:     {cold / args.number * 1000:8.2f} ms")
+    print(f"snapshot load: {snapshot / args.number * 1000:8.2f} ms")
+    print(f"speedup:       {cold / snapshot:8.1f}x")
+    print(f"lazy load:     {lazy / args.number * 1000:8.2f} ms (one device type)")
+
+
+if __name__ == "__main__":
+    main()
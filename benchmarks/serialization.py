@@ -0,0 +1,63 @@
+"""Benchmark for serializing inventories as yaml, json and msgpack.
+
+Builds an inventory for a home with many devices using every device type and
+state in the registry, then compares the throughput of encoding and decoding
+the inventory and the size of the encoded inventory for each format.
+"""
+
+import argparse
+import json
+import timeit
+from collections.abc import Callable
+from functools import partial
+from typing import Any
+
+from synthetic_home import binary, device_types, inventory, synthetic_home
+
+from .device_state import build_devices
+
+
+def formats() -> list[tuple[str, Callable[[Any], Any], Callable[[Any], Any]]]:
+    """Return the name, encoder and decoder of each format."""
+    return [
+        ("yaml", lambda inv: inv.yaml(), inventory.decode_inventory),
+        (
+            "json",
+            lambda inv: json.dumps(inv.to_dict(omit_none=True)),
+            lambda content: inventory.Inventory.from_dict(json.loads(content)),
+        ),
+        ("msgpack", binary.encode_inventory, binary.decode_inventory),
+    ]
+
+
+def main() -> None:
+    """Run the serialization benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=5)
+    parser.add_argument("--devices-per-area", type=int, default=200)
+    parser.add_argument("--number", type=int, default=3, help="Iterations per run")
+    args = parser.parse_args()
+
+    registry = device_types.load_device_type_registry()
+    home = synthetic_home.SyntheticHome(
+        name="Benchmark",
+        devices=build_devices(registry, args.areas, args.devices_per_area),
+        device_type_registry=registry,
+    )
+    inv = synthetic_home.build_inventory(home)
+    print(f"{len(inv.devices)} devices, {len(inv.entities)} entities")
+    for name, encode, decode in formats():
+        content = encode(inv)
+        size = len(content.encode() if isinstance(content, str) else content)
+        encode_elapsed = timeit.timeit(partial(encode, inv), number=args.number)
+        decode_elapsed = timeit.timeit(partial(decode, content), number=args.number)
+        entities = len(inv.entities) * args.number
+        print(
+            f"{name:>8}: {size / 1024:9.1f} KiB, "
+            f"encode {entities / encode_elapsed:9.0f} entities/s, "
+            f"decode {entities / decode_elapsed:9.0f} entities/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
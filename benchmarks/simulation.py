@@ -0,0 +1,85 @@
+"""Benchmark for replaying synthetic history with the simulator.
+
+Generates a home, then a day of random device state events for it, and times
+replaying the events with the `Simulator`. The first replay computes the
+transitions between device states and later replays reuse them.
+"""
+
+import argparse
+import random
+import time
+
+from synthetic_home import device_types, simulation, synthetic_home
+
+from .generator import generate_home
+
+SECONDS_PER_DAY = 86400
+
+
+def generate_events(
+    home: synthetic_home.SyntheticHome,
+    simulator: simulation.Simulator,
+    count: int,
+    seed: int,
+) -> list[simulation.Event]:
+    """Return random device state events for the home spread over a day."""
+    assert home.device_type_registry
+    registry = home.device_type_registry
+    # Devices are in the simulator in the same order as in the home
+    devices = [
+        device
+        for _, area_devices in synthetic_home.home_areas(home)
+        for device in area_devices
+    ]
+    states = {
+        device_id: list(
+            registry.device_types[device.device_type or ""].device_states_dict
+        )
+        for device_id, device in zip(simulator.device_states, devices, strict=True)
+    }
+    rng = random.Random(seed)
+    device_ids = list(states)
+    events = []
+    for event_time in sorted(rng.uniform(0, SECONDS_PER_DAY) for _ in range(count)):
+        device_id = rng.choice(device_ids)
+        events.append(
+            simulation.Event(
+                time=event_time,
+                device=device_id,
+                device_state=rng.choice(states[device_id]),
+            )
+        )
+    return events
+
+
+def main() -> None:
+    """Run the simulation benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=10)
+    parser.add_argument("--devices-per-area", type=int, default=20)
+    parser.add_argument("--events", type=int, default=100_000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    registry = device_types.load_registry_snapshot()
+    home = generate_home(registry, args.areas, args.devices_per_area, args.seed)
+    start = time.perf_counter()
+    simulator = simulation.Simulator(home)
+    setup_elapsed = time.perf_counter() - start
+    events = generate_events(home, simulator, args.events, args.seed)
+    print(f"{len(simulator.device_states)} devices, {len(events)} events over a day")
+    print(f"{'setup':>8}: {setup_elapsed * 1000:8.1f} ms")
+
+    for name in ("cold", "warm"):
+        start = time.perf_counter()
+        changes = sum(len(step.changes) for step in simulator.run(events))
+        elapsed = time.perf_counter() - start
+        print(
+            f"{name:>8}: {elapsed * 1000:8.1f} ms, "
+            f"{len(events) / elapsed:10.0f} events/s, "
+            f"{changes / elapsed:10.0f} changes/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
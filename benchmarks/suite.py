@@ -0,0 +1,246 @@
+"""Benchmark suite for catching performance regressions.
+
+Generates a large home and times each stage of the home pipeline: loading the
+device type registry, building the `SyntheticHome`, building the inventory,
+encoding and decoding the inventory yaml and loading inventory files. Results
+are written as json so they can be stored as a baseline:
+
+```bash
+$ python -m benchmarks.suite --output baseline.json
+```
+
+A later run can be compared with the baseline, exiting with an error if any
+benchmark is slower than the baseline by more than the threshold:
+
+```bash
+$ python -m benchmarks.suite --compare baseline.json --threshold 0.2
+```
+
+Results are the fastest of several repeats to reduce noise, but are only
+comparable between runs on the same machine.
+"""
+
+import argparse
+import json
+import pathlib
+import platform
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from typing import Any
+
+from synthetic_home import (
+    binary,
+    device_types,
+    inventory,
+    synthetic_home,
+    yaml_util,
+)
+
+from .generator import generate_config, generate_home
+
+RESULTS_VERSION = 1
+
+
+@dataclass
+class Result:
+    """The timing of a benchmark."""
+
+    best_ms: float
+    """The fastest time of a single iteration."""
+
+    mean_ms: float
+    """The mean time of a single iteration across all repeats."""
+
+    number: int
+    """The number of iterations in each repeat."""
+
+
+def _resolve_lazy(
+    names: list[str], cache_dir: pathlib.Path | None
+) -> device_types.DeviceTypeRegistry:
+    """Load a lazy registry and resolve the device types, as a home build would."""
+    registry = device_types.load_lazy_registry(
+        device_types.DEVICE_TYPES_RESOURCE_PATH, cache_dir
+    )
+    for name in names:
+        registry.device_types[name]
+    return registry
+
+
+def benchmarks(
+    areas: int, devices_per_area: int, seed: int, tmp_dir: pathlib.Path
+) -> dict[str, Callable[[], Any]]:
+    """Return the functions to time by benchmark name."""
+    registry = device_types.load_registry_snapshot()
+    config = generate_config(registry, areas, devices_per_area, seed)
+    home_file = tmp_dir / "home.yaml"
+    home_file.write_text(yaml_util.dump(config))
+    home = generate_home(registry, areas, devices_per_area, seed)
+    inv = synthetic_home.build_inventory(home)
+    content = inv.yaml()
+    inventory_file = tmp_dir / "inventory.yaml"
+    inventory_file.write_text(content)
+    # The device types used by the home, resolved by the lazy registry cases
+    used_types = sorted(
+        {
+            device["device_type"]
+            for area_devices in config["devices"].values()
+            for device in area_devices
+        }
+    )
+    cache_dir = tmp_dir / "cache"
+    _resolve_lazy(used_types, cache_dir)
+    unbuilt_devices = {
+        area: [synthetic_home.Device(**device) for device in area_devices]
+        for area, area_devices in config["devices"].items()
+    }
+
+    cases: dict[str, Callable[[], Any]] = {
+        "registry_load": lambda: device_types.load_registry_snapshot(
+            device_types.DEVICE_TYPES_RESOURCE_PATH, None
+        ),
+        "registry_load_lazy": lambda: _resolve_lazy(used_types, None),
+        "registry_load_index": lambda: _resolve_lazy(used_types, cache_dir),
+        "synthetic_home": lambda: synthetic_home.SyntheticHome(
+            name="Benchmark",
+            devices=unbuilt_devices,
+            device_type_registry=registry,
+        ),
+        "load_synthetic_home": lambda: synthetic_home.load_synthetic_home(
+            home_file, registry
+        ),
+        "build_inventory": lambda: synthetic_home.build_inventory(home),
+        "yaml_encode": inv.yaml,
+        "yaml_decode": lambda: inventory.decode_inventory(content),
+        "load_inventory": lambda: inventory.load_inventory(inventory_file),
+    }
+    if binary.HAS_MSGPACK:
+        encoded = binary.encode_inventory(inv)
+        cases["msgpack_encode"] = lambda: binary.encode_inventory(inv)
+        cases["msgpack_decode"] = lambda: binary.decode_inventory(encoded)
+    return cases
+
+
+def run_suite(
+    areas: int,
+    devices_per_area: int,
+    seed: int,
+    repeat: int,
+    number: int,
+    names: list[str] | None = None,
+) -> dict[str, Result]:
+    """Run the benchmarks and return the results by name."""
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        cases = benchmarks(areas, devices_per_area, seed, pathlib.Path(tmp_dir))
+        for name, func in cases.items():
+            if names and name not in names:
+                continue
+            times = timeit.repeat(func, number=number, repeat=repeat)
+            results[name] = Result(
+                best_ms=min(times) / number * 1000,
+                mean_ms=sum(times) / len(times) / number * 1000,
+                number=number,
+            )
+            print(f"{name:>20}: {results[name].best_ms:10.2f} ms", file=sys.stderr)
+    return results
+
+
+def compare(
+    results: dict[str, Result], baseline: dict[str, Result], threshold: float
+) -> list[str]:
+    """Print the results relative to the baseline and return the regressions."""
+    regressions = []
+    print(f"{'benchmark':>20} {'baseline ms':>12} {'current ms':>12} {'ratio':>7}")
+    for name, result in results.items():
+        if (previous := baseline.get(name)) is None:
+            print(f"{name:>20} {'-':>12} {result.best_ms:12.2f}")
+            continue
+        ratio = result.best_ms / previous.best_ms
+        flag = ""
+        if ratio > 1 + threshold:
+            regressions.append(name)
+            flag = "  REGRESSION"
+        print(
+            f"{name:>20} {previous.best_ms:12.2f} {result.best_ms:12.2f} "
+            f"{ratio:7.2f}{flag}"
+        )
+    return regressions
+
+
+def read_results(path: pathlib.Path) -> dict[str, Result]:
+    """Read benchmark results written by `--output`."""
+    data = json.loads(path.read_text())
+    if data.get("version") != RESULTS_VERSION:
+        raise ValueError(f"Unsupported benchmark results version in {path}")
+    return {name: Result(**result) for name, result in data["results"].items()}
+
+
+def main() -> int:
+    """Run the benchmark suite."""
+    parser = argparse.ArgumentParser(
+        description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    parser.add_argument("--areas", type=int, default=20)
+    parser.add_argument("--devices-per-area", type=int, default=100)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5, help="Runs per benchmark")
+    parser.add_argument("--number", type=int, default=1, help="Iterations per run")
+    parser.add_argument(
+        "--benchmark",
+        action="append",
+        help="Only run the named benchmark, may be repeated.",
+    )
+    parser.add_argument("--output", type=pathlib.Path, help="Write results as json")
+    parser.add_argument(
+        "--compare", type=pathlib.Path, help="Compare with baseline results"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=0.1,
+        help="Fraction slower than the baseline that counts as a regression.",
+    )
+    args = parser.parse_args()
+
+    results = run_suite(
+        args.areas,
+        args.devices_per_area,
+        args.seed,
+        args.repeat,
+        args.number,
+        args.benchmark,
+    )
+    if args.output:
+        args.output.write_text(
+            json.dumps(
+                {
+                    "version": RESULTS_VERSION,
+                    "python": platform.python_version(),
+                    "machine": platform.machine(),
+                    "libyaml": yaml_util.HAS_LIBYAML,
+                    "home": {
+                        "areas": args.areas,
+                        "devices_per_area": args.devices_per_area,
+                        "seed": args.seed,
+                    },
+                    "results": {
+                        name: asdict(result) for name, result in results.items()
+                    },
+                },
+                indent=2,
+            )
+        )
+    if args.compare is None:
+        return 0
+    if regressions := compare(results, read_results(args.compare), args.threshold):
+        print(f"Regressions: {', '.join(regressions)}", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,55 @@
+"""Benchmark for yaml load and dump throughput on large inventories.
+
+Compares the pure python PyYAML implementation with the libyaml C bindings
+used by `synthetic_home.yaml_util`.
+"""
+
+import argparse
+import timeit
+
+import yaml
+
+from synthetic_home import device_types, inventory, synthetic_home, yaml_util
+
+from .device_state import build_devices
+
+
+def main() -> None:
+    """Run the yaml throughput benchmark."""
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--areas", type=int, default=20)
+    parser.add_argument("--devices-per-area", type=int, default=50)
+    parser.add_argument("--number", type=int, default=3, help="Iterations per run")
+    args = parser.parse_args()
+
+    registry = device_types.load_device_type_registry()
+    home = synthetic_home.SyntheticHome(
+        name="Benchmark",
+        devices=build_devices(registry, args.areas, args.devices_per_area),
+        device_type_registry=registry,
+    )
+    inv = synthetic_home.build_inventory(home)
+    content = inv.yaml()
+    data = yaml_util.load(content)
+    size_mb = len(content.encode()) / 1_000_000
+    print(
+        f"inventory: {len(inv.devices)} devices, {len(inv.entities)} entities, "
+        f"{size_mb:.2f} MB"
+    )
+    print(f"libyaml available: {yaml_util.HAS_LIBYAML}")
+
+    cases = {
+        "load (pure)": lambda: yaml.load(content, Loader=yaml.SafeLoader),
+        "load (yaml_util)": lambda: yaml_util.load(content),
+        "dump (pure)": lambda: yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=False),
+        "dump (yaml_util)": lambda: yaml_util.dump(data),
+        "decode_inventory": lambda: inventory.decode_inventory(content),
+        "Inventory.yaml": inv.yaml,
+    }
+    for name, func in cases.items():
+        elapsed = timeit.timeit(func, number=args.number) / args.number
+        print(f"{name:18} {elapsed * 1000:9.1f} ms {size_mb / elapsed:8.2f} MB/s")
+
+
+if __name__ == "__main__":
+    main()
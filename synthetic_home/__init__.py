@@ -7,6 +7,17 @@ __all__ = [
     "device_types",
     "exceptions",
     "synthetic_home",
+    "batch",
+    "incremental",
+    "compact_inventory",
+    "variations",
+    "simulation",
+    "diff",
+    "store",
+    "yaml_util",
+    "binary",
+    "archive",
+    "profiling",
     "registry",
     "tool",
 ]
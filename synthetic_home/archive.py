@@ -0,0 +1,280 @@
+"""A single file archive of many inventories with random access by home id.
+
+Datasets of thousands of homes are expensive to read as individual yaml
+files. An archive stores each inventory in the binary format along with an
+index of the position of each home, so any home is read from a memory mapped
+file without reading or parsing the others. The entities of a home can also be
+decoded on their own, without decoding its areas and devices.
+
+```python
+archive.append_archive(path, [("home1", inv1), ("home2", inv2)])
+with archive.InventoryArchive(path) as reader:
+    inv = reader.load("home2")
+```
+
+The archive starts with a fixed size header holding the position of the
+index, followed by the inventories as binary documents and then the index.
+Appending writes the new inventories and then a new index after the end of the
+file, and only then updates the header, so an append that fails leaves the
+archive as it was. Previous indexes and inventories that replaced a home id are
+left unused until the archive is rewritten with `compact_archive`.
+
+Command line tools that read inventory files accept `ARCHIVE#HOME_ID` to read
+a home from an archive, see `load_inventory`. This requires the optional
+`msgpack` dependency.
+"""
+
+import json
+import mmap
+import os
+import pathlib
+import struct
+from collections.abc import Iterable, Iterator
+from dataclasses import dataclass
+from typing import Any, Self
+
+from . import binary, inventory
+from .exceptions import SyntheticHomeError
+
+__all__ = [
+    "ARCHIVE_VERSION",
+    "InventoryArchive",
+    "append_archive",
+    "compact_archive",
+    "load_inventory",
+]
+
+ARCHIVE_VERSION = 1
+"""Version of the archive file layout."""
+
+_MAGIC = b"SHARCHIV"
+# Magic, archive version, index position and index length
+_HEADER = struct.Struct("<8sIQQ")
+
+
+@dataclass(frozen=True)
+class _Record:
+    """The position of an inventory in the archive."""
+
+    offset: int
+    length: int
+    entities_offset: int
+
+
+def _read_header(f: Any, path: pathlib.Path) -> tuple[int, int]:
+    """Read the header and return the index position and length."""
+    header = f.read(_HEADER.size)
+    if len(header) != _HEADER.size:
+        raise SyntheticHomeError(f"File '{path}' is not an inventory archive")
+    magic, version, index_offset, index_length = _HEADER.unpack(header)
+    if magic != _MAGIC:
+        raise SyntheticHomeError(f"File '{path}' is not an inventory archive")
+    if version != ARCHIVE_VERSION:
+        raise SyntheticHomeError(
+            f"Unsupported archive version {version}, expected {ARCHIVE_VERSION}"
+        )
+    return index_offset, index_length
+
+
+def _decode_index(content: bytes, path: pathlib.Path) -> dict[str, _Record]:
+    """Decode the index of records by home id."""
+    try:
+        return {
+            home_id: _Record(*record) for home_id, record in json.loads(content).items()
+        }
+    except (ValueError, TypeError, AttributeError) as err:
+        raise SyntheticHomeError(f"Archive '{path}' has an invalid index: {err}")
+
+
+def _encode_index(index: dict[str, _Record]) -> bytes:
+    """Encode the index of records by home id."""
+    return json.dumps(
+        {
+            home_id: [record.offset, record.length, record.entities_offset]
+            for home_id, record in index.items()
+        },
+        separators=(",", ":"),
+    ).encode()
+
+
+def append_archive(
+    path: pathlib.Path, inventories: Iterable[tuple[str, inventory.Inventory]]
+) -> None:
+    """Append inventories by home id to the archive, creating it if needed.
+
+    An inventory replaces any existing inventory in the archive with the same
+    home id. If writing fails, for example when an inventory can't be built,
+    nothing is appended and the archive keeps its previous inventories.
+    """
+    if not path.exists():
+        with path.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, ARCHIVE_VERSION, 0, 0))
+        index: dict[str, _Record] = {}
+    else:
+        with path.open("rb") as f:
+            index_offset, index_length = _read_header(f, path)
+            index = {}
+            if index_length:
+                f.seek(index_offset)
+                index = _decode_index(f.read(index_length), path)
+
+    with path.open("r+b") as f:
+        # The header still points at the previous index until the end
+        start = offset = f.seek(0, os.SEEK_END)
+        try:
+            for home_id, inv in inventories:
+                content = binary.encode_inventory(inv)
+                f.write(content)
+                index[home_id] = _Record(
+                    offset=offset,
+                    length=len(content),
+                    entities_offset=offset + binary.entities_offset(content),
+                )
+                offset += len(content)
+        except BaseException:
+            f.truncate(start)
+            raise
+        _write_index(f, offset, index)
+
+
+def _write_index(f: Any, offset: int, index: dict[str, _Record]) -> None:
+    """Write the index at the offset then update the header to point at it."""
+    content = _encode_index(index)
+    f.seek(offset)
+    f.write(content)
+    f.flush()
+    f.seek(0)
+    f.write(_HEADER.pack(_MAGIC, ARCHIVE_VERSION, offset, len(content)))
+
+
+def compact_archive(path: pathlib.Path) -> int:
+    """Rewrite the archive without replaced inventories and return the bytes saved.
+
+    The compacted archive is written to a temporary file that then replaces
+    the archive, so readers that already opened it are not affected.
+    """
+    tmp_file = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    try:
+        with InventoryArchive(path) as reader, tmp_file.open("wb") as f:
+            f.write(_HEADER.pack(_MAGIC, ARCHIVE_VERSION, 0, 0))
+            offset = _HEADER.size
+            index: dict[str, _Record] = {}
+            for home_id in reader:
+                record = reader._record(home_id)
+                f.write(reader.read(home_id))
+                index[home_id] = _Record(
+                    offset=offset,
+                    length=record.length,
+                    entities_offset=offset + record.entities_offset - record.offset,
+                )
+                offset += record.length
+            _write_index(f, offset, index)
+        saved = path.stat().st_size - tmp_file.stat().st_size
+        tmp_file.replace(path)
+    except BaseException:
+        tmp_file.unlink(missing_ok=True)
+        raise
+    return saved
+
+
+def load_inventory(inventory_file: str) -> inventory.Inventory:
+    """Load an inventory from a yaml file or from a home in an archive.
+
+    A home in an archive is given as `ARCHIVE#HOME_ID`. Any other file is
+    loaded as a yaml inventory.
+    """
+    archive_file, sep, home_id = inventory_file.rpartition("#")
+    if sep and _is_archive(pathlib.Path(archive_file)):
+        with InventoryArchive(pathlib.Path(archive_file)) as reader:
+            return reader.load(home_id)
+    return inventory.load_inventory(pathlib.Path(inventory_file))
+
+
+def _is_archive(path: pathlib.Path) -> bool:
+    """Return True if the file starts with the archive magic."""
+    try:
+        with path.open("rb") as f:
+            return f.read(len(_MAGIC)) == _MAGIC
+    except OSError:
+        return False
+
+
+class InventoryArchive:
+    """Reads inventories by home id from a memory mapped archive.
+
+    Inventories appended to the archive after it was opened are not visible
+    until it is opened again.
+    """
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Initialize InventoryArchive."""
+        self._path = path
+        try:
+            with path.open("rb") as f:
+                index_offset, index_length = _read_header(f, path)
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except FileNotFoundError:
+            raise SyntheticHomeError(f"Archive file '{path}' does not exist")
+        self._view = memoryview(self._mmap)
+        self._index: dict[str, _Record] = {}
+        if index_length:
+            self._index = _decode_index(
+                self._mmap[index_offset : index_offset + index_length], path
+            )
+
+    def __enter__(self) -> Self:
+        """Enter the context manager."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the archive."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the memory mapped archive file."""
+        self._view.release()
+        self._mmap.close()
+
+    def ids(self) -> list[str]:
+        """Return the home ids in the archive in the order they were added."""
+        return list(self._index)
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the home ids in the archive."""
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        """Return the number of homes in the archive."""
+        return len(self._index)
+
+    def __contains__(self, home_id: object) -> bool:
+        """Return True if the home is in the archive."""
+        return home_id in self._index
+
+    def _record(self, home_id: str) -> _Record:
+        """Return the record for the home."""
+        if (record := self._index.get(home_id)) is None:
+            raise SyntheticHomeError(
+                f"Home '{home_id}' is not in archive '{self._path}'"
+            )
+        return record
+
+    def read(self, home_id: str) -> memoryview:
+        """Return the encoded inventory for the home without copying it.
+
+        The content can be decoded with `binary.decode_inventory` and is only
+        valid until the archive is closed.
+        """
+        record = self._record(home_id)
+        return self._view[record.offset : record.offset + record.length]
+
+    def load(self, home_id: str) -> inventory.Inventory:
+        """Load the inventory for the home."""
+        return binary.decode_inventory(self.read(home_id))
+
+    def load_entities(self, home_id: str) -> list[inventory.Entity]:
+        """Load only the entities of the inventory for the home."""
+        record = self._record(home_id)
+        return binary.decode_entities(
+            self._view[record.entities_offset : record.offset + record.length]
+        )
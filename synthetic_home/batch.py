@@ -0,0 +1,185 @@
+"""Batch compilation of synthetic homes into inventories.
+
+This is used to build inventories for a large number of synthetic homes e.g.
+when generating evaluation datasets. Homes are built in a pool of worker
+processes that share a single loaded device type registry, and each inventory
+is written to the output directory as soon as it is built. Unless a registry
+is given, the workers share every device type loaded from the registry
+snapshot, so they do not parse any device type files.
+"""
+
+import glob
+import logging
+import os
+import pathlib
+from collections.abc import Generator, Iterable
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from functools import partial
+
+import yaml
+
+from .binary import Format, save_inventory
+from .device_types import (
+    DeviceTypeRegistry,
+    load_device_type_registry,
+    load_registry_snapshot,
+    registry_search_paths,
+    snapshot_cache_dir,
+)
+from .exceptions import SyntheticHomeError
+from .synthetic_home import build_inventory, load_synthetic_home
+
+__all__ = [
+    "BatchResult",
+    "find_config_files",
+    "output_files_for",
+    "build_inventories",
+]
+
+_LOGGER = logging.getLogger(__name__)
+
+# Number of homes sent to a worker at a time, per worker
+_CHUNKS_PER_WORKER = 4
+
+# The device type registry shared by all homes built in a worker process
+_worker_registry: DeviceTypeRegistry | None = None
+
+
+@dataclass
+class BatchResult:
+    """The result of building the inventory for a single home."""
+
+    config_file: pathlib.Path
+    """The synthetic home config file."""
+
+    output_file: pathlib.Path | None = None
+    """The inventory file written for the home, or None on failure."""
+
+    error: str | None = None
+    """A description of the failure building the home."""
+
+
+def find_config_files(pattern: str) -> list[pathlib.Path]:
+    """Return the synthetic home config files in a directory or matching a glob."""
+    path = pathlib.Path(pattern)
+    if path.is_dir():
+        return sorted(path.glob("*.yaml"))
+    return sorted(
+        pathlib.Path(filename)
+        for filename in glob.glob(pattern, recursive=True)
+        if pathlib.Path(filename).is_file()
+    )
+
+
+def output_files_for(
+    config_files: list[pathlib.Path],
+    output_dir: pathlib.Path,
+    output_format: Format = Format.YAML,
+) -> list[pathlib.Path]:
+    """Return the inventory output file for each config file."""
+    output_files: dict[pathlib.Path, pathlib.Path] = {}
+    for config_file in config_files:
+        output_file = output_dir / f"{config_file.stem}{output_format.suffix}"
+        if (existing := output_files.get(output_file)) is not None:
+            raise SyntheticHomeError(
+                f"Config files '{existing}' and '{config_file}' would both write '{output_file}'"
+            )
+        output_files[output_file] = config_file
+    return list(output_files)
+
+
+def _load_registry() -> DeviceTypeRegistry:
+    """Load every device type of the default registry from the snapshot.
+
+    If a device type fails to load, the lazy default registry is used instead
+    so that only the homes using it fail.
+    """
+    try:
+        return load_registry_snapshot(registry_search_paths(), snapshot_cache_dir())
+    except SyntheticHomeError as err:
+        _LOGGER.debug("Unable to load the registry snapshot: %s", err)
+        return load_device_type_registry()
+
+
+def _preload(device_type_registry: DeviceTypeRegistry) -> None:
+    """Parse every device type so workers do not each parse them again.
+
+    A device type that fails to parse is skipped, so only the homes using it
+    fail, with the error raised when they are built.
+    """
+    for name in device_type_registry.device_types:
+        try:
+            device_type_registry.device_types[name]
+        except SyntheticHomeError as err:
+            _LOGGER.debug("Unable to preload device type %s: %s", name, err)
+
+
+def _init_worker(device_type_registry: DeviceTypeRegistry) -> None:
+    """Initialize a worker process with the shared device type registry."""
+    global _worker_registry
+    _worker_registry = device_type_registry
+
+
+def _build_inventory_file(
+    files: tuple[pathlib.Path, pathlib.Path],
+    device_type_registry: DeviceTypeRegistry | None = None,
+    output_format: Format = Format.YAML,
+) -> BatchResult:
+    """Build and write the inventory for a single synthetic home."""
+    config_file, output_file = files
+    try:
+        home = load_synthetic_home(
+            config_file, device_type_registry or _worker_registry
+        )
+        save_inventory(build_inventory(home), output_file, output_format)
+    except (SyntheticHomeError, yaml.YAMLError, OSError) as err:
+        _LOGGER.debug("Failed to build inventory for %s: %s", config_file, err)
+        return BatchResult(config_file=config_file, error=str(err))
+    return BatchResult(config_file=config_file, output_file=output_file)
+
+
+def build_inventories(
+    config_files: Iterable[pathlib.Path],
+    output_dir: pathlib.Path,
+    jobs: int | None = None,
+    device_type_registry: DeviceTypeRegistry | None = None,
+    output_format: Format = Format.YAML,
+) -> Generator[BatchResult]:
+    """Build an inventory file for each synthetic home config file.
+
+    The inventories are built by `jobs` worker processes, defaulting to the
+    number of CPUs, and written to `output_dir` named after the config file
+    in the output format.
+    Results are yielded in the order of the config files. A home that fails
+    to build is reported in its result and does not stop the batch.
+    """
+    config_files = list(config_files)
+    output_files = output_files_for(config_files, output_dir, output_format)
+    output_dir.mkdir(parents=True, exist_ok=True)
+
+    jobs = jobs or os.cpu_count() or 1
+    files = zip(config_files, output_files)
+    if jobs == 1 or len(config_files) <= 1:
+        build = partial(
+            _build_inventory_file,
+            device_type_registry=device_type_registry,
+            output_format=output_format,
+        )
+        yield from map(build, files)
+        return
+
+    chunksize = max(1, len(config_files) // (jobs * _CHUNKS_PER_WORKER))
+    if device_type_registry is None:
+        device_type_registry = _load_registry()
+    _preload(device_type_registry)
+    with ProcessPoolExecutor(
+        max_workers=jobs,
+        initializer=_init_worker,
+        initargs=(device_type_registry,),
+    ) as executor:
+        yield from executor.map(
+            partial(_build_inventory_file, output_format=output_format),
+            files,
+            chunksize=chunksize,
+        )
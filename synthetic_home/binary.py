@@ -0,0 +1,365 @@
+"""A binary format for inventories and compiled synthetic homes.
+
+Inventories and synthetic homes can be serialized to a compact binary format
+based on [msgpack](https://msgpack.org/) that is much faster to read and write
+than yaml. This requires the optional `msgpack` dependency:
+
+```bash
+$ pip install synthetic_home[msgpack]
+```
+
+Each document is a msgpack array with a magic string, the document kind, the
+schema version and the data. Objects are encoded as positional arrays rather
+than maps, so the schema version is bumped whenever a field is added, removed
+or reordered. Documents can be concatenated into a stream of many documents.
+
+A synthetic home is stored compiled, with the entity entries of each device
+already resolved from its device state, so loading it does not consult the
+device type registry.
+"""
+
+import pathlib
+from collections.abc import Buffer, Generator
+from enum import StrEnum
+from typing import Any, BinaryIO
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+from . import common, inventory
+from .device_types import DeviceState, DeviceTypeRegistry, EntityEntry, EntityState
+from .exceptions import SyntheticHomeError
+from .synthetic_home import Device, SyntheticHome
+
+__all__ = [
+    "HAS_MSGPACK",
+    "SCHEMA_VERSION",
+    "Format",
+    "encode_inventory",
+    "decode_inventory",
+    "entities_offset",
+    "decode_entities",
+    "encode_home",
+    "decode_home",
+    "decode_stream",
+    "write_inventory",
+    "load_inventory",
+    "save_inventory",
+]
+
+HAS_MSGPACK = msgpack is not None
+"""True when the optional msgpack dependency is installed."""
+
+SCHEMA_VERSION = 1
+"""Version of the binary schema, bumped when the data model changes."""
+
+_MAGIC = "synthetic_home"
+_INVENTORY = "inventory"
+_HOME = "home"
+
+
+class Format(StrEnum):
+    """A serialization format for inventories."""
+
+    YAML = "yaml"
+    MSGPACK = "msgpack"
+
+    @property
+    def suffix(self) -> str:
+        """The file name suffix for the format."""
+        return f".{self.value}"
+
+
+def _require_msgpack() -> Any:
+    """Return the msgpack module or raise if it is not installed."""
+    if msgpack is None:
+        raise SyntheticHomeError(
+            "The msgpack format requires the msgpack package: "
+            "pip install synthetic_home[msgpack]"
+        )
+    return msgpack
+
+
+def _encode_info(info: common.DeviceInfo | None) -> list[Any] | None:
+    """Encode the device info as an array."""
+    if info is None:
+        return None
+    return [info.model, info.manufacturer, info.sw_version]
+
+
+def _decode_info(data: list[Any] | None) -> common.DeviceInfo | None:
+    """Decode the device info from an array."""
+    if data is None:
+        return None
+    model, manufacturer, sw_version = data
+    return common.DeviceInfo(
+        model=model, manufacturer=manufacturer, sw_version=sw_version
+    )
+
+
+def _encode_inventory(inv: inventory.Inventory) -> list[Any]:
+    """Encode the inventory as nested arrays."""
+    return [
+        inv.language,
+        [[area.name, area.id, area.floor] for area in inv.areas],
+        [
+            [device.name, device.id, device.area, _encode_info(device.info)]
+            for device in inv.devices
+        ],
+        [
+            [
+                entity.name,
+                entity.id,
+                entity.area,
+                entity.device,
+                entity.state,
+                entity.attributes,
+            ]
+            for entity in inv.entities
+        ],
+    ]
+
+
+def _decode_inventory(data: list[Any]) -> inventory.Inventory:
+    """Decode the inventory from nested arrays."""
+    language, areas, devices, entities = data
+    return inventory.Inventory(
+        language=language,
+        areas=[
+            inventory.Area(name=name, id=area_id, floor=floor)
+            for name, area_id, floor in areas
+        ],
+        devices=[
+            inventory.Device(
+                name=name, id=device_id, area=area, info=_decode_info(info)
+            )
+            for name, device_id, area, info in devices
+        ],
+        entities=_decode_entities(entities),
+    )
+
+
+def _decode_entities(data: list[Any]) -> list[inventory.Entity]:
+    """Decode the inventory entities from nested arrays."""
+    return [
+        inventory.Entity(
+            name=name,
+            id=entity_id,
+            area=area,
+            device=device,
+            state=state,
+            attributes=attributes,
+        )
+        for name, entity_id, area, device, state, attributes in data
+    ]
+
+
+def _encode_device(device: Device) -> list[Any]:
+    """Encode a built device as an array."""
+    device_state: list[Any] | None = None
+    if isinstance(device.device_state, DeviceState):
+        device_state = [
+            device.device_state.name,
+            [
+                [entity_state.domain, entity_state.key, entity_state.state]
+                for entity_state in device.device_state.entity_states
+            ],
+        ]
+    elif device.device_state is not None:
+        raise SyntheticHomeError(f"Device {device.name} has not been built")
+    return [
+        device.name,
+        device.device_type,
+        _encode_info(device.device_info),
+        device_state,
+        {
+            platform: [[entry.key, entry.attributes] for entry in entries]
+            for platform, entries in device.entity_entries.items()
+        },
+    ]
+
+
+def _decode_device(data: list[Any]) -> Device:
+    """Decode a built device from an array."""
+    name, device_type, info, device_state, entity_entries = data
+    return Device(
+        name=name,
+        device_type=device_type,
+        device_info=_decode_info(info),
+        device_state=None
+        if device_state is None
+        else DeviceState(
+            name=device_state[0],
+            entity_states=[
+                EntityState(domain=domain, key=key, state=state)
+                for domain, key, state in device_state[1]
+            ],
+        ),
+        entity_entries={
+            platform: [
+                EntityEntry(key=key, attributes=attributes)
+                for key, attributes in entries
+            ]
+            for platform, entries in entity_entries.items()
+        },
+    )
+
+
+def _encode_home(home: SyntheticHome) -> list[Any]:
+    """Encode the synthetic home as nested arrays."""
+    return [
+        home.name,
+        {
+            area: [_encode_device(device) for device in devices]
+            for area, devices in home.devices.items()
+        },
+        [_encode_device(device) for device in home.services],
+    ]
+
+
+def _pack(kind: str, data: list[Any]) -> bytes:
+    """Pack the data as a binary document of the kind."""
+    packed: bytes = _require_msgpack().packb([_MAGIC, kind, SCHEMA_VERSION, data])
+    return packed
+
+
+def _check_header(document: Any) -> tuple[str, list[Any]]:
+    """Validate the document header and return the kind and data."""
+    if not isinstance(document, list) or len(document) != 4 or document[0] != _MAGIC:
+        raise SyntheticHomeError("Data is not a synthetic home binary document")
+    _, kind, version, data = document
+    if version != SCHEMA_VERSION:
+        raise SyntheticHomeError(
+            f"Unsupported binary schema version {version}, expected {SCHEMA_VERSION}"
+        )
+    return kind, data
+
+
+def _unpack(content: Buffer, kind: str) -> list[Any]:
+    """Unpack a binary document of the kind and return its data."""
+    try:
+        document = _require_msgpack().unpackb(content, strict_map_key=False)
+    except ValueError as err:
+        raise SyntheticHomeError(f"Could not decode binary document: {err}")
+    document_kind, data = _check_header(document)
+    if document_kind != kind:
+        raise SyntheticHomeError(f"Expected a {kind} document, got {document_kind}")
+    return data
+
+
+def encode_inventory(inv: inventory.Inventory) -> bytes:
+    """Encode the inventory in the binary format."""
+    return _pack(_INVENTORY, _encode_inventory(inv))
+
+
+def decode_inventory(content: Buffer) -> inventory.Inventory:
+    """Decode an inventory from the binary format."""
+    return _decode_inventory(_unpack(content, _INVENTORY))
+
+
+def entities_offset(content: Buffer) -> int:
+    """Return the position of the entities in an encoded inventory.
+
+    The entities are the last item of an inventory document, so the content
+    from this position can be decoded on its own with `decode_entities`.
+    """
+    unpacker = _require_msgpack().Unpacker()
+    unpacker.feed(content)
+    try:
+        if unpacker.read_array_header() != 4:
+            raise SyntheticHomeError("Data is not a synthetic home binary document")
+        header = [unpacker.unpack() for _ in range(3)]
+        _check_header([*header, None])
+        if header[1] != _INVENTORY or unpacker.read_array_header() != 4:
+            raise SyntheticHomeError(f"Expected a {_INVENTORY} document")
+        for _ in range(3):
+            unpacker.skip()
+    except ValueError as err:
+        raise SyntheticHomeError(f"Could not decode binary document: {err}")
+    offset: int = unpacker.tell()
+    return offset
+
+
+def decode_entities(content: Buffer) -> list[inventory.Entity]:
+    """Decode the entities of an encoded inventory from `entities_offset`."""
+    try:
+        data = _require_msgpack().unpackb(content, strict_map_key=False)
+    except ValueError as err:
+        raise SyntheticHomeError(f"Could not decode binary entities: {err}")
+    return _decode_entities(data)
+
+
+def encode_home(home: SyntheticHome) -> bytes:
+    """Encode the compiled synthetic home in the binary format."""
+    return _pack(_HOME, _encode_home(home))
+
+
+def decode_home(
+    content: Buffer, device_type_registry: DeviceTypeRegistry | None = None
+) -> SyntheticHome:
+    """Decode a compiled synthetic home from the binary format.
+
+    The devices are used as compiled and are not rebuilt from the registry.
+    """
+    return _decode_home(_unpack(content, _HOME), device_type_registry)
+
+
+def _decode_home(
+    data: list[Any], device_type_registry: DeviceTypeRegistry | None
+) -> SyntheticHome:
+    """Decode the synthetic home data without rebuilding the devices."""
+    name, devices, services = data
+    return SyntheticHome(
+        name=name,
+        devices={
+            area: [_decode_device(device) for device in area_devices]
+            for area, area_devices in devices.items()
+        },
+        services=[_decode_device(device) for device in services],
+        device_type_registry=device_type_registry,
+        compiled=True,
+    )
+
+
+def decode_stream(
+    stream: BinaryIO,
+) -> Generator[inventory.Inventory | SyntheticHome]:
+    """Decode each document in a stream of binary documents as it is read."""
+    unpacker = _require_msgpack().Unpacker(stream, strict_map_key=False)
+    for document in unpacker:
+        kind, data = _check_header(document)
+        if kind == _INVENTORY:
+            yield _decode_inventory(data)
+        elif kind == _HOME:
+            yield _decode_home(data, None)
+        else:
+            raise SyntheticHomeError(f"Unknown binary document kind {kind}")
+
+
+def write_inventory(inv: inventory.Inventory, stream: BinaryIO) -> None:
+    """Write the inventory as a binary document to the stream."""
+    stream.write(encode_inventory(inv))
+
+
+def load_inventory(inventory_file: pathlib.Path) -> inventory.Inventory:
+    """Load an inventory from a binary file on disk."""
+    try:
+        content = inventory_file.read_bytes()
+    except FileNotFoundError:
+        raise SyntheticHomeError(f"Inventory file '{inventory_file}' does not exist")
+    return decode_inventory(content)
+
+
+def save_inventory(
+    inv: inventory.Inventory,
+    inventory_file: pathlib.Path,
+    output_format: Format = Format.YAML,
+) -> None:
+    """Write the inventory to a file on disk in the format."""
+    if output_format == Format.MSGPACK:
+        inventory_file.write_bytes(encode_inventory(inv))
+        return
+    with inventory_file.open("w") as f:
+        inventory.write_inventory(inv, f)
@@ -0,0 +1,238 @@
+"""A compact columnar representation of an inventory for large homes.
+
+An `inventory.Inventory` holds a dataclass instance with its own `__dict__`
+for every area, device and entity. `CompactInventory` stores the same data as
+columns instead. Area and device ids and floors are interned in a string
+table and referenced by index. Identical states, device info and entity
+attributes are stored once and shared.
+
+The conversion to and from `Inventory` is lossless. Device info and entity
+attributes returned from a `CompactInventory` are shared between every area,
+device or entity with the same values and must be treated as read-only.
+"""
+
+import sys
+from array import array
+from collections.abc import Generator
+from typing import Any
+
+from . import common, inventory
+
+__all__ = [
+    "CompactInventory",
+]
+
+# Index used in columns for a value of None
+_NONE = -1
+
+
+def _freeze(value: Any) -> Any:
+    """Return a hashable key for a value, preserving dict key order and types."""
+    if isinstance(value, dict):
+        return (dict, tuple((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, list):
+        return (list, tuple(_freeze(item) for item in value))
+    return (type(value), value)
+
+
+class _Table[T]:
+    """A table of distinct values referenced by index."""
+
+    __slots__ = ("_index", "values")
+
+    def __init__(self) -> None:
+        """Initialize _Table."""
+        self.values: list[T] = []
+        self._index: dict[Any, int] = {}
+
+    def add(self, value: T | None, key: Any = None) -> int:
+        """Return the index of the value, adding it if not already present."""
+        if value is None:
+            return _NONE
+        if key is None:
+            key = value
+        if (index := self._index.get(key)) is None:
+            index = self._index[key] = len(self.values)
+            self.values.append(value)
+        return index
+
+    def get(self, index: int) -> T | None:
+        """Return the value at the index."""
+        return None if index == _NONE else self.values[index]
+
+
+def _intern(value: str | None) -> str | None:
+    """Return the interned string so it is shared across inventories."""
+    return None if value is None else sys.intern(value)
+
+
+class CompactInventory:
+    """An inventory stored as columns of interned values.
+
+    Use `from_inventory` to build a compact inventory and `to_inventory` to
+    convert back to an `Inventory`.
+    """
+
+    __slots__ = (
+        "_area_floors",
+        "_area_ids",
+        "_area_names",
+        "_attributes",
+        "_device_areas",
+        "_device_ids",
+        "_device_infos",
+        "_device_names",
+        "_entity_areas",
+        "_entity_attributes",
+        "_entity_devices",
+        "_entity_ids",
+        "_entity_names",
+        "_entity_states",
+        "_infos",
+        "_states",
+        "_strings",
+        "language",
+    )
+
+    def __init__(self) -> None:
+        """Initialize an empty CompactInventory."""
+        self.language: str | None = None
+        self._strings: _Table[str] = _Table()
+        self._infos: _Table[common.DeviceInfo] = _Table()
+        self._attributes: _Table[common.NamedAttributes] = _Table()
+        self._states: _Table[Any] = _Table()
+        self._area_names: list[str] = []
+        self._area_ids = array("i")
+        self._area_floors = array("i")
+        self._device_names: list[str] = []
+        self._device_ids = array("i")
+        self._device_areas = array("i")
+        self._device_infos = array("i")
+        self._entity_names: list[str | None] = []
+        self._entity_ids: list[str | None] = []
+        self._entity_areas = array("i")
+        self._entity_devices = array("i")
+        self._entity_states = array("i")
+        self._entity_attributes = array("i")
+
+    @classmethod
+    def from_inventory(cls, inv: inventory.Inventory) -> "CompactInventory":
+        """Build a compact inventory from an inventory."""
+        compact = cls()
+        compact.language = inv.language
+        for area in inv.areas:
+            compact.add_area(area)
+        for device in inv.devices:
+            compact.add_device(device)
+        for entity in inv.entities:
+            compact.add_entity(entity)
+        return compact
+
+    def add_area(self, area: inventory.Area) -> None:
+        """Add an area to the inventory."""
+        self._area_names.append(area.name)
+        self._area_ids.append(self._strings.add(_intern(area.id)))
+        self._area_floors.append(self._strings.add(_intern(area.floor)))
+
+    def add_device(self, device: inventory.Device) -> None:
+        """Add a device to the inventory."""
+        info = device.info
+        self._device_names.append(device.name)
+        self._device_ids.append(self._strings.add(_intern(device.id)))
+        self._device_areas.append(self._strings.add(_intern(device.area)))
+        self._device_infos.append(
+            self._infos.add(
+                info,
+                None
+                if info is None
+                else (info.model, info.manufacturer, info.sw_version),
+            )
+        )
+
+    def add_entity(self, entity: inventory.Entity) -> None:
+        """Add an entity to the inventory."""
+        attributes = entity.attributes
+        self._entity_names.append(entity.name)
+        self._entity_ids.append(entity.id)
+        self._entity_areas.append(self._strings.add(_intern(entity.area)))
+        self._entity_devices.append(self._strings.add(_intern(entity.device)))
+        self._entity_states.append(
+            self._states.add(entity.state, _freeze(entity.state))
+        )
+        self._entity_attributes.append(
+            self._attributes.add(
+                attributes, None if attributes is None else _freeze(attributes)
+            )
+        )
+
+    def _area(self, index: int) -> inventory.Area:
+        """Return the area at the index."""
+        return inventory.Area(
+            name=self._area_names[index],
+            id=self._strings.get(self._area_ids[index]),
+            floor=self._strings.get(self._area_floors[index]),
+        )
+
+    def _device(self, index: int) -> inventory.Device:
+        """Return the device at the index."""
+        return inventory.Device(
+            name=self._device_names[index],
+            id=self._strings.get(self._device_ids[index]),
+            area=self._strings.get(self._device_areas[index]),
+            info=self._infos.get(self._device_infos[index]),
+        )
+
+    def _entity(self, index: int) -> inventory.Entity:
+        """Return the entity at the index."""
+        return inventory.Entity(
+            name=self._entity_names[index],
+            id=self._entity_ids[index],
+            area=self._strings.get(self._entity_areas[index]),
+            device=self._strings.get(self._entity_devices[index]),
+            state=self._states.get(self._entity_states[index]),
+            attributes=self._attributes.get(self._entity_attributes[index]),
+        )
+
+    def areas(self) -> Generator[inventory.Area]:
+        """Yield each area in the inventory."""
+        yield from map(self._area, range(len(self._area_names)))
+
+    def devices(self) -> Generator[inventory.Device]:
+        """Yield each device in the inventory."""
+        yield from map(self._device, range(len(self._device_names)))
+
+    def entities(self) -> Generator[inventory.Entity]:
+        """Yield each entity in the inventory."""
+        yield from map(self._entity, range(len(self._entity_names)))
+
+    def to_inventory(self) -> inventory.Inventory:
+        """Return the inventory as an `Inventory`."""
+        return inventory.Inventory(
+            language=self.language,
+            areas=list(self.areas()),
+            devices=list(self.devices()),
+            entities=list(self.entities()),
+        )
+
+    @property
+    def floors(self) -> set[str]:
+        """Return the set of floors across all areas."""
+        return {
+            self._strings.values[floor] for floor in self._area_floors if floor != _NONE
+        }
+
+    def device_dict(self) -> dict[str, inventory.Device]:
+        """Dictionary of devices by device id."""
+        return {
+            self._strings.values[device_id]: self._device(i)
+            for i, device_id in enumerate(self._device_ids)
+            if device_id != _NONE
+        }
+
+    def area_dict(self) -> dict[str, inventory.Area]:
+        """Dictionary of areas by area id."""
+        return {
+            self._strings.values[area_id]: self._area(i)
+            for i, area_id in enumerate(self._area_ids)
+            if area_id != _NONE
+        }
@@ -8,20 +8,25 @@ A device type may also pre-define the concept of a device state. The device
 state is a name like "idle" that describes the state of the set of entities.
 """
 
+import hashlib
 import logging
-from collections.abc import Generator
+import os
+import pathlib
+import pickle
+from collections.abc import Generator, Iterator, Mapping, Sequence
 from dataclasses import dataclass, field
-from functools import cache
+from functools import cache, cached_property
 from importlib import resources
 from importlib.resources.abc import Traversable
+from types import MappingProxyType
 from typing import Any
 
 import yaml
 from mashumaro import DataClassDictMixin, field_options
-from mashumaro.codecs.yaml import yaml_decode
 from mashumaro.exceptions import MissingField
 from mashumaro.types import SerializationStrategy
 
+from . import profiling, yaml_util
 from .common import NamedAttributes, StateValue
 from .exceptions import SyntheticHomeError
 
@@ -31,7 +36,13 @@ __all__ = [
     "DeviceState",
     "EntityState",
     "EntityEntry",
+    "LazyDeviceTypes",
     "load_device_type_registry",
+    "load_lazy_registry",
+    "load_registry_snapshot",
+    "registry_digest",
+    "registry_search_paths",
+    "snapshot_cache_dir",
 ]
 
 
@@ -40,6 +51,26 @@ _LOGGER = logging.getLogger(__name__)
 
 DEVICE_TYPES_RESOURCE_PATH = resources.files("synthetic_home").joinpath("registry")
 
+CACHE_DIR_ENV = "SYNTHETIC_HOME_CACHE_DIR"
+"""Environment variable that overrides the registry snapshot directory.
+
+Setting this to an empty string disables the registry snapshot.
+"""
+
+REGISTRY_PATH_ENV = "SYNTHETIC_HOME_REGISTRY_PATH"
+"""Environment variable with additional device type directories.
+
+Directories are separated by `os.pathsep` and are searched in order before the
+packaged registry, so a device type in an earlier directory overrides a device
+type with the same name in a later directory.
+"""
+
+SNAPSHOT_VERSION = 2
+"""Version of the registry snapshot format, bumped when the data model changes."""
+
+INDEX_VERSION = 2
+"""Version of the registry directory index format."""
+
 
 class KeyedObjectListStrategy(SerializationStrategy):
     """A predefined entity state parser."""
@@ -60,7 +91,7 @@ class KeyedObjectListStrategy(SerializationStrategy):
         raise ValueError(f"Expected 'dict' representing the object list, got: {value}")
 
 
-@dataclass
+@dataclass(frozen=True)
 class EntityEntry(DataClassDictMixin):
     """Defines an entity type.
 
@@ -136,24 +167,41 @@ class EntityState(DataClassDictMixin):
 
 
 def merge_entity_state_attributes(
-    platform: str, entry: EntityEntry, entity_states: list[EntityState]
+    platform: str,
+    entry: EntityEntry,
+    entity_states: Mapping[str, EntityState] | list[EntityState],
 ) -> EntityEntry:
-    """Merge state values from an EntityEntry into a new EntityEntry."""
-    for state in entity_states:
-        if state.domain == platform and state.key == entry.key:
-            if isinstance(state.state, dict):
-                extras = state.state
-            else:
-                extras = {"state": state.state}
-            return EntityEntry(
-                key=entry.key,
-                attributes={
-                    **entry.attributes,
-                    **extras,
-                },
-            )
-    _LOGGER.debug("No state to merge: %s", entry)
-    return entry
+    """Merge state values from an EntityEntry into a new EntityEntry.
+
+    The entity states may be a mapping keyed by `domain.key`, such as
+    `DeviceState.entity_states_dict`, to avoid scanning every entity state.
+    """
+    state: EntityState | None
+    if isinstance(entity_states, list):
+        state = next(
+            (
+                state
+                for state in entity_states
+                if state.domain == platform and state.key == entry.key
+            ),
+            None,
+        )
+    else:
+        state = entity_states.get(f"{platform}.{entry.key}")
+    if state is None:
+        _LOGGER.debug("No state to merge: %s", entry)
+        return entry
+    if isinstance(state.state, dict):
+        extras = state.state
+    else:
+        extras = {"state": state.state}
+    return EntityEntry(
+        key=entry.key,
+        attributes={
+            **entry.attributes,
+            **extras,
+        },
+    )
 
 
 class EntityStateStrategy(SerializationStrategy):
@@ -186,9 +234,19 @@ class DeviceState(DataClassDictMixin):
     entity_states: list[EntityState]
     """An identifier for this set of attributes used for labeling"""
 
+    @cached_property
+    def _entity_states_index(self) -> dict[str, EntityState]:
+        """Index of entity states by `domain.key`, built on first use."""
+        return {entity.domain_key: entity for entity in self.entity_states}
+
+    @property
+    def entity_states_dict(self) -> Mapping[str, EntityState]:
+        """Get a read-only map of entity states by `domain.key`."""
+        return MappingProxyType(self._entity_states_index)
+
     def merge(self, new_state: "DeviceState") -> "DeviceState":
         """Return a new DeviceState with merged entity states."""
-        states = {entity.domain_key: entity for entity in self.entity_states}
+        states = dict(self._entity_states_index)
         for entity in new_state.entity_states:
             if entity.domain_key in states:
                 states[entity.domain_key] = states[entity.domain_key].merge(entity)
@@ -236,37 +294,90 @@ class DeviceType(DataClassDictMixin):
     )
     """Entity platforms and their entity description keys"""
 
-    @property
-    def device_states_dict(self) -> dict[str, DeviceState]:
-        """Get the predefined state by the specified key."""
+    @cached_property
+    def _device_states_index(self) -> dict[str, DeviceState]:
+        """Index of device states by name, built on first use."""
         return {state.name: state for state in self.device_states}
 
-    @property
-    def entity_dict(self) -> dict[str, EntityEntry]:
-        """Get a flat map of all entity entries."""
+    @cached_property
+    def _entity_index(self) -> dict[str, EntityEntry]:
+        """Index of entity entries by `domain.key`, built on first use."""
         return {
             f"{platform}.{entry.key}": entry
             for platform, entries in self.entities.items()
             for entry in entries
         }
 
+    @property
+    def device_states_dict(self) -> Mapping[str, DeviceState]:
+        """Get a read-only map of the predefined states by name."""
+        return MappingProxyType(self._device_states_index)
+
+    def is_device_state(self, device_state: DeviceState) -> bool:
+        """Return True if the state is one of the predefined device states.
+
+        A state decoded from a compiled home is an equal copy of the predefined
+        state, while a custom state merged from it is not.
+        """
+        predefined = self._device_states_index.get(device_state.name)
+        return predefined is device_state or predefined == device_state
+
+    @property
+    def entity_dict(self) -> Mapping[str, EntityEntry]:
+        """Get a read-only flat map of all entity entries by `domain.key`."""
+        return MappingProxyType(self._entity_index)
+
     def __post_init__(self) -> None:
         """Validate the DeviceType."""
-        entity_dict = self.entity_dict
-        for device_state in self.device_states:
-            for entity_state in device_state.entity_states:
-                if entity_state.domain_key not in entity_dict:
-                    raise ValueError(
-                        f"Device '{self.device_type}' state '{device_state.name}' references "
-                        f"invalid entity '{entity_state.domain_key}' not in {list(entity_dict.keys())}"
-                    )
+        with profiling.stage("device_type_validate"):
+            entity_dict = self._entity_index
+            for device_state in self.device_states:
+                for entity_state in device_state.entity_states:
+                    if entity_state.domain_key not in entity_dict:
+                        raise ValueError(
+                            f"Device '{self.device_type}' state '{device_state.name}' references "
+                            f"invalid entity '{entity_state.domain_key}' not in {list(entity_dict.keys())}"
+                        )
 
 
 @dataclass
 class DeviceTypeRegistry:
     """The registry of all DeviceType objects."""
 
-    device_types: dict[str, DeviceType] = field(default_factory=dict)
+    device_types: Mapping[str, DeviceType] = field(default_factory=dict)
+
+    def validate_all(self) -> None:
+        """Parse and validate every device type in the registry.
+
+        Device types in a lazily loaded registry are otherwise only validated
+        when first used.
+        """
+        for _ in self.device_types.values():
+            pass
+
+
+def _read_device_type(device_type_file: Traversable) -> DeviceType:
+    """Read and validate a single device type file."""
+    try:
+        with device_type_file.open("r") as f:
+            content = f.read()
+    except FileNotFoundError:
+        raise SyntheticHomeError(
+            f"Configuration file '{device_type_file}' does not exist"
+        )
+
+    try:
+        device_type = yaml_util.decode(content, DeviceType)
+    except MissingField as err:
+        raise SyntheticHomeError(f"Unable to decode file {device_type_file}: {err}")
+    except yaml.YAMLError as err:
+        raise SyntheticHomeError(f"Unable to decode file {device_type_file}: {err}")
+    if device_type_file.name != f"{device_type.device_type}.yaml":
+        raise SyntheticHomeError(
+            f"Device type '{device_type.device_type}' name does not match filename '{device_type_file.name}'"
+        )
+    profiling.count("device_types_loaded")
+    return device_type
 
 
 def _read_device_types(
@@ -278,36 +389,348 @@ def _read_device_types(
     for device_type_file in device_types_path.iterdir():
         if not device_type_file.name.endswith(".yaml"):
             continue
+        yield _read_device_type(device_type_file)
+
+
+@dataclass
+class _IndexEntry:
+    """A device type file in a directory index and its parsed device type."""
+
+    mtime_ns: int
+    size: int
+    device_type: DeviceType
+
+
+class _DirectoryIndex:
+    """The device type files in a registry directory.
+
+    When a cache directory is given, the index is persisted so later processes
+    can skip listing the directory while its modification time is unchanged,
+    and can reuse a parsed device type while its file's modification time and
+    size are unchanged.
+
+    The listing and each parsed device type are cached in separate files that
+    are replaced atomically, so parsing a device type only writes its own
+    entry and processes sharing the cache do not overwrite each other.
+    """
+
+    def __init__(self, path: Traversable, cache_dir: pathlib.Path | None) -> None:
+        """Initialize _DirectoryIndex."""
+        if not path.is_dir():
+            raise SyntheticHomeError(f"Registry directory '{path}' does not exist")
+        self.path = path
+        self._cache_dir: pathlib.Path | None = None
+        if cache_dir is not None and isinstance(path, pathlib.Path):
+            key = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]
+            self._cache_dir = cache_dir / f"index-{key}"
+            dir_mtime_ns = path.stat().st_mtime_ns
+            names_file = self._cache_dir / "names.pickle"
+            cached = _read_index_file(names_file)
+            if cached is not None and cached[0] == dir_mtime_ns:
+                self._names: list[str] = cached[1]
+                return
+        self._names = sorted(
+            entry.name.removesuffix(".yaml")
+            for entry in path.iterdir()
+            if entry.name.endswith(".yaml")
+        )
+        if self._cache_dir is not None:
+            _write_pickle(names_file, (INDEX_VERSION, dir_mtime_ns, self._names))
+            # Remove parsed device types for files no longer in the directory
+            names = set(self._names)
+            for entry_file in self._cache_dir.glob("*.type.pickle"):
+                if entry_file.name.removesuffix(".type.pickle") not in names:
+                    entry_file.unlink(missing_ok=True)
+
+    @property
+    def names(self) -> list[str]:
+        """The names of the device types in the directory."""
+        return self._names
+
+    def load(self, name: str) -> DeviceType:
+        """Parse the device type, or reuse it from the cache if unchanged."""
+        device_type_file = self.path.joinpath(f"{name}.yaml")
+        if self._cache_dir is None or not isinstance(device_type_file, pathlib.Path):
+            return _read_device_type(device_type_file)
         try:
-            with device_type_file.open("r") as f:
-                content = f.read()
+            stat = device_type_file.stat()
         except FileNotFoundError:
             raise SyntheticHomeError(
                 f"Configuration file '{device_type_file}' does not exist"
             )
+        entry_file = self._cache_dir / f"{name}.type.pickle"
+        if (
+            (cached := _read_index_file(entry_file)) is not None
+            and isinstance(entry := cached[0], _IndexEntry)
+            and entry.mtime_ns == stat.st_mtime_ns
+            and entry.size == stat.st_size
+        ):
+            return entry.device_type
+        device_type = _read_device_type(device_type_file)
+        _write_pickle(
+            entry_file,
+            (
+                INDEX_VERSION,
+                _IndexEntry(
+                    mtime_ns=stat.st_mtime_ns,
+                    size=stat.st_size,
+                    device_type=device_type,
+                ),
+            ),
+        )
+        return device_type
+
+
+def _read_index_file(cache_file: pathlib.Path) -> tuple[Any, ...] | None:
+    """Read a directory index file, returning None if it is missing or unusable.
+
+    The returned tuple has the values after the index version.
+    """
+    try:
+        with cache_file.open("rb") as f:
+            data = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, AttributeError, EOFError) as err:
+        _LOGGER.debug("Ignoring unreadable registry index %s: %s", cache_file, err)
+        return None
+    if not isinstance(data, tuple) or len(data) < 2 or data[0] != INDEX_VERSION:
+        _LOGGER.debug("Ignoring invalid registry index %s", cache_file)
+        return None
+    return data[1:]
+
+
+class LazyDeviceTypes(Mapping[str, DeviceType]):
+    """Device types by name, each parsed from its file on first access.
+
+    Creating the mapping only lists the device type directories. Since a device
+    type file must be named after its device type, the names are known up front
+    and a device type file is only parsed and validated when it is looked up.
+
+    When a device type is in more than one directory, the first directory in
+    the list takes precedence.
+    """
+
+    def __init__(
+        self,
+        device_types_paths: Traversable | Sequence[Traversable],
+        cache_dir: pathlib.Path | None = None,
+    ) -> None:
+        """Initialize LazyDeviceTypes."""
+        self._files: dict[str, _DirectoryIndex] = {}
+        for path in _registry_paths(device_types_paths):
+            index = _DirectoryIndex(path, cache_dir)
+            for name in index.names:
+                self._files.setdefault(name, index)
+        self._device_types: dict[str, DeviceType] = {}
+
+    def __getitem__(self, name: str) -> DeviceType:
+        """Return the device type, parsing it on first access."""
+        if (device_type := self._device_types.get(name)) is None:
+            index = self._files[name]
+            _LOGGER.debug("Loading device type %s from %s", name, index.path)
+            device_type = self._device_types[name] = index.load(name)
+        return device_type
+
+    def __contains__(self, name: object) -> bool:
+        """Return True if the device type exists, without parsing it."""
+        return name in self._files
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the device type names."""
+        return iter(self._files)
+
+    def __len__(self) -> int:
+        """Return the number of device types."""
+        return len(self._files)
+
+    def __repr__(self) -> str:
+        """Return the names of the device types, without parsing them."""
+        return f"LazyDeviceTypes({list(self._files)})"
+
+
+def _read_registry(device_types_paths: Sequence[Traversable]) -> DeviceTypeRegistry:
+    """Read and validate all device types from the yaml configuration files.
+
+    A device type in an earlier directory overrides one with the same name in
+    a later directory.
+    """
+    device_types: dict[str, DeviceType] = {}
+    for device_types_path in device_types_paths:
+        directory_types: dict[str, DeviceType] = {}
+        for device_type in _read_device_types(device_types_path):
+            if device_type.device_type in directory_types:
+                raise SyntheticHomeError(
+                    f"Device registry contains duplicate device type '{device_type.device_type}"
+                )
+            directory_types[device_type.device_type] = device_type
+        for name, device_type in directory_types.items():
+            device_types.setdefault(name, device_type)
+    return DeviceTypeRegistry(device_types=device_types)
 
-        try:
-            device_type: DeviceType = yaml_decode(content, DeviceType)
-        except MissingField as err:
-            raise SyntheticHomeError(f"Unable to decode file {device_type_file}: {err}")
-        except yaml.YAMLError as err:
-            raise SyntheticHomeError(f"Unable to decode file {device_type_file}: {err}")
-        if device_type_file.name != f"{device_type.device_type}.yaml":
-            raise SyntheticHomeError(
-                f"Device type '{device_type.device_type}' name does not match filename '{device_type_file.name}'"
-            )
 
-        yield device_type
+def _registry_paths(
+    device_types_paths: Traversable | Sequence[Traversable],
+) -> Sequence[Traversable]:
+    """Return the registry directories as a sequence."""
+    if not isinstance(device_types_paths, Sequence):
+        return [device_types_paths]
+    return device_types_paths
+
+
+def snapshot_cache_dir() -> pathlib.Path | None:
+    """Return the directory used for registry snapshots or None when disabled."""
+    if (cache_dir := os.environ.get(CACHE_DIR_ENV)) is not None:
+        return pathlib.Path(cache_dir) if cache_dir else None
+    if xdg_cache_home := os.environ.get("XDG_CACHE_HOME"):
+        return pathlib.Path(xdg_cache_home) / "synthetic_home"
+    return pathlib.Path.home() / ".cache" / "synthetic_home"
+
+
+def registry_digest(device_types_paths: Traversable | Sequence[Traversable]) -> str:
+    """Return a content hash of all device type files in the registry directories.
+
+    The digest changes whenever a device type file is added, removed or edited
+    and is used to key the registry snapshot.
+    """
+    digest = hashlib.sha256(f"v{SNAPSHOT_VERSION}".encode())
+    for device_types_path in _registry_paths(device_types_paths):
+        digest.update(b"\1")
+        for device_type_file in sorted(
+            device_types_path.iterdir(), key=lambda entry: entry.name
+        ):
+            if not device_type_file.name.endswith(".yaml"):
+                continue
+            digest.update(device_type_file.name.encode())
+            digest.update(b"\0")
+            digest.update(device_type_file.read_bytes())
+            digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _registry_key(device_types_paths: Sequence[Traversable]) -> str:
+    """Return a key for the registry directories, naming its snapshots."""
+    digest = hashlib.sha256()
+    for path in device_types_paths:
+        if isinstance(path, pathlib.Path):
+            path = path.resolve()
+        digest.update(str(path).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+def _read_snapshot(snapshot_file: pathlib.Path) -> DeviceTypeRegistry | None:
+    """Read a registry snapshot, returning None if it is missing or unusable."""
+    try:
+        with snapshot_file.open("rb") as f:
+            registry = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, pickle.UnpicklingError, AttributeError, EOFError) as err:
+        _LOGGER.debug(
+            "Ignoring unreadable registry snapshot %s: %s", snapshot_file, err
+        )
+        return None
+    if not isinstance(registry, DeviceTypeRegistry):
+        _LOGGER.debug("Ignoring invalid registry snapshot %s", snapshot_file)
+        return None
+    return registry
+
+
+def _write_pickle(cache_file: pathlib.Path, value: Any) -> bool:
+    """Write the value to the cache file atomically, ignoring failures."""
+    tmp_file = cache_file.with_name(f".{cache_file.name}.{os.getpid()}.tmp")
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with tmp_file.open("wb") as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        tmp_file.replace(cache_file)
+    except OSError as err:
+        _LOGGER.debug("Unable to write registry cache %s: %s", cache_file, err)
+        tmp_file.unlink(missing_ok=True)
+        return False
+    return True
+
+
+def _write_snapshot(snapshot_file: pathlib.Path, registry: DeviceTypeRegistry) -> None:
+    """Write the registry snapshot atomically, ignoring failures."""
+    if not _write_pickle(snapshot_file, registry):
+        return
+    # Remove snapshots for previous versions of the same registry directories
+    registry_key = snapshot_file.name.split("-")[1]
+    for stale_file in snapshot_file.parent.glob(f"registry-{registry_key}-*.pickle"):
+        if stale_file != snapshot_file:
+            stale_file.unlink(missing_ok=True)
+
+
+def load_registry_snapshot(
+    device_types_paths: Traversable
+    | Sequence[Traversable] = DEVICE_TYPES_RESOURCE_PATH,
+    cache_dir: pathlib.Path | None = None,
+) -> DeviceTypeRegistry:
+    """Load every device type using a precompiled snapshot when possible.
+
+    The snapshot is keyed by the registry directories and a content hash of
+    their files, and is rebuilt from the yaml files whenever a file changes.
+    As with `load_lazy_registry`, a device type in an earlier directory
+    overrides one with the same name in a later directory.
+    """
+    paths = _registry_paths(device_types_paths)
+    if cache_dir is None:
+        return _read_registry(paths)
+    snapshot_file = (
+        cache_dir / f"registry-{_registry_key(paths)}-{registry_digest(paths)}.pickle"
+    )
+    if (registry := _read_snapshot(snapshot_file)) is not None:
+        _LOGGER.debug("Loaded device type registry snapshot %s", snapshot_file)
+        return registry
+    registry = _read_registry(paths)
+    _write_snapshot(snapshot_file, registry)
+    return registry
+
+
+def registry_search_paths() -> list[Traversable]:
+    """Return the device type directories in the order they are searched.
+
+    These are the directories in `SYNTHETIC_HOME_REGISTRY_PATH` followed by the
+    packaged registry.
+    """
+    paths: list[Traversable] = [
+        pathlib.Path(path)
+        for path in os.environ.get(REGISTRY_PATH_ENV, "").split(os.pathsep)
+        if path
+    ]
+    paths.append(DEVICE_TYPES_RESOURCE_PATH)
+    return paths
+
+
+def load_lazy_registry(
+    device_types_paths: Traversable
+    | Sequence[Traversable] = DEVICE_TYPES_RESOURCE_PATH,
+    cache_dir: pathlib.Path | None = None,
+) -> DeviceTypeRegistry:
+    """Load a registry that parses each device type when first used.
+
+    When given several directories, a device type in an earlier directory
+    overrides one with the same name in a later directory. When a cache
+    directory is given, each directory is indexed there so unchanged device
+    types are not parsed again by later processes.
+
+    Errors in a device type file are raised when the device type is first
+    used, or by `DeviceTypeRegistry.validate_all`.
+    """
+    return DeviceTypeRegistry(
+        device_types=LazyDeviceTypes(device_types_paths, cache_dir)
+    )
 
 
 @cache
 def load_device_type_registry() -> DeviceTypeRegistry:
-    """Load device types from the yaml configuration files."""
-    device_types = {}
-    for device_type in _read_device_types(DEVICE_TYPES_RESOURCE_PATH):
-        if device_type.device_type in device_types:
-            raise SyntheticHomeError(
-                f"Device registry contains duplicate device type '{device_type.device_type}"
-            )
-        device_types[device_type.device_type] = device_type
-    return DeviceTypeRegistry(device_types=device_types)
+    """Load device types from the yaml configuration files.
+
+    The directories in `SYNTHETIC_HOME_REGISTRY_PATH` are searched before the
+    packaged registry. Each device type is parsed and validated when first
+    used. Use `load_registry_snapshot` to load every device type up front, as
+    `list_device_types` does when listing every device type.
+    """
+    return load_lazy_registry(registry_search_paths(), snapshot_cache_dir())
@@ -0,0 +1,309 @@
+"""Compute and apply the differences between two inventories.
+
+A patch describes how to turn a base inventory into a target inventory. Areas,
+devices and entities are matched by id, and for each kind the patch lists the
+records that were added, the ids that were removed, and the fields that
+changed for each id. Entity attributes are compared key by key, so only the
+attributes that changed are listed along with the keys that were removed:
+
+```yaml
+---
+entities:
+  changed:
+    light.kitchen_light:
+      state: 'on'
+      attributes:
+        brightness: 255
+      removed_attributes:
+      - color_temp
+  removed:
+  - sensor.old_sensor
+```
+
+A dataset can then store one base inventory and a small patch for each
+variation or snapshot, instead of a full copy of each inventory.
+
+```python
+patch = diff.diff_inventory(base, target)
+inv = diff.apply_patch(base, patch)
+```
+
+Changing the order of records is not considered a change. Applying a patch
+keeps the order of the base inventory and appends added records at the end.
+Since records are matched by id, inventories with duplicate ids can not be
+diffed or patched.
+"""
+
+import io
+import pathlib
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from typing import Any, TextIO
+
+from mashumaro import DataClassDictMixin
+
+from . import inventory, yaml_util
+from .exceptions import SyntheticHomeError
+
+__all__ = [
+    "SectionPatch",
+    "InventoryPatch",
+    "diff_inventory",
+    "apply_patch",
+    "write_patch",
+    "decode_patch",
+    "load_patch",
+]
+
+
+@dataclass
+class SectionPatch(DataClassDictMixin):
+    """The changes to the areas, devices or entities of an inventory."""
+
+    added: list[dict[str, Any]] = field(default_factory=list)
+    """The records that are only in the target inventory."""
+
+    removed: list[str] = field(default_factory=list)
+    """The ids of the records that are only in the base inventory."""
+
+    changed: dict[str, dict[str, Any]] = field(default_factory=dict)
+    """The new value of each changed field by id, where None removes the field.
+
+    The `attributes` of a record that already has attributes only contains the
+    attributes that changed, and `removed_attributes` the removed attribute keys.
+    """
+
+    def __bool__(self) -> bool:
+        """Return True if there are any changes."""
+        return bool(self.added or self.removed or self.changed)
+
+
+@dataclass
+class InventoryPatch(DataClassDictMixin):
+    """The changes that turn a base inventory into a target inventory."""
+
+    language: str | None = None
+    """The language of the target inventory, when it changed."""
+
+    remove_language: bool = False
+    """True when the target inventory has no language but the base inventory does."""
+
+    areas: SectionPatch = field(default_factory=SectionPatch)
+
+    devices: SectionPatch = field(default_factory=SectionPatch)
+
+    entities: SectionPatch = field(default_factory=SectionPatch)
+
+    def __bool__(self) -> bool:
+        """Return True if there are any changes."""
+        return bool(
+            self.language is not None
+            or self.remove_language
+            or self.areas
+            or self.devices
+            or self.entities
+        )
+
+    def yaml(self) -> str:
+        """Render the patch as yaml."""
+        buf = io.StringIO()
+        write_patch(self, buf)
+        return buf.getvalue()
+
+
+_Record = inventory.Area | inventory.Device | inventory.Entity
+
+_ATTRIBUTES = "attributes"
+_REMOVED_ATTRIBUTES = "removed_attributes"
+
+
+def _records_by_id[T: _Record](name: str, records: list[T]) -> dict[str, T]:
+    """Return the records by id, which must be unique."""
+    records_by_id = {str(record.id): record for record in records}
+    if len(records_by_id) != len(records):
+        counts = Counter(str(record.id) for record in records)
+        duplicates = sorted(record_id for record_id, n in counts.items() if n > 1)
+        raise SyntheticHomeError(f"Inventory has duplicate {name} ids {duplicates}")
+    return records_by_id
+
+
+def _diff_record(base: dict[str, Any], target: dict[str, Any]) -> dict[str, Any]:
+    """Return the fields that changed between two records."""
+    changes = {
+        key: target.get(key)
+        for key in [*target, *(key for key in base if key not in target)]
+        if base.get(key) != target.get(key)
+    }
+    base_attributes = base.get(_ATTRIBUTES)
+    attributes = changes.get(_ATTRIBUTES)
+    if isinstance(base_attributes, dict) and isinstance(attributes, dict):
+        del changes[_ATTRIBUTES]
+        if changed := {
+            key: value
+            for key, value in attributes.items()
+            if key not in base_attributes or base_attributes[key] != value
+        }:
+            changes[_ATTRIBUTES] = changed
+        if removed := [key for key in base_attributes if key not in attributes]:
+            changes[_REMOVED_ATTRIBUTES] = removed
+    return changes
+
+
+def _diff_section(name: str, base: list[Any], target: list[Any]) -> SectionPatch:
+    """Return the changes between two lists of records."""
+    base_records = {
+        record_id: record.to_dict(omit_none=True)
+        for record_id, record in _records_by_id(name, base).items()
+    }
+    target_records = {
+        record_id: record.to_dict(omit_none=True)
+        for record_id, record in _records_by_id(name, target).items()
+    }
+    patch = SectionPatch()
+    for record_id, record in target_records.items():
+        if (base_record := base_records.get(record_id)) is None:
+            patch.added.append(record)
+        elif record != base_record:
+            patch.changed[record_id] = _diff_record(base_record, record)
+    patch.removed = [
+        record_id for record_id in base_records if record_id not in target_records
+    ]
+    return patch
+
+
+def diff_inventory(
+    base: inventory.Inventory, target: inventory.Inventory
+) -> InventoryPatch:
+    """Return the patch that turns the base inventory into the target inventory."""
+    return InventoryPatch(
+        language=target.language if target.language != base.language else None,
+        remove_language=target.language is None and base.language is not None,
+        areas=_diff_section("area", base.areas, target.areas),
+        devices=_diff_section("device", base.devices, target.devices),
+        entities=_diff_section("entity", base.entities, target.entities),
+    )
+
+
+def _apply_record(record: dict[str, Any], changes: dict[str, Any]) -> dict[str, Any]:
+    """Return the record with the changed fields applied."""
+    changes = dict(changes)
+    removed_attributes = changes.pop(_REMOVED_ATTRIBUTES, [])
+    attributes = record.get(_ATTRIBUTES)
+    changed_attributes = changes.get(_ATTRIBUTES, {})
+    if isinstance(attributes, dict) and isinstance(changed_attributes, dict):
+        changes[_ATTRIBUTES] = {
+            **{
+                key: value
+                for key, value in attributes.items()
+                if key not in removed_attributes
+            },
+            **changed_attributes,
+        }
+    data = {**record, **changes}
+    return {key: value for key, value in data.items() if value is not None}
+
+
+def _apply_section[T: _Record](
+    name: str,
+    from_dict: Callable[[dict[str, Any]], T],
+    base: list[T],
+    patch: SectionPatch,
+) -> list[T]:
+    """Return the records with the changes applied."""
+    records = _records_by_id(name, base)
+    for record_id in patch.removed:
+        if records.pop(record_id, None) is None:
+            raise SyntheticHomeError(
+                f"Patch removes {name} '{record_id}' which is not in the inventory"
+            )
+    for record_id, changes in patch.changed.items():
+        if (record := records.get(record_id)) is None:
+            raise SyntheticHomeError(
+                f"Patch changes {name} '{record_id}' which is not in the inventory"
+            )
+        records[record_id] = from_dict(
+            _apply_record(record.to_dict(omit_none=True), changes)
+        )
+    for data in patch.added:
+        added = from_dict(data)
+        if str(added.id) in records:
+            raise SyntheticHomeError(
+                f"Patch adds {name} '{added.id}' which is already in the inventory"
+            )
+        records[str(added.id)] = added
+    return list(records.values())
+
+
+def apply_patch(
+    base: inventory.Inventory, patch: InventoryPatch
+) -> inventory.Inventory:
+    """Return a new inventory with the patch applied to the base inventory.
+
+    Records that are not changed by the patch are shared with the base
+    inventory.
+    """
+    if patch.remove_language and patch.language is not None:
+        raise SyntheticHomeError("Patch both changes and removes the language")
+    language = base.language
+    if patch.remove_language:
+        language = None
+    elif patch.language is not None:
+        language = patch.language
+    return inventory.Inventory(
+        language=language,
+        areas=_apply_section("area", inventory.Area.from_dict, base.areas, patch.areas),
+        devices=_apply_section(
+            "device", inventory.Device.from_dict, base.devices, patch.devices
+        ),
+        entities=_apply_section(
+            "entity", inventory.Entity.from_dict, base.entities, patch.entities
+        ),
+    )
+
+
+def write_patch(patch: InventoryPatch, stream: TextIO) -> None:
+    """Write the patch as a yaml document, omitting sections without changes."""
+    data: dict[str, Any] = {}
+    if patch.language is not None:
+        data["language"] = patch.language
+    if patch.remove_language:
+        data["remove_language"] = True
+    for key, section in (
+        ("areas", patch.areas),
+        ("devices", patch.devices),
+        ("entities", patch.entities),
+    ):
+        if not section:
+            continue
+        data[key] = {
+            name: value
+            for name, value in (
+                ("added", section.added),
+                ("removed", section.removed),
+                ("changed", section.changed),
+            )
+            if value
+        }
+    stream.write("---\n")
+    if data:
+        stream.write(yaml_util.dump(data))
+
+
+def decode_patch(content: str) -> InventoryPatch:
+    """Decode a patch from yaml."""
+    if (data := yaml_util.load(content)) is None:
+        return InventoryPatch()
+    return InventoryPatch.from_dict(data)
+
+
+def load_patch(patch_file: pathlib.Path) -> InventoryPatch:
+    """Load a patch from a yaml file on disk."""
+    try:
+        content = patch_file.read_text()
+    except FileNotFoundError:
+        raise SyntheticHomeError(f"Patch file '{patch_file}' does not exist")
+    try:
+        return decode_patch(content)
+    except ValueError as err:
+        raise SyntheticHomeError(f"Could not parse patch file '{patch_file}': {err}")
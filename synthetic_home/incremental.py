@@ -0,0 +1,188 @@
+"""Incremental rebuilds of a home inventory.
+
+When a synthetic home is edited, typically only a few devices change. The
+`IncrementalInventoryBuilder` remembers the devices from the previous build and
+only rebuilds the entities for devices that were added or changed, patching the
+previous inventory in place.
+
+Given a `SyntheticHomeConfig` as read from disk, devices are compared before
+their device states are resolved, so an unchanged device costs about as much
+as comparing its config entry.
+"""
+
+import logging
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Any
+
+from . import inventory
+from .device_types import DeviceState, DeviceType, DeviceTypeRegistry
+from .synthetic_home import (
+    Device,
+    SyntheticHome,
+    SyntheticHomeConfig,
+    build_device_state,
+    build_entities,
+    home_devices,
+    load_device_type_registry,
+)
+
+__all__ = [
+    "IncrementalInventoryBuilder",
+    "BuildResult",
+]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass
+class _DeviceRecord:
+    """A device from a previous build and the inventory objects built for it."""
+
+    source: tuple[Any, ...]
+    """The device entry before it was renamed and its device state resolved."""
+
+    device_type: DeviceType | None
+    """The device type the entities were built from."""
+
+    device: inventory.Device
+    """The inventory device built for the device entry."""
+
+    entities: list[inventory.Entity]
+    """The inventory entities built for the device entry."""
+
+
+@dataclass
+class BuildResult:
+    """The result of an incremental inventory build."""
+
+    inventory: inventory.Inventory
+    """The inventory for the home, patched in place on each build."""
+
+    rebuilt: list[str] = field(default_factory=list)
+    """The ids of devices that were added or changed and rebuilt."""
+
+    removed: list[str] = field(default_factory=list)
+    """The ids of devices that are no longer in the home."""
+
+    reused: int = 0
+    """The number of unchanged devices reused from the previous build."""
+
+    changed: bool = False
+    """True if the inventory changed since the previous build."""
+
+
+def _source(
+    name: str, device_entry: Device, device_type: DeviceType | None
+) -> tuple[Any, ...]:
+    """Return the parts of the device entry that its entities are built from.
+
+    A device state of the device type is compared by name, so the resolved
+    entity entries of a built device are never compared.
+    """
+    device_state = device_entry.device_state
+    if (
+        isinstance(device_state, DeviceState)
+        and device_type is not None
+        and device_type.is_device_state(device_state)
+    ):
+        device_state = device_state.name
+    return (name, device_entry.device_type, device_entry.device_info, device_state)
+
+
+class IncrementalInventoryBuilder:
+    """Builds an inventory for a synthetic home reusing the previous build.
+
+    Each device is keyed by its area and name. A device is reused when its
+    config entry, device type, and resulting inventory device (which includes
+    the de-duplicated id) are all unchanged since the previous build.
+    """
+
+    def __init__(self) -> None:
+        """Initialize IncrementalInventoryBuilder."""
+        self._inventory = inventory.Inventory()
+        self._records: dict[tuple[str | None, str, int], _DeviceRecord] = {}
+
+    @property
+    def inventory(self) -> inventory.Inventory:
+        """The inventory from the most recent build."""
+        return self._inventory
+
+    def build(
+        self,
+        home: SyntheticHome | SyntheticHomeConfig,
+        device_type_registry: DeviceTypeRegistry | None = None,
+    ) -> BuildResult:
+        """Build the inventory for the home, rebuilding only changed devices.
+
+        The devices of a `SyntheticHomeConfig` are only built when changed,
+        using the registry or the default registry when not specified.
+        """
+        registry = device_type_registry
+        if registry is None and isinstance(home, SyntheticHome):
+            registry = home.device_type_registry
+        if registry is None:
+            registry = load_device_type_registry()
+        result = BuildResult(inventory=self._inventory)
+        records: dict[tuple[str | None, str, int], _DeviceRecord] = {}
+        areas: list[inventory.Area] = []
+        devices: list[inventory.Device] = []
+        entities: list[inventory.Entity] = []
+        occurrences: Counter[tuple[str | None, str]] = Counter()
+        # Whether each device type is the same as in the previous build
+        same_types: dict[str, bool] = {}
+        for home_device in home_devices(home, areas):
+            name_key = (home_device.area_name, home_device.name)
+            key = (*name_key, occurrences[name_key])
+            occurrences[name_key] += 1
+            device_entry = home_device.entry
+            device_type_name = device_entry.device_type or ""
+            device_type = registry.device_types.get(device_type_name)
+            source = _source(home_device.name, device_entry, device_type)
+            device = home_device.device
+            previous = self._records.get(key)
+            if previous is not None and device_type_name not in same_types:
+                same_types[device_type_name] = (
+                    previous.device_type is device_type
+                    or previous.device_type == device_type
+                )
+            if (
+                previous is not None
+                and previous.source == source
+                and previous.device == device
+                and same_types[device_type_name]
+            ):
+                record = previous
+                result.reused += 1
+            else:
+                _LOGGER.debug("Rebuilding device %s", device.id)
+                if isinstance(home, SyntheticHomeConfig):
+                    device_entry = build_device_state(device_entry, registry)
+                record = _DeviceRecord(
+                    source=source,
+                    device_type=device_type,
+                    device=device,
+                    entities=build_entities(home_device.area_id, device_entry),
+                )
+                result.rebuilt.append(str(device.id))
+            records[key] = record
+            devices.append(record.device)
+            entities.extend(record.entities)
+
+        result.removed = [
+            str(record.device.id)
+            for key, record in self._records.items()
+            if key not in records
+        ]
+        result.changed = bool(
+            result.rebuilt
+            or result.removed
+            or areas != self._inventory.areas
+            or [device.id for device in devices]
+            != [device.id for device in self._inventory.devices]
+        )
+        self._records = records
+        self._inventory.areas[:] = areas
+        self._inventory.devices[:] = devices
+        self._inventory.entities[:] = entities
+        return result
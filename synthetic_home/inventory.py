@@ -1,34 +1,73 @@
 """Data model for the lower level inventory of a home, usable for fixtures and evaluations."""
 
+import io
+import itertools
 import logging
 import pathlib
+import re
+from collections.abc import Generator, Iterable, Mapping
 from dataclasses import dataclass, field
-from typing import Any, ClassVar
+from functools import lru_cache
+from types import MappingProxyType
+from typing import Any, ClassVar, TextIO
 
 import slugify
-import yaml
-from mashumaro.codecs.yaml import yaml_decode
 from mashumaro.config import BaseConfig
-from mashumaro.mixins.yaml import DataClassYAMLMixin, EncodedData
+from mashumaro.mixins.yaml import DataClassYAMLMixin
 
-from . import common
+from . import common, profiling, yaml_util
 from .exceptions import SyntheticHomeError
 
 __all__ = [
     "Inventory",
+    "InventoryIndex",
     "load_inventory",
+    "decode_inventories",
+    "write_inventory",
+    "write_inventories",
     "Area",
     "Device",
     "Entity",
+    "slugify_id",
 ]
 
 _LOGGER = logging.getLogger(__name__)
 
 DEFAULT_SEPARATOR = "_"
 
+SLUGIFY_CACHE_SIZE = 16384
+"""The maximum number of names held in the `slugify_id` cache."""
 
-def _custom_encoder(data: dict[str, Any]) -> EncodedData:
-    return yaml.safe_dump(data, sort_keys=False, explicit_start=True)  # type: ignore[no-any-return]
+# Characters that python-slugify treats specially before replacing everything
+# that is not a letter or digit: quotes, html entities and digit separators
+_SLUGIFY_SPECIAL = re.compile(r"[&',]")
+_NON_ALPHANUMERIC = re.compile(r"[^a-z0-9]+")
+
+# Number of areas, devices or entities rendered to yaml at a time when streaming
+_STREAM_BATCH_SIZE = 256
+
+
+@lru_cache(maxsize=SLUGIFY_CACHE_SIZE)
+def _slugify_id(name: str) -> str:
+    """Return the id for the name, computed on a cache miss."""
+    profiling.count("slugify_misses")
+    if name.isascii() and not _SLUGIFY_SPECIAL.search(name):
+        # For these names slugify only lowercases and replaces each run of
+        # other characters with the separator
+        return _NON_ALPHANUMERIC.sub(DEFAULT_SEPARATOR, name.lower()).strip(
+            DEFAULT_SEPARATOR
+        )
+    return slugify.slugify(name, separator=DEFAULT_SEPARATOR)
+
+
+def slugify_id(name: str) -> str:
+    """Return the id for a human readable name e.g. 'Living Room' is 'living_room'.
+
+    This is identical to `slugify.slugify(name, separator="_")`, but recently
+    used names are cached and plain ascii names skip unicode normalization.
+    """
+    profiling.count("slugify_calls")
+    return _slugify_id(name)
 
 
 @dataclass
@@ -47,7 +86,7 @@ class Area(DataClassYAMLMixin):
     def __post_init__(self) -> None:
         """Validate the area."""
         if self.id is None:
-            self.id = slugify.slugify(self.name, separator=DEFAULT_SEPARATOR)
+            self.id = slugify_id(self.name)
 
     class Config(BaseConfig):
         code_generation_options: ClassVar[list[str]] = ["TO_DICT_ADD_OMIT_NONE_FLAG"]
@@ -77,7 +116,7 @@ class Device(DataClassYAMLMixin):
     def __post_init__(self) -> None:
         """Validate the device."""
         if self.id is None:
-            self.id = slugify.slugify(self.name, separator=DEFAULT_SEPARATOR)
+            self.id = slugify_id(self.name)
 
 
 @dataclass
@@ -130,7 +169,9 @@ class Inventory(DataClassYAMLMixin):
 
     def yaml(self) -> str:
         """Render the inventory as yaml."""
-        return str(self.to_yaml(omit_none=True, encoder=_custom_encoder))
+        buf = io.StringIO()
+        write_inventory(self, buf)
+        return buf.getvalue()
 
     @property
     def floors(self) -> set[str]:
@@ -150,6 +191,316 @@ class Inventory(DataClassYAMLMixin):
         sort_keys = False
 
 
+def _domain(entity_id: str) -> str:
+    """Return the domain of the entity id."""
+    return entity_id.split(".", 1)[0]
+
+
+class InventoryIndex:
+    """An index over an inventory for fast lookups.
+
+    The index is built once over the inventory, then kept up to date by making
+    changes to the inventory through the index. Changes made directly to the
+    inventory lists require a call to `rebuild`.
+
+    An entity is in the area it was assigned, or otherwise the area of its
+    device, matching how Home Assistant resolves entity areas. Entities are
+    on the floor of their area.
+    """
+
+    def __init__(self, inventory: Inventory) -> None:
+        """Initialize InventoryIndex."""
+        self._inventory = inventory
+        self._areas: dict[str, Area] = {}
+        self._devices: dict[str, Device] = {}
+        self._entities: dict[str, Entity] = {}
+        self._floor_areas: dict[str, dict[str, Area]] = {}
+        self._area_devices: dict[str, dict[str, Device]] = {}
+        self._area_entities: dict[str | None, dict[str, Entity]] = {}
+        self._device_entities: dict[str, dict[str, Entity]] = {}
+        self._domain_entities: dict[str, dict[str, Entity]] = {}
+        self._area_domain_entities: dict[tuple[str | None, str], dict[str, Entity]] = {}
+        # The area each entity is indexed under
+        self._entity_areas: dict[str, str | None] = {}
+        self.rebuild()
+
+    @property
+    def inventory(self) -> Inventory:
+        """The indexed inventory."""
+        return self._inventory
+
+    def rebuild(self) -> None:
+        """Rebuild the index from the inventory."""
+        for index in (
+            self._areas,
+            self._devices,
+            self._entities,
+            self._floor_areas,
+            self._area_devices,
+            self._area_entities,
+            self._device_entities,
+            self._domain_entities,
+            self._area_domain_entities,
+            self._entity_areas,
+        ):
+            index.clear()
+        for area in self._inventory.areas:
+            self._index_area(area)
+        for device in self._inventory.devices:
+            self._index_device(device)
+        for entity in self._inventory.entities:
+            self._index_entity(entity)
+
+    def _index_area(self, area: Area) -> None:
+        """Add the area to the index."""
+        if area.id is None:
+            return
+        self._areas[area.id] = area
+        if area.floor is not None:
+            self._floor_areas.setdefault(area.floor, {})[area.id] = area
+
+    def _unindex_area(self, area: Area) -> None:
+        """Remove the area from the index."""
+        if area.id is None:
+            return
+        del self._areas[area.id]
+        if area.floor is not None:
+            _discard(self._floor_areas, area.floor, area.id)
+
+    def _index_device(self, device: Device) -> None:
+        """Add the device to the index."""
+        if device.id is None:
+            return
+        self._devices[device.id] = device
+        if device.area is not None:
+            self._area_devices.setdefault(device.area, {})[device.id] = device
+
+    def _unindex_device(self, device: Device) -> None:
+        """Remove the device from the index."""
+        if device.id is None:
+            return
+        del self._devices[device.id]
+        if device.area is not None:
+            _discard(self._area_devices, device.area, device.id)
+
+    def _entity_area(self, entity: Entity) -> str | None:
+        """Return the area of the entity, inherited from its device if not set."""
+        if entity.area is not None:
+            return entity.area
+        if entity.device is not None and (device := self._devices.get(entity.device)):
+            return device.area
+        return None
+
+    def _index_entity(self, entity: Entity) -> None:
+        """Add the entity to the index."""
+        entity_id = str(entity.id)
+        area_id = self._entity_area(entity)
+        domain = _domain(entity_id)
+        self._entities[entity_id] = entity
+        self._entity_areas[entity_id] = area_id
+        self._area_entities.setdefault(area_id, {})[entity_id] = entity
+        self._domain_entities.setdefault(domain, {})[entity_id] = entity
+        self._area_domain_entities.setdefault((area_id, domain), {})[entity_id] = entity
+        if entity.device is not None:
+            self._device_entities.setdefault(entity.device, {})[entity_id] = entity
+
+    def _unindex_entity(self, entity: Entity) -> None:
+        """Remove the entity from the index."""
+        entity_id = str(entity.id)
+        area_id = self._entity_areas.pop(entity_id)
+        domain = _domain(entity_id)
+        del self._entities[entity_id]
+        _discard(self._area_entities, area_id, entity_id)
+        _discard(self._domain_entities, domain, entity_id)
+        _discard(self._area_domain_entities, (area_id, domain), entity_id)
+        if entity.device is not None:
+            _discard(self._device_entities, entity.device, entity_id)
+
+    def add_area(self, area: Area) -> None:
+        """Add an area to the inventory, replacing an area with the same id."""
+        if area.id is not None and (existing := self._areas.get(area.id)):
+            self._unindex_area(existing)
+            self._inventory.areas.remove(existing)
+        self._inventory.areas.append(area)
+        self._index_area(area)
+
+    def remove_area(self, area_id: str) -> Area:
+        """Remove the area from the inventory and return it.
+
+        Devices and entities that reference the area are kept and still
+        returned for its id by `area_devices` and `area_entities`.
+        """
+        if (area := self._areas.get(area_id)) is None:
+            raise SyntheticHomeError(f"Area '{area_id}' is not in the inventory")
+        self._unindex_area(area)
+        self._inventory.areas.remove(area)
+        return area
+
+    def add_device(self, device: Device) -> None:
+        """Add a device to the inventory, replacing a device with the same id."""
+        if device.id is not None and (existing := self._devices.get(device.id)):
+            self._unindex_device(existing)
+            self._inventory.devices.remove(existing)
+        self._inventory.devices.append(device)
+        self._index_device(device)
+        if device.id is not None:
+            self._reindex_device_entities(device.id)
+
+    def remove_device(self, device_id: str) -> Device:
+        """Remove the device from the inventory and return it.
+
+        The entities of the device are kept, and those without their own area
+        are then in no area.
+        """
+        if (device := self._devices.get(device_id)) is None:
+            raise SyntheticHomeError(f"Device '{device_id}' is not in the inventory")
+        self._unindex_device(device)
+        self._inventory.devices.remove(device)
+        self._reindex_device_entities(device_id)
+        return device
+
+    def _reindex_device_entities(self, device_id: str) -> None:
+        """Index the entities of the device again after the device changed."""
+        # Entities without an area follow the area of their device
+        for entity in list(self._device_entities.get(device_id, {}).values()):
+            self._unindex_entity(entity)
+            self._index_entity(entity)
+
+    def add_entity(self, entity: Entity) -> None:
+        """Add an entity to the inventory, replacing an entity with the same id."""
+        if str(entity.id) in self._entities:
+            self.remove_entity(str(entity.id))
+        self._inventory.entities.append(entity)
+        self._index_entity(entity)
+
+    def remove_entity(self, entity_id: str) -> Entity:
+        """Remove the entity from the inventory and return it."""
+        if (entity := self._entities.get(entity_id)) is None:
+            raise SyntheticHomeError(f"Entity '{entity_id}' is not in the inventory")
+        self._unindex_entity(entity)
+        self._inventory.entities.remove(entity)
+        return entity
+
+    @property
+    def floors(self) -> set[str]:
+        """Return the set of floors across all areas."""
+        return set(self._floor_areas)
+
+    def area_dict(self) -> Mapping[str, Area]:
+        """Read-only map of areas by area id."""
+        return MappingProxyType(self._areas)
+
+    def device_dict(self) -> Mapping[str, Device]:
+        """Read-only map of devices by device id."""
+        return MappingProxyType(self._devices)
+
+    def entity_dict(self) -> Mapping[str, Entity]:
+        """Read-only map of entities by entity id."""
+        return MappingProxyType(self._entities)
+
+    def area(self, area_id: str) -> Area | None:
+        """Return the area with the id."""
+        return self._areas.get(area_id)
+
+    def device(self, device_id: str) -> Device | None:
+        """Return the device with the id."""
+        return self._devices.get(device_id)
+
+    def entity(self, entity_id: str) -> Entity | None:
+        """Return the entity with the id."""
+        return self._entities.get(entity_id)
+
+    def floor_areas(self, floor: str) -> list[Area]:
+        """Return the areas on the floor."""
+        return list(self._floor_areas.get(floor, {}).values())
+
+    def area_devices(self, area_id: str) -> list[Device]:
+        """Return the devices in the area."""
+        return list(self._area_devices.get(area_id, {}).values())
+
+    def area_entities(
+        self, area_id: str | None, domain: str | None = None
+    ) -> list[Entity]:
+        """Return the entities in the area, or in no area when None.
+
+        The entities can be limited to a domain e.g. all `light` entities
+        in an area.
+        """
+        if domain is None:
+            return list(self._area_entities.get(area_id, {}).values())
+        return list(self._area_domain_entities.get((area_id, domain), {}).values())
+
+    def device_entities(self, device_id: str) -> list[Entity]:
+        """Return the entities of the device."""
+        return list(self._device_entities.get(device_id, {}).values())
+
+    def domain_entities(self, domain: str) -> list[Entity]:
+        """Return the entities in the domain."""
+        return list(self._domain_entities.get(domain, {}).values())
+
+    def floor_entities(self, floor: str, domain: str | None = None) -> list[Entity]:
+        """Return the entities in the areas on the floor."""
+        return [
+            entity
+            for area_id in self._floor_areas.get(floor, {})
+            for entity in self.area_entities(area_id, domain)
+        ]
+
+
+def _discard[K](index: dict[K, dict[str, Any]], key: K, item_id: str) -> None:
+    """Remove an item from an index bucket, dropping the bucket when empty."""
+    if (bucket := index.get(key)) is None:
+        return
+    bucket.pop(item_id, None)
+    if not bucket:
+        del index[key]
+
+
+def write_inventory(inventory: Inventory, stream: TextIO) -> None:
+    """Write the inventory as a yaml document to the stream.
+
+    The areas, devices and entities are rendered and written in small batches
+    so the full document is never held in memory.
+    """
+    with profiling.stage("yaml_encode"):
+        _write_inventory(inventory, stream)
+
+
+def _write_inventory(inventory: Inventory, stream: TextIO) -> None:
+    """Write the inventory as a yaml document to the stream."""
+    stream.write("---\n")
+    if inventory.language is not None:
+        stream.write(yaml_util.dump({"language": inventory.language}))
+    sections: list[tuple[str, list[Area] | list[Device] | list[Entity]]] = [
+        ("areas", inventory.areas),
+        ("devices", inventory.devices),
+        ("entities", inventory.entities),
+    ]
+    for key, items in sections:
+        if not items:
+            stream.write(f"{key}: []\n")
+            continue
+        stream.write(f"{key}:\n")
+        stream.writelines(
+            yaml_util.dump([item.to_dict(omit_none=True) for item in batch])
+            for batch in itertools.batched(items, _STREAM_BATCH_SIZE)
+        )
+
+
+def write_inventories(inventories: Iterable[Inventory], stream: TextIO) -> None:
+    """Write a multi-document yaml stream with one document per inventory."""
+    for inventory in inventories:
+        write_inventory(inventory, stream)
+
+
+def decode_inventories(content: str | TextIO) -> Generator[Inventory]:
+    """Decode each inventory in a multi-document yaml stream as it is read."""
+    for data in yaml_util.load_all(content):
+        if data is None:
+            continue
+        yield Inventory.from_dict(data)
+
+
 def read_config_content(config_file: pathlib.Path) -> str:
     """Create configuration file content, exposed for patching."""
     with config_file.open("r") as f:
@@ -158,7 +509,7 @@ def read_config_content(config_file: pathlib.Path) -> str:
 
 def decode_inventory(content: str) -> Inventory:
     """Load synthetic home configuration from disk."""
-    return yaml_decode(content, Inventory)
+    return yaml_util.decode(content, Inventory)
 
 
 def load_inventory(config_file: pathlib.Path) -> Inventory:
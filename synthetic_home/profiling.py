@@ -0,0 +1,156 @@
+"""Opt-in instrumentation of the stages of building a synthetic home.
+
+When a home build is slow, profiling records how long is spent in each stage
+such as yaml decoding, device type validation, building device states and yaml
+encoding, along with counters such as the number of devices built and device
+state cache hits.
+
+```python
+with profiling.profile() as prof:
+    home = synthetic_home.load_synthetic_home(path)
+    inv = synthetic_home.build_inventory(home)
+prof.write_json(pathlib.Path("profile.json"))
+```
+
+Profiling can also collect a `cProfile` profile of every function call, which
+can be written as a `pstats` dump and inspected with tools like `snakeviz`.
+
+Stage timings include the time spent in nested stages, e.g. device type
+validation happens while decoding the device type yaml. When profiling is not
+active, instrumented code only pays for a global variable check.
+"""
+
+import cProfile
+import json
+import pathlib
+import time
+from collections import Counter
+from collections.abc import Generator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
+from dataclasses import dataclass
+from typing import Any
+
+from .exceptions import SyntheticHomeError
+
+__all__ = [
+    "Profile",
+    "StageStats",
+    "profile",
+    "stage",
+    "count",
+]
+
+
+@dataclass
+class StageStats:
+    """Timing of a stage across all of the times it was entered."""
+
+    calls: int = 0
+    """The number of times the stage was entered."""
+
+    total: float = 0.0
+    """The total seconds spent in the stage, including nested stages."""
+
+
+class Profile:
+    """Stage timings and counters recorded while profiling is active."""
+
+    def __init__(self, cprofile: bool = False) -> None:
+        """Initialize Profile."""
+        self.stages: dict[str, StageStats] = {}
+        self.counters: Counter[str] = Counter()
+        self.profiler: cProfile.Profile | None = (
+            cProfile.Profile() if cprofile else None
+        )
+
+    def to_dict(self) -> dict[str, Any]:
+        """Return the stage timings and counters as a dictionary."""
+        return {
+            "stages": {
+                name: {"calls": stats.calls, "total_ms": stats.total * 1000}
+                for name, stats in sorted(
+                    self.stages.items(), key=lambda item: -item[1].total
+                )
+            },
+            "counters": dict(sorted(self.counters.items())),
+        }
+
+    def report(self) -> str:
+        """Return a human readable summary of the stage timings and counters."""
+        lines = [f"{'stage':<24} {'calls':>8} {'total ms':>10}"]
+        for name, stats in self.to_dict()["stages"].items():
+            lines.append(f"{name:<24} {stats['calls']:>8} {stats['total_ms']:>10.1f}")
+        lines.extend(f"{name:<24} {value:>8}" for name, value in self.counters.items())
+        return "\n".join(lines)
+
+    def write_json(self, path: pathlib.Path) -> None:
+        """Write the stage timings and counters as json."""
+        path.write_text(json.dumps(self.to_dict(), indent=2))
+
+    def write_pstats(self, path: pathlib.Path) -> None:
+        """Write the cProfile statistics in the `pstats` format."""
+        if self.profiler is None:
+            raise SyntheticHomeError("The profile was not collected with cprofile")
+        self.profiler.dump_stats(path)
+
+
+_ACTIVE: Profile | None = None
+
+_DISABLED = nullcontext()
+
+
+class _Stage:
+    """Times a stage of the active profile."""
+
+    __slots__ = ("_name", "_profile", "_start")
+
+    def __init__(self, active: Profile, name: str) -> None:
+        """Initialize _Stage."""
+        self._profile = active
+        self._name = name
+        self._start = 0.0
+
+    def __enter__(self) -> None:
+        """Start timing the stage."""
+        self._start = time.perf_counter()
+
+    def __exit__(self, *args: object) -> None:
+        """Stop timing the stage and record the elapsed time."""
+        elapsed = time.perf_counter() - self._start
+        if (stats := self._profile.stages.get(self._name)) is None:
+            stats = self._profile.stages[self._name] = StageStats()
+        stats.calls += 1
+        stats.total += elapsed
+
+
+def stage(name: str) -> AbstractContextManager[None]:
+    """Return a context manager that times a stage when profiling is active."""
+    if _ACTIVE is None:
+        return _DISABLED
+    return _Stage(_ACTIVE, name)
+
+
+def count(name: str, value: int = 1) -> None:
+    """Increment a counter when profiling is active."""
+    if _ACTIVE is not None:
+        _ACTIVE.counters[name] += value
+
+
+@contextmanager
+def profile(cprofile: bool = False) -> Generator[Profile]:
+    """Record stage timings and counters while the context is active.
+
+    When `cprofile` is set, a `cProfile` profile of every function call is
+    also collected. Only one cProfile profile can be collected at a time.
+    """
+    global _ACTIVE
+    previous = _ACTIVE
+    active = _ACTIVE = Profile(cprofile)
+    if active.profiler is not None:
+        active.profiler.enable()
+    try:
+        yield active
+    finally:
+        if active.profiler is not None:
+            active.profiler.disable()
+        _ACTIVE = previous
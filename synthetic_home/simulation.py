@@ -0,0 +1,232 @@
+"""Simulate device state changes in a synthetic home over time.
+
+A synthetic home pins each device to a single device state. The `Simulator`
+holds a home in memory and moves its devices between the device states of
+their device types, emitting only the entity states that changed. All of the
+entities of a device change together, e.g. the `lock` and `binary_sensor` of a
+door lock stay in sync.
+
+```python
+simulator = simulation.Simulator(home)
+for step in simulator.run(simulation.load_script(script_file)):
+    for change in step.changes:
+        print(step.time, change.entity_id, change.state)
+```
+
+A script is a yaml file with a list of events, each setting a device to a
+device state at a time in seconds from the start of the simulation:
+
+```yaml
+---
+events:
+- time: 0
+  device: front_door
+  device_state: locked
+- time: 3600
+  device: front_door
+  device_state: unlocked
+```
+
+The entities of each device state and the changes between any two device
+states are computed once and reused, so replaying an event costs about the
+same as a dictionary lookup. Shared entities, attributes and changes must be
+treated as read-only.
+"""
+
+import logging
+import pathlib
+from collections.abc import Generator, Iterable, Mapping
+from dataclasses import dataclass, field
+from types import MappingProxyType
+
+from . import inventory, yaml_util
+from .common import NamedAttributes
+from .device_types import DeviceTypeRegistry
+from .exceptions import SyntheticHomeError
+from .synthetic_home import DeviceStateEntities, SyntheticHome, home_devices
+
+__all__ = [
+    "Event",
+    "StateChange",
+    "Step",
+    "Simulator",
+    "load_script",
+]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class Event:
+    """Sets a device to a device state at a point in time."""
+
+    time: float
+    """Seconds since the start of the simulation."""
+
+    device: str
+    """The inventory id of the device."""
+
+    device_state: str
+    """The name of a device state of the device type."""
+
+
+@dataclass(frozen=True)
+class StateChange:
+    """The new state of an entity."""
+
+    entity_id: str
+    """The id of the entity that changed."""
+
+    state: str | None
+    """The new state value of the entity."""
+
+    attributes: NamedAttributes | None
+    """The new state attributes of the entity."""
+
+
+@dataclass
+class Step:
+    """The entity states that changed at a point in time."""
+
+    time: float
+    """Seconds since the start of the simulation."""
+
+    changes: list[StateChange] = field(default_factory=list)
+    """The entities that changed, in the order their events were applied."""
+
+
+@dataclass
+class _Script:
+    """A list of events read from a script file."""
+
+    events: list[Event] = field(default_factory=list)
+
+
+class Simulator:
+    """Applies device state transitions to a synthetic home.
+
+    The home may be built from a config file or loaded compiled from the
+    binary format. Devices start in the device state they have in the home.
+    """
+
+    def __init__(self, home: SyntheticHome) -> None:
+        """Initialize Simulator."""
+        registry = home.device_type_registry
+        if registry is None:
+            raise SyntheticHomeError("Synthetic home has no device type registry")
+        self._registry: DeviceTypeRegistry = registry
+        self._base = inventory.Inventory()
+        self._devices: dict[str, DeviceStateEntities] = {}
+        # The current device state of each device, None for a custom device state
+        self._device_states: dict[str, str | None] = {}
+        self._transitions: dict[
+            tuple[str, str | None, str], tuple[StateChange, ...]
+        ] = {}
+        self._states: dict[str, tuple[str | None, NamedAttributes | None]] = {}
+        for home_device in home_devices(home, self._base.areas):
+            self._base.devices.append(home_device.device)
+            entry = DeviceStateEntities.from_home_device(home_device, registry)
+            self._devices[entry.device_id] = entry
+            self._device_states[entry.device_id] = entry.base_state
+            for entity in entry.state_entities(entry.base_state):
+                self._states[str(entity.id)] = (entity.state, entity.attributes)
+
+    @property
+    def device_states(self) -> dict[str, str | None]:
+        """The current device state name of each device, by device id.
+
+        A device that still has the custom device state from the home is None.
+        """
+        return dict(self._device_states)
+
+    @property
+    def states(self) -> Mapping[str, tuple[str | None, NamedAttributes | None]]:
+        """A read-only view of the current state and attributes by entity id."""
+        return MappingProxyType(self._states)
+
+    def _entry(self, device_id: str) -> DeviceStateEntities:
+        """Return the device entry for the device id."""
+        if (entry := self._devices.get(device_id)) is None:
+            raise SyntheticHomeError(f"Device '{device_id}' is not in the home")
+        return entry
+
+    def _transition(
+        self, entry: DeviceStateEntities, state_name: str
+    ) -> tuple[StateChange, ...]:
+        """Return the entity changes from the current device state, computed once."""
+        current = self._device_states[entry.device_id]
+        key = (entry.device_id, current, state_name)
+        if (changes := self._transitions.get(key)) is None:
+            old_entities = entry.state_entities(current)
+            new_entities = entry.state_entities(state_name)
+            # Every device state of a device type has the same entities
+            changes = self._transitions[key] = tuple(
+                StateChange(
+                    entity_id=str(new.id), state=new.state, attributes=new.attributes
+                )
+                for old, new in zip(old_entities, new_entities, strict=True)
+                if old.state != new.state or old.attributes != new.attributes
+            )
+        return changes
+
+    def set_state(self, device_id: str, state_name: str) -> tuple[StateChange, ...]:
+        """Move the device to the device state and return the entity changes."""
+        entry = self._entry(device_id)
+        if state_name == self._device_states[device_id]:
+            return ()
+        changes = self._transition(entry, state_name)
+        self._device_states[device_id] = state_name
+        for change in changes:
+            self._states[change.entity_id] = (change.state, change.attributes)
+        return changes
+
+    def run(self, events: Iterable[Event]) -> Generator[Step]:
+        """Apply the events in time order, yielding the changes at each time.
+
+        Events at the same time are applied together as a single step. Steps
+        where no entity changed are skipped.
+        """
+        step: Step | None = None
+        for event in events:
+            if step is not None and event.time != step.time:
+                if event.time < step.time:
+                    raise SyntheticHomeError(
+                        f"Event at time {event.time} is before the previous event "
+                        f"at time {step.time}"
+                    )
+                if step.changes:
+                    yield step
+                step = None
+            if step is None:
+                step = Step(time=event.time)
+            step.changes.extend(self.set_state(event.device, event.device_state))
+        if step is not None and step.changes:
+            yield step
+
+    def inventory(self) -> inventory.Inventory:
+        """Return the inventory of the home in its current device states.
+
+        The areas, devices and entities are shared with the simulator.
+        """
+        return inventory.Inventory(
+            language=self._base.language,
+            areas=list(self._base.areas),
+            devices=list(self._base.devices),
+            entities=[
+                entity
+                for device_id, entry in self._devices.items()
+                for entity in entry.state_entities(self._device_states[device_id])
+            ],
+        )
+
+
+def load_script(script_file: pathlib.Path) -> list[Event]:
+    """Load the events of a simulation script from disk."""
+    try:
+        content = script_file.read_text()
+    except FileNotFoundError:
+        raise SyntheticHomeError(f"Script file '{script_file}' does not exist")
+    try:
+        return yaml_util.decode(content, _Script).events
+    except ValueError as err:
+        raise SyntheticHomeError(f"Could not parse script file '{script_file}': {err}")
@@ -0,0 +1,458 @@
+"""A content-addressed store that deduplicates many inventories.
+
+Generated datasets contain many inventories that repeat the same areas,
+devices and entity attributes, such as the same `hvac` attributes thousands
+of times. The `InventoryStore` splits each inventory into device info,
+attribute, area, device and entity objects, and stores each distinct object
+once keyed by a hash of its content.
+
+```python
+with store.InventoryStore(path) as inventory_store:
+    inventory_store.put_many([("home1", inv1), ("home2", inv2)])
+    inv = inventory_store.get("home2")
+```
+
+Loading is lazy: `load` returns a `StoredInventory` that only reads the
+areas, devices or entities from the store when they are first accessed. Each
+distinct area, device, entity and attribute dict is decoded once and shared
+between the inventories loaded from the same store, so they must be treated as
+read-only.
+
+The store is a single sqlite database file. Objects are stored as json, so
+entity states keep their type e.g. `true` rather than `'True'`. Replacing an
+inventory leaves objects that no inventory uses until `collect_garbage` is
+called.
+"""
+
+import hashlib
+import itertools
+import json
+import pathlib
+import sqlite3
+from collections.abc import Callable, Iterable, Iterator
+from dataclasses import dataclass
+from functools import cached_property
+from typing import Any, Self
+
+from . import common, inventory
+from .exceptions import SyntheticHomeError
+
+__all__ = [
+    "STORE_VERSION",
+    "InventoryStore",
+    "StoredInventory",
+    "StoreStats",
+]
+
+STORE_VERSION = 1
+"""Version of the store schema and object layout."""
+
+# Maximum number of objects read in a single query
+_BATCH_SIZE = 500
+
+# Number of encoded objects buffered before they are written to the store
+_FLUSH_SIZE = 10000
+
+# Number of shared objects whose hash is remembered before they are forgotten
+_MEMO_SIZE = 50000
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS metadata (key TEXT PRIMARY KEY, value TEXT NOT NULL);
+CREATE TABLE IF NOT EXISTS objects (
+    hash TEXT PRIMARY KEY, data BLOB NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS inventories (
+    id TEXT PRIMARY KEY, root TEXT NOT NULL, size INTEGER NOT NULL
+) WITHOUT ROWID;
+"""
+
+
+@dataclass(frozen=True)
+class StoreStats:
+    """The amount of deduplication in the store."""
+
+    inventories: int
+    """The number of inventories in the store."""
+
+    objects: int
+    """The number of distinct objects in the store."""
+
+    stored_bytes: int
+    """The size of the distinct objects."""
+
+    logical_bytes: int
+    """The size of every inventory if each was stored on its own as json."""
+
+    @property
+    def dedup_ratio(self) -> float:
+        """How many times smaller the store is than the inventories on their own."""
+        return self.logical_bytes / self.stored_bytes if self.stored_bytes else 1.0
+
+
+def _encode(value: Any) -> bytes:
+    """Encode the object in a canonical form."""
+    return json.dumps(value, sort_keys=True, separators=(",", ":")).encode()
+
+
+def _hash(content: bytes) -> str:
+    """Return the content address of the encoded object."""
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+class _Writer:
+    """Splits inventories into content-addressed objects.
+
+    Generated inventories share areas, entities and attribute dicts between
+    them, so the hash of each object is remembered by identity along with its
+    decoded content. A shared object is only encoded again when it no longer
+    equals that content, e.g. when it was changed in place between inventories.
+    The remembered objects are forgotten once there are `_MEMO_SIZE` of them,
+    so a corpus that is mostly shared objects is not kept in memory.
+    """
+
+    def __init__(self) -> None:
+        """Initialize _Writer."""
+        self.objects: dict[str, bytes] = {}
+        self.size = 0
+        # Holds a reference to each object so its id is not reused
+        self._keys: dict[int, tuple[Any, Any, str, int]] = {}
+
+    def clear(self) -> None:
+        """Forget the objects, once they were written."""
+        self.objects.clear()
+
+    def add(self, value: Any) -> str:
+        """Add the object and return its hash."""
+        content = _encode(value)
+        self.size += len(content)
+        key = _hash(content)
+        self.objects.setdefault(key, content)
+        return key
+
+    def _add_shared(self, value: Any, to_data: Callable[[Any], Any]) -> str:
+        """Add the object converted by `to_data`, reusing the hash if unchanged."""
+        data = to_data(value)
+        if (entry := self._keys.get(id(value))) is not None and entry[1] == data:
+            self.size += entry[3]
+            return entry[2]
+        content = _encode(data)
+        self.size += len(content)
+        key = _hash(content)
+        self.objects.setdefault(key, content)
+        # A decoded copy, since the data may be the object itself
+        self._keys[id(value)] = (value, json.loads(content), key, len(content))
+        return key
+
+    def _device_data(self, device: inventory.Device) -> dict[str, Any]:
+        """Return the device with its info replaced by a hash."""
+        data = device.to_dict(omit_none=True)
+        if device.info is not None:
+            data["info"] = self._add_shared(device.info, _info_data)
+        return data
+
+    def _entity_data(self, entity: inventory.Entity) -> dict[str, Any]:
+        """Return the entity with its attributes replaced by a hash."""
+        data = entity.to_dict(omit_none=True)
+        if entity.attributes is not None:
+            data["attributes"] = self._add_shared(entity.attributes, _identity)
+        return data
+
+    def add_inventory(self, inv: inventory.Inventory) -> str:
+        """Add the objects of the inventory and return the hash of its root."""
+        self.size = 0
+        if len(self._keys) >= _MEMO_SIZE:
+            self._keys.clear()
+        return self.add(
+            {
+                "language": inv.language,
+                "areas": [self._add_shared(area, _area_data) for area in inv.areas],
+                "devices": [
+                    self._add_shared(device, self._device_data)
+                    for device in inv.devices
+                ],
+                "entities": [
+                    self._add_shared(entity, self._entity_data)
+                    for entity in inv.entities
+                ],
+            }
+        )
+
+
+def _identity(value: Any) -> Any:
+    """Return the value unchanged."""
+    return value
+
+
+def _info_data(info: common.DeviceInfo) -> dict[str, Any]:
+    """Return the device info as a dict."""
+    return info.to_dict(omit_none=True)
+
+
+def _area_data(area: inventory.Area) -> dict[str, Any]:
+    """Return the area as a dict."""
+    return area.to_dict(omit_none=True)
+
+
+class InventoryStore:
+    """Stores inventories by id, deduplicating their contents."""
+
+    def __init__(self, path: pathlib.Path) -> None:
+        """Initialize InventoryStore."""
+        self._path = path
+        self._db = sqlite3.connect(path)
+        self._db.executescript(_SCHEMA)
+        row = self._db.execute(
+            "SELECT value FROM metadata WHERE key = 'version'"
+        ).fetchone()
+        if row is None:
+            with self._db:
+                self._db.execute(
+                    "INSERT INTO metadata VALUES ('version', ?)", (str(STORE_VERSION),)
+                )
+        elif row[0] != str(STORE_VERSION):
+            self._db.close()
+            raise SyntheticHomeError(
+                f"Unsupported store version {row[0]}, expected {STORE_VERSION}"
+            )
+        self._cache: dict[str, Any] = {}
+        self._built: dict[str, Any] = {}
+
+    def __enter__(self) -> Self:
+        """Enter the context manager."""
+        return self
+
+    def __exit__(self, *args: object) -> None:
+        """Close the store."""
+        self.close()
+
+    def close(self) -> None:
+        """Close the store database."""
+        self._db.close()
+
+    def put(self, inventory_id: str, inv: inventory.Inventory) -> None:
+        """Store the inventory, replacing any inventory with the same id."""
+        self.put_many([(inventory_id, inv)])
+
+    def put_many(self, items: Iterable[tuple[str, inventory.Inventory]]) -> None:
+        """Store the inventories in a single transaction.
+
+        Objects are written in batches as the inventories are read, and only a
+        bounded number of shared objects are remembered, so the inventories do
+        not need to be kept in memory.
+        """
+        writer = _Writer()
+        with self._db:
+            for inventory_id, inv in items:
+                root = writer.add_inventory(inv)
+                if len(writer.objects) >= _FLUSH_SIZE:
+                    self._write_objects(writer)
+                self._db.execute(
+                    "INSERT OR REPLACE INTO inventories VALUES (?, ?, ?)",
+                    (inventory_id, root, writer.size),
+                )
+            self._write_objects(writer)
+
+    def _write_objects(self, writer: _Writer) -> None:
+        """Write the objects that are not already stored and clear the writer."""
+        self._db.executemany(
+            "INSERT OR IGNORE INTO objects VALUES (?, ?)", writer.objects.items()
+        )
+        writer.clear()
+
+    def collect_garbage(self) -> int:
+        """Remove objects not used by any inventory and return how many."""
+        used: set[str] = set()
+        parents: list[str] = []
+        for (root_key,) in self._db.execute("SELECT root FROM inventories"):
+            used.add(root_key)
+            root = json.loads(self._read_object(root_key))
+            used.update(root["areas"])
+            parents.extend(root["devices"])
+            parents.extend(root["entities"])
+        # Devices and entities refer to their info and attributes
+        for batch in itertools.batched(set(parents), _BATCH_SIZE):
+            for key, content in self._db.execute(
+                "SELECT hash, data FROM objects WHERE hash IN "
+                f"({','.join('?' * len(batch))})",
+                batch,
+            ):
+                used.add(key)
+                data = json.loads(content)
+                used.update(
+                    data[child] for child in ("info", "attributes") if child in data
+                )
+        unused = [
+            key
+            for (key,) in self._db.execute("SELECT hash FROM objects")
+            if key not in used
+        ]
+        with self._db:
+            self._db.executemany(
+                "DELETE FROM objects WHERE hash = ?", ((key,) for key in unused)
+            )
+        return len(unused)
+
+    def _read_object(self, key: str) -> bytes:
+        """Return the encoded object for the hash."""
+        if (
+            row := self._db.execute(
+                "SELECT data FROM objects WHERE hash = ?", (key,)
+            ).fetchone()
+        ) is None:
+            raise SyntheticHomeError(f"Store '{self._path}' is missing objects {[key]}")
+        content: bytes = row[0]
+        return content
+
+    def ids(self) -> list[str]:
+        """Return the ids of the inventories in the store."""
+        return [
+            row[0] for row in self._db.execute("SELECT id FROM inventories ORDER BY id")
+        ]
+
+    def __iter__(self) -> Iterator[str]:
+        """Iterate over the ids of the inventories in the store."""
+        return iter(self.ids())
+
+    def __len__(self) -> int:
+        """Return the number of inventories in the store."""
+        count: int = self._db.execute("SELECT COUNT(*) FROM inventories").fetchone()[0]
+        return count
+
+    def __contains__(self, inventory_id: object) -> bool:
+        """Return True if the inventory is in the store."""
+        return (
+            self._db.execute(
+                "SELECT 1 FROM inventories WHERE id = ?", (inventory_id,)
+            ).fetchone()
+            is not None
+        )
+
+    def _objects(self, keys: list[str]) -> list[Any]:
+        """Return the decoded objects for the hashes, reading missing ones."""
+        if missing := list(
+            dict.fromkeys(key for key in keys if key not in self._cache)
+        ):
+            for batch in itertools.batched(missing, _BATCH_SIZE):
+                rows = self._db.execute(
+                    "SELECT hash, data FROM objects WHERE hash IN "
+                    f"({','.join('?' * len(batch))})",
+                    batch,
+                ).fetchall()
+                for key, content in rows:
+                    self._cache[key] = json.loads(content)
+            if unknown := [key for key in missing if key not in self._cache]:
+                raise SyntheticHomeError(
+                    f"Store '{self._path}' is missing objects {unknown[:5]}"
+                )
+        return [self._cache[key] for key in keys]
+
+    def _records[T](self, keys: list[str], build: Callable[[Any], T]) -> list[T]:
+        """Return the records for the hashes, building each distinct record once."""
+        if missing := list(
+            dict.fromkeys(key for key in keys if key not in self._built)
+        ):
+            for key, data in zip(missing, self._objects(missing), strict=True):
+                self._built[key] = build(data)
+        return [self._built[key] for key in keys]
+
+    def load(self, inventory_id: str) -> "StoredInventory":
+        """Return the inventory, reading its contents when first accessed."""
+        row = self._db.execute(
+            "SELECT root FROM inventories WHERE id = ?", (inventory_id,)
+        ).fetchone()
+        if row is None:
+            raise SyntheticHomeError(
+                f"Inventory '{inventory_id}' is not in store '{self._path}'"
+            )
+        return StoredInventory(self, self._objects([row[0]])[0])
+
+    def get(self, inventory_id: str) -> inventory.Inventory:
+        """Return the full inventory."""
+        return self.load(inventory_id).to_inventory()
+
+    def stats(self) -> StoreStats:
+        """Return the amount of deduplication in the store."""
+        inventories, logical_bytes = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM inventories"
+        ).fetchone()
+        objects, stored_bytes = self._db.execute(
+            "SELECT COUNT(*), COALESCE(SUM(LENGTH(data)), 0) FROM objects"
+        ).fetchone()
+        return StoreStats(
+            inventories=inventories,
+            objects=objects,
+            stored_bytes=stored_bytes,
+            logical_bytes=logical_bytes,
+        )
+
+
+class StoredInventory:
+    """An inventory in the store whose contents are read on first access."""
+
+    def __init__(self, inventory_store: InventoryStore, root: dict[str, Any]) -> None:
+        """Initialize StoredInventory."""
+        self._store = inventory_store
+        self._root = root
+
+    @property
+    def language(self) -> str | None:
+        """The language of the inventory."""
+        language: str | None = self._root["language"]
+        return language
+
+    @cached_property
+    def areas(self) -> list[inventory.Area]:
+        """The areas of the inventory, read on first access."""
+        return self._store._records(self._root["areas"], _build_area)
+
+    @cached_property
+    def devices(self) -> list[inventory.Device]:
+        """The devices of the inventory, read on first access."""
+        return self._store._records(self._root["devices"], self._build_device)
+
+    @cached_property
+    def entities(self) -> list[inventory.Entity]:
+        """The entities of the inventory, read on first access."""
+        return self._store._records(self._root["entities"], self._build_entity)
+
+    def _build_device(self, data: dict[str, Any]) -> inventory.Device:
+        """Return the device for the stored record."""
+        info = None
+        if (info_key := data.get("info")) is not None:
+            info = self._store._records([info_key], _build_info)[0]
+        return inventory.Device(
+            name=data["name"], id=data["id"], area=data.get("area"), info=info
+        )
+
+    def _build_entity(self, data: dict[str, Any]) -> inventory.Entity:
+        """Return the entity for the stored record."""
+        attributes = None
+        if (attributes_key := data.get("attributes")) is not None:
+            attributes = self._store._objects([attributes_key])[0]
+        return inventory.Entity(
+            name=data.get("name"),
+            id=data["id"],
+            area=data.get("area"),
+            device=data.get("device"),
+            state=data.get("state"),
+            attributes=attributes,
+        )
+
+    def to_inventory(self) -> inventory.Inventory:
+        """Return the full inventory."""
+        return inventory.Inventory(
+            language=self.language,
+            areas=self.areas,
+            devices=self.devices,
+            entities=self.entities,
+        )
+
+
+def _build_area(data: dict[str, Any]) -> inventory.Area:
+    """Return the area for the stored record."""
+    return inventory.Area(name=data["name"], id=data["id"], floor=data.get("floor"))
+
+
+def _build_info(data: dict[str, Any]) -> common.DeviceInfo:
+    """Return the device info for the stored record."""
+    return common.DeviceInfo(**data)
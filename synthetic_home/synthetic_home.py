@@ -2,30 +2,38 @@
 
 import logging
 import pathlib
-from dataclasses import dataclass, field
-from typing import Any
+from collections import OrderedDict
+from collections.abc import Generator, Iterable, Mapping
+from dataclasses import InitVar, dataclass, field
+from typing import Any, NamedTuple
 
-import slugify
-from mashumaro.codecs.yaml import yaml_decode
+from mashumaro.exceptions import MissingField
 
 from synthetic_home.device_types import (
     DeviceState,
     DeviceStateStrategy,
+    DeviceType,
     DeviceTypeRegistry,
     EntityEntry,
     merge_entity_state_attributes,
 )
 from synthetic_home.exceptions import SyntheticHomeError
 
-from . import common, inventory
+from . import common, inventory, profiling, yaml_util
 from .device_types import load_device_type_registry
-from .inventory import DEFAULT_SEPARATOR
+from .inventory import slugify_id
 
 __all__ = [
     "SyntheticHome",
     "Device",
     "build_device_state",
+    "apply_device_states",
+    "CacheInfo",
+    "DeviceStateCache",
+    "device_state_cache",
+    "SyntheticHomeConfig",
     "load_synthetic_home",
+    "load_synthetic_home_config",
     "read_config_content",
 ]
 
@@ -75,8 +83,113 @@ class Device:
         )
 
 
+DEVICE_STATE_CACHE_SIZE = 1024
+"""The maximum number of resolved device states held in the cache."""
+
+
+class CacheInfo(NamedTuple):
+    """Statistics about the device state cache."""
+
+    hits: int
+    misses: int
+    maxsize: int
+    currsize: int
+
+
+def _resolve_entity_entries(
+    device_type: DeviceType, device_state: DeviceState
+) -> dict[str, list[EntityEntry]]:
+    """Merge the device state into the entity entries for the device type."""
+    _LOGGER.debug("Merging entity attributes for device state: %s", device_state)
+    return {
+        platform: [
+            merge_entity_state_attributes(
+                platform, entity_entry, device_state.entity_states_dict
+            )
+            for entity_entry in entity_entries
+        ]
+        for platform, entity_entries in device_type.entities.items()
+    }
+
+
+class DeviceStateCache:
+    """A bounded cache of entity entries resolved for a named device state.
+
+    Entries are keyed by the device type and state name. The resolved
+    `EntityEntry` objects are shared between every device with the same
+    device type and state and must be treated as read-only. An entry is only
+    used when it was resolved from the same `DeviceType` object, so reloading
+    the registry naturally invalidates the cache.
+    """
+
+    def __init__(self, maxsize: int = DEVICE_STATE_CACHE_SIZE) -> None:
+        """Initialize DeviceStateCache."""
+        self._maxsize = maxsize
+        self._entries: OrderedDict[
+            tuple[str, str], tuple[DeviceType, dict[str, tuple[EntityEntry, ...]]]
+        ] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+
+    def resolve(
+        self, device_type: DeviceType, device_state: DeviceState
+    ) -> dict[str, list[EntityEntry]]:
+        """Return the entity entries for a device state of the device type."""
+        key = (device_type.device_type, device_state.name)
+        if (entry := self._entries.get(key)) is not None and entry[0] is device_type:
+            self._hits += 1
+            profiling.count("device_state_cache_hits")
+            self._entries.move_to_end(key)
+            resolved = entry[1]
+        else:
+            self._misses += 1
+            profiling.count("device_state_cache_misses")
+            resolved = {
+                platform: tuple(entity_entries)
+                for platform, entity_entries in _resolve_entity_entries(
+                    device_type, device_state
+                ).items()
+            }
+            self._entries[key] = (device_type, resolved)
+            self._entries.move_to_end(key)
+            if len(self._entries) > self._maxsize:
+                self._entries.popitem(last=False)
+        # Each device gets its own containers sharing the resolved entries
+        return {
+            platform: list(entity_entries)
+            for platform, entity_entries in resolved.items()
+        }
+
+    def cache_info(self) -> CacheInfo:
+        """Return statistics about the cache."""
+        return CacheInfo(
+            hits=self._hits,
+            misses=self._misses,
+            maxsize=self._maxsize,
+            currsize=len(self._entries),
+        )
+
+    def cache_clear(self) -> None:
+        """Clear the cache and its statistics e.g. when the registry is reloaded."""
+        self._entries.clear()
+        self._hits = 0
+        self._misses = 0
+
+
+device_state_cache = DeviceStateCache()
+"""The cache of resolved device states used by `build_device_state`."""
+
+
 def build_device_state(device: Device, registry: DeviceTypeRegistry) -> Device:
     """Validate the device and return a new instance."""
+    with profiling.stage("build_device_state"):
+        device = _build_device_state(device, registry)
+    profiling.count("devices_built")
+    return device
+
+
+def _build_device_state(device: Device, registry: DeviceTypeRegistry) -> Device:
+    """Validate the device and return a new instance with its entity entries."""
     if (device_type := registry.device_types.get(device.device_type or "")) is None:
         raise SyntheticHomeError(
             f"Device {device} has device_type {device.device_type} not found in: {registry.device_types}"
@@ -89,7 +202,7 @@ def build_device_state(device: Device, registry: DeviceTypeRegistry) -> Device:
             and device.device_state not in device_type.device_states_dict
         ):
             raise SyntheticHomeError(
-                f"Device {device}\nhas state '{device.device_state}'\n not in: {device_type.device_states_dict}"
+                f"Device {device}\nhas state '{device.device_state}'\n not in: {list(device_type.device_states_dict)}"
             )
         if isinstance(device.device_state, dict):
             _LOGGER.debug(
@@ -109,22 +222,17 @@ def build_device_state(device: Device, registry: DeviceTypeRegistry) -> Device:
         # Pick the first device state as the default
         device_state = device_type.device_states[0]
         if isinstance(device.device_state, DeviceState):
+            # Custom device states are not cached
             device_state = device_state.merge(device.device_state)
+            entity_entries = _resolve_entity_entries(device_type, device_state)
+        else:
+            entity_entries = device_state_cache.resolve(device_type, device_state)
     elif device.device_state is not None and isinstance(device.device_state, str):
         device_state = device_type.device_states_dict[device.device_state]
+        entity_entries = device_state_cache.resolve(device_type, device_state)
     else:
         raise SyntheticHomeError(f"Device did not declare a device state: {device}")
 
-    _LOGGER.debug("Merging entity attributes for device state: %s", device_state)
-    entity_entries = {
-        platform: [
-            merge_entity_state_attributes(
-                platform, entity_entry, device_state.entity_states
-            )
-            for entity_entry in entity_entries
-        ]
-        for platform, entity_entries in device_type.entities.items()
-    }
     return device.merge(device_state=device_state, entity_entries=entity_entries)
 
 
@@ -144,10 +252,15 @@ class SyntheticHome:
     # Device types supported by the home.
     device_type_registry: DeviceTypeRegistry | None = None
 
-    def __post_init__(self) -> None:
+    # True when the devices were already built e.g. loaded from a compiled home
+    compiled: InitVar[bool] = False
+
+    def __post_init__(self, compiled: bool) -> None:
         """Build the complete device state."""
         if self.device_type_registry is None:
             self.device_type_registry = load_device_type_registry()
+        if compiled:
+            return
         self.devices = {
             key: [
                 build_device_state(device, self.device_type_registry)
@@ -161,24 +274,147 @@ class SyntheticHome:
         ]
 
 
+_ResolvedStates = dict[str, tuple[DeviceState, dict[str, list[EntityEntry]]]]
+
+
+def _resolve_states(
+    device_type_registry: DeviceTypeRegistry, device_states: Mapping[str, str]
+) -> _ResolvedStates:
+    """Return the device state and entity entries for each device type."""
+    resolved: _ResolvedStates = {}
+    for device_type_name, state_name in device_states.items():
+        if (
+            device_type := device_type_registry.device_types.get(device_type_name)
+        ) is None:
+            raise SyntheticHomeError(f"Device type '{device_type_name}' not found")
+        if (device_state := device_type.device_states_dict.get(state_name)) is None:
+            raise SyntheticHomeError(
+                f"Device type '{device_type_name}' has no device state '{state_name}', "
+                f"expected one of {list(device_type.device_states_dict)}"
+            )
+        resolved[device_type_name] = (
+            device_state,
+            device_state_cache.resolve(device_type, device_state),
+        )
+    return resolved
+
+
+def _apply_resolved(device: Device, resolved: _ResolvedStates) -> Device:
+    """Return the device in its resolved device state, if its type was resolved."""
+    if (group := resolved.get(device.device_type or "")) is None:
+        return device
+    device_state, entity_entries = group
+    return Device(
+        name=device.name,
+        device_type=device.device_type,
+        device_info=device.device_info,
+        device_state=device_state,
+        entity_entries={
+            platform: list(entries) for platform, entries in entity_entries.items()
+        },
+    )
+
+
+def apply_device_states(
+    homes: Iterable[SyntheticHome],
+    device_states: Mapping[str, str],
+    device_type_registry: DeviceTypeRegistry | None = None,
+) -> list[SyntheticHome]:
+    """Return the homes with every device of a device type set to a device state.
+
+    The `device_states` are device state names by device type e.g.
+    `{"smart-lock": "unlocked"}`. Device types are looked up in each home's own
+    registry unless `device_type_registry` is given. Each device type and state
+    is resolved once per registry and shared by every matching device, and the
+    homes are not rebuilt, so this is much faster than building each home
+    again. Devices of other device types are shared with the original homes.
+    """
+    # Homes usually share a registry, so resolve once for each registry. The
+    # registry is kept so its id is not reused.
+    resolved_by_registry: dict[int, tuple[DeviceTypeRegistry, _ResolvedStates]] = {}
+    result = []
+    for home in homes:
+        registry = (
+            device_type_registry
+            or home.device_type_registry
+            or load_device_type_registry()
+        )
+        if (entry := resolved_by_registry.get(id(registry))) is None:
+            entry = resolved_by_registry[id(registry)] = (
+                registry,
+                _resolve_states(registry, device_states),
+            )
+        resolved = entry[1]
+        result.append(
+            SyntheticHome(
+                name=home.name,
+                devices={
+                    area: [_apply_resolved(device, resolved) for device in devices]
+                    for area, devices in home.devices.items()
+                },
+                services=[
+                    _apply_resolved(device, resolved) for device in home.services
+                ],
+                device_type_registry=home.device_type_registry,
+                compiled=True,
+            )
+        )
+    return result
+
+
+@dataclass
+class SyntheticHomeConfig:
+    """The synthetic home definition as read from disk, before devices are built."""
+
+    name: str
+
+    devices: dict[str, list[Device]] = field(default_factory=dict)
+
+    services: list[Device] = field(default_factory=list)
+
+
 def read_config_content(config_file: pathlib.Path) -> str:
     """Create configuration file content, exposed for patching."""
     with config_file.open("r") as f:
         return f.read()
 
 
-def load_synthetic_home(config_file: pathlib.Path) -> SyntheticHome:
-    """Load synthetic home configuration from disk."""
+def load_synthetic_home_config(config_file: pathlib.Path) -> SyntheticHomeConfig:
+    """Load synthetic home configuration from disk without building its devices."""
     try:
         content = read_config_content(config_file)
     except FileNotFoundError:
         raise SyntheticHomeError(f"Configuration file '{config_file}' does not exist")
     try:
-        return yaml_decode(content, SyntheticHome)
-    except ValueError as err:
+        return yaml_util.decode(content, SyntheticHomeConfig)
+    except (ValueError, MissingField) as err:
         raise SyntheticHomeError(f"Could not parse config file '{config_file}': {err}")
 
 
+def load_synthetic_home(
+    config_file: pathlib.Path,
+    device_type_registry: DeviceTypeRegistry | None = None,
+) -> SyntheticHome:
+    """Load synthetic home configuration from disk.
+
+    The devices are built using the specified device type registry, or the
+    default registry when not specified.
+    """
+    with profiling.stage("load_synthetic_home"):
+        config = load_synthetic_home_config(config_file)
+        try:
+            return SyntheticHome(
+                name=config.name,
+                devices=config.devices,
+                services=config.services,
+                device_type_registry=device_type_registry,
+            )
+        except ValueError as err:
+            raise SyntheticHomeError(
+                f"Could not parse config file '{config_file}': {err}"
+            )
+
+
 def yaml_state_value(v: Any) -> Any:
     """Convert a entity state value to yaml."""
     if isinstance(v, (bool, float, list)):
@@ -190,7 +426,7 @@ def build_entities(area_id: str | None, device_entry: Device) -> list[inventory.
     """Build the set of entities for the device entry."""
     entities = []
     device_name = device_entry.name.replace("_", " ").title()
-    device_id = slugify.slugify(device_entry.name, separator=DEFAULT_SEPARATOR)
+    device_id = slugify_id(device_entry.name)
 
     for platform, entity_entries in device_entry.entity_entries.items():
         for entity_entry in entity_entries:
@@ -202,7 +438,7 @@ def build_entities(area_id: str | None, device_entry: Device) -> list[inventory.
                 and entity_entry.key not in device_entry.name.lower()
             ):
                 entity_name = f"{device_name} {entity_entry.key.capitalize()}"
-            entity_id = f"{platform}.{slugify.slugify(entity_name, separator=DEFAULT_SEPARATOR)}"
+            entity_id = f"{platform}.{slugify_id(entity_name)}"
             entity = inventory.Entity(
                 name=entity_name,
                 id=entity_id,
@@ -222,44 +458,173 @@ def build_entities(area_id: str | None, device_entry: Device) -> list[inventory.
     return entities
 
 
+def home_areas(
+    home: SyntheticHome | SyntheticHomeConfig,
+) -> list[tuple[str | None, list[Device]]]:
+    """Return the devices of the home by area name, with services in no area."""
+    pairs: list[tuple[str | None, list[Device]]] = [*home.devices.items()]
+    if home.services:
+        pairs.append((None, home.services))
+    return pairs
+
+
+def build_device(
+    area_name: str | None,
+    area_id: str | None,
+    device_entry: Device,
+    device_ids: set[str],
+) -> inventory.Device:
+    """Build the inventory device for the device entry.
+
+    Device ids must be unique within the home, so a device whose id is already
+    in `device_ids` is renamed using the area name as a prefix. The device entry
+    is renamed to match, then its id is added to `device_ids`.
+    """
+    # Make computer generated device names more friendly
+    device_name = device_entry.name.replace("_", " ").title()
+    device_id = slugify_id(device_entry.name)
+    if device_id in device_ids:
+        device_entry.name = f"{area_name}_{device_entry.name}"
+        device_name = device_entry.name.replace("_", " ").title()
+        device_id = slugify_id(device_name)
+    device_ids.add(device_id)
+    device = inventory.Device(
+        name=device_name,
+        id=device_id,
+        info=device_entry.device_info,
+    )
+    if area_id:
+        device.area = area_id
+    return device
+
+
+@dataclass
+class HomeDevice:
+    """A device entry of a home and the inventory device built for it."""
+
+    area_name: str | None
+    """The name of the area of the device, or None for services."""
+
+    area_id: str | None
+    """The inventory id of the area of the device."""
+
+    name: str
+    """The name of the device entry before it was renamed to make its id unique."""
+
+    entry: Device
+    """The device entry, renamed when its id was already used in the home."""
+
+    device: inventory.Device
+    """The inventory device built for the device entry."""
+
+
+def home_devices(
+    home: SyntheticHome | SyntheticHomeConfig, areas: list[inventory.Area]
+) -> Generator[HomeDevice]:
+    """Yield each device entry of the home with its inventory device.
+
+    Areas are appended to `areas` as they are reached. Device entries are
+    renamed by `build_device` when needed to keep device ids unique.
+    """
+    device_ids: set[str] = set()
+    for area_name, device_entries in home_areas(home):
+        area_id = None
+        if area_name:
+            area_id = slugify_id(area_name)
+            areas.append(inventory.Area(name=area_name, id=area_id))
+        for device_entry in device_entries:
+            name = device_entry.name
+            device = build_device(area_name, area_id, device_entry, device_ids)
+            yield HomeDevice(area_name, area_id, name, device_entry, device)
+
+
+@dataclass
+class DeviceStateEntities:
+    """The entities of a device in each of its device states, built on first use.
+
+    The entities of the device state the device has in the home are keyed by
+    its name, or by None when the home sets a custom device state so it never
+    shadows the registry device state it was merged with. Entities are shared
+    and must be treated as read-only.
+    """
+
+    device_id: str
+    """The inventory id of the device."""
+
+    device: Device
+    """The device entry from the home."""
+
+    area_id: str | None
+    """The inventory id of the area of the device."""
+
+    device_type: DeviceType
+    """The device type of the device."""
+
+    base_state: str | None
+    """The device state name in the home, or None for a custom device state."""
+
+    entities: dict[str | None, list[inventory.Entity]] = field(default_factory=dict)
+    """The entities of the device by device state name."""
+
+    @classmethod
+    def from_home_device(
+        cls, home_device: HomeDevice, registry: DeviceTypeRegistry
+    ) -> "DeviceStateEntities":
+        """Return the entities for a device of a home with its device state built."""
+        entry = home_device.entry
+        device_type = registry.device_types[entry.device_type or ""]
+        state = entry.device_state
+        base_state = None
+        # Custom device states are merged into a new DeviceState
+        if isinstance(state, DeviceState) and device_type.is_device_state(state):
+            base_state = state.name
+        return cls(
+            device_id=str(home_device.device.id),
+            device=entry,
+            area_id=home_device.area_id,
+            device_type=device_type,
+            base_state=base_state,
+            entities={base_state: build_entities(home_device.area_id, entry)},
+        )
+
+    def state_entities(self, state_name: str | None) -> list[inventory.Entity]:
+        """Return the entities of the device in the device state."""
+        if (entities := self.entities.get(state_name)) is None:
+            device_states = self.device_type.device_states_dict
+            if (
+                state_name is None
+                or (device_state := device_states.get(state_name)) is None
+            ):
+                raise SyntheticHomeError(
+                    f"Device type '{self.device_type.device_type}' has no device state "
+                    f"'{state_name}', expected one of {list(device_states)}"
+                )
+            device = self.device.merge(
+                device_state=device_state,
+                entity_entries=device_state_cache.resolve(
+                    self.device_type, device_state
+                ),
+            )
+            entities = self.entities[state_name] = build_entities(self.area_id, device)
+        return entities
+
+
 def build_inventory(home: SyntheticHome) -> inventory.Inventory:
     """Build a home inventory from the synthetic home definition.
 
     This is a flattened set of areas, entities, and devices.
     """
+    with profiling.stage("build_inventory"):
+        return _build_inventory(home)
 
-    inv = inventory.Inventory()
-    pairs: list[tuple[str | None, list[Device]]] = [*home.devices.items()]
-    if home.services:
-        pairs.append((None, home.services))
 
-    device_ids: set[str] = set()
+def _build_inventory(home: SyntheticHome) -> inventory.Inventory:
+    """Build the areas, devices and entities of the inventory."""
+    inv = inventory.Inventory()
     entities = []
-    for area_name, devices in pairs:
-        if area_name:
-            area_id = slugify.slugify(area_name, separator=DEFAULT_SEPARATOR)
-            inv.areas.append(inventory.Area(name=area_name, id=area_id))
-        else:
-            area_id = None
-
-        for device_entry in devices:
-            # Make computer generated device names more friendly
-            device_name = device_entry.name.replace("_", " ").title()
-            device_id = slugify.slugify(device_entry.name, separator=DEFAULT_SEPARATOR)
-            if device_id in device_ids:
-                device_entry.name = f"{area_name}_{device_entry.name}"
-                device_name = device_entry.name.replace("_", " ").title()
-                device_id = slugify.slugify(device_name, separator=DEFAULT_SEPARATOR)
-            device_ids.add(device_id)
-            device = inventory.Device(
-                name=device_name,
-                id=device_id,
-                info=device_entry.device_info,
-            )
-            if area_id:
-                device.area = area_id
-            inv.devices.append(device)
-            entities.extend(build_entities(area_id, device_entry))
+    for home_device in home_devices(home, inv.areas):
+        inv.devices.append(home_device.device)
+        entities.extend(build_entities(home_device.area_id, home_device.entry))
     if entities:
         inv.entities = entities
     return inv
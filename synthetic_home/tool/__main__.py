@@ -7,7 +7,16 @@ import logging
 import sys
 from pathlib import Path
 
-from . import create_inventory, export_inventory
+from synthetic_home import profiling
+
+from . import (
+    create_inventory,
+    create_variations,
+    diff_inventory,
+    export_inventory,
+    list_device_types,
+    patch_inventory,
+)
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -16,11 +25,26 @@ def get_base_arg_parser() -> argparse.ArgumentParser:
     """Get a base argument parser."""
     parser = argparse.ArgumentParser(description="Synthetic Home Utility")
     parser.add_argument("--debug", action="store_true", help="Enable log output")
+    parser.add_argument(
+        "--profile",
+        type=str,
+        help="Write stage timings and counters for the action to this file.",
+    )
+    parser.add_argument(
+        "--profile-format",
+        choices=["json", "pstats"],
+        default="json",
+        help="Write the profile as json stage timings or a cProfile pstats dump.",
+    )
     subparsers = parser.add_subparsers(dest="action", help="Action", required=True)
 
     # Subcommands
     create_inventory.create_arguments(subparsers.add_parser("create_inventory"))
     export_inventory.create_arguments(subparsers.add_parser("export_inventory"))
+    create_variations.create_arguments(subparsers.add_parser("create_variations"))
+    list_device_types.create_arguments(subparsers.add_parser("list_device_types"))
+    diff_inventory.create_arguments(subparsers.add_parser("diff_inventory"))
+    patch_inventory.create_arguments(subparsers.add_parser("patch_inventory"))
 
     return parser
 
@@ -42,7 +66,16 @@ def main() -> int:
 
     module = importlib.import_module(f".{args.action}", "synthetic_home.tool")
     _LOGGER.info("Running action %s", args.action)
-    result: int = asyncio.run(module.run(args))
+    if args.profile is None:
+        result: int = asyncio.run(module.run(args))
+        return result
+    with profiling.profile(cprofile=args.profile_format == "pstats") as prof:
+        result = asyncio.run(module.run(args))
+    if args.profile_format == "pstats":
+        prof.write_pstats(Path(args.profile))
+    else:
+        prof.write_json(Path(args.profile))
+    _LOGGER.info("Profile for action %s:\n%s", args.action, prof.report())
     return result
 
 
@@ -32,12 +32,82 @@ used with the synthetic home custom component.
 ```bash
 $ synthetic-home create_inventory famhouse-home.yaml > famhouse-inventory.yaml
 ```
+
+When given multiple home files, the inventories are written as a multi-document
+yaml stream, one document per home:
+
+```bash
+$ synthetic-home create_inventory homes/*.yaml > inventories.yaml
+```
+
+Many homes can be converted at once using a pool of worker processes, writing
+an inventory file for each home into the output directory:
+
+```bash
+$ synthetic-home create_inventory --batch "homes/*.yaml" --out inventories/ --jobs 8
+```
+
+With `--watch` the inventories are written to the output directory and rebuilt
+whenever a home file or a device type in any directory of the registry search
+path changes:
+
+```bash
+$ synthetic-home create_inventory famhouse-home.yaml --out inventories/ --watch
+```
+
+Use `--format msgpack` to write inventories in the binary format, which is much
+faster to load than yaml. This requires the optional `msgpack` dependency.
+
+Use `--store` to add the inventories to a content-addressed store instead of
+writing them, where areas, devices, entities and attributes shared between
+homes are only stored once. Each inventory is stored with the name of its home
+file as the id:
+
+```bash
+$ synthetic-home create_inventory homes/*.yaml --store inventories.db
+```
+
+Use `--archive` to append the inventories to a single file archive instead,
+with the name of each home file as its home id. Tools that read inventory
+files such as `diff_inventory` accept `ARCHIVE#HOME_ID` to read a home from
+it. Add `--compact` to remove inventories replaced by later appends:
+
+```bash
+$ synthetic-home create_inventory homes/*.yaml --archive inventories.archive --compact
+$ synthetic-home diff_inventory inventories.archive#home1 inventories.archive#home2
+```
 """
 
 import argparse
+import asyncio
+import logging
 import pathlib
+import sys
+import time
+from collections.abc import AsyncGenerator, Callable
+from dataclasses import dataclass
+
+import yaml
+
+from synthetic_home import (
+    archive,
+    batch,
+    binary,
+    device_types,
+    incremental,
+    inventory,
+    store,
+    synthetic_home,
+)
+from synthetic_home.exceptions import SyntheticHomeError
+
+_LOGGER = logging.getLogger(__name__)
+
+POLL_INTERVAL = 0.5
+"""Seconds between checks for modified files in watch mode."""
 
-from synthetic_home import synthetic_home
+DEBOUNCE = 0.3
+"""Seconds that files must be unchanged before rebuilding in watch mode."""
 
 
 def create_arguments(args: argparse.ArgumentParser) -> None:
@@ -45,12 +115,335 @@ def create_arguments(args: argparse.ArgumentParser) -> None:
     args.add_argument(
         "config_file",
         type=str,
-        help="Specifies the synthetic home config file.",
+        nargs="*",
+        help="Specifies the synthetic home config files.",
     )
+    args.add_argument(
+        "--batch",
+        type=str,
+        help="A directory or glob of synthetic home config files to convert.",
+    )
+    args.add_argument(
+        "--out",
+        type=str,
+        help="The output directory for inventory files when using --batch or --watch.",
+    )
+    args.add_argument(
+        "--watch",
+        action="store_true",
+        help="Rebuild inventories in the --out directory when homes or device types change.",
+    )
+    args.add_argument(
+        "--format",
+        type=binary.Format,
+        choices=list(binary.Format),
+        default=binary.Format.YAML,
+        help="The format of the inventories that are written.",
+    )
+    args.add_argument(
+        "--store",
+        type=str,
+        help="Add the inventories to a content-addressed store file instead of writing them.",
+    )
+    args.add_argument(
+        "--archive",
+        type=str,
+        help="Append the inventories to an archive file instead of writing them.",
+    )
+    args.add_argument(
+        "--compact",
+        action="store_true",
+        help="Remove replaced inventories from the --archive after appending.",
+    )
+    args.add_argument(
+        "--jobs",
+        type=int,
+        default=None,
+        help="Number of worker processes for --batch, defaults to the number of CPUs.",
+    )
+
+
+def run_batch(args: argparse.Namespace) -> int:
+    """Convert a batch of synthetic homes into inventory files."""
+    if args.out is None:
+        print("The --out directory is required with --batch", file=sys.stderr)
+        return 1
+    config_files = batch.find_config_files(args.batch)
+    if not config_files:
+        print(
+            f"No synthetic home config files found for '{args.batch}'", file=sys.stderr
+        )
+        return 1
+    failures = 0
+    for result in batch.build_inventories(
+        config_files, pathlib.Path(args.out), jobs=args.jobs, output_format=args.format
+    ):
+        if result.error is not None:
+            failures += 1
+            print(f"{result.config_file}: {result.error}", file=sys.stderr)
+    print(
+        f"Built {len(config_files) - failures} of {len(config_files)} inventories",
+        file=sys.stderr,
+    )
+    return 1 if failures else 0
+
+
+def run_store(args: argparse.Namespace) -> int:
+    """Add the inventories of the synthetic homes to a store."""
+    config_files = [pathlib.Path(config_file) for config_file in args.config_file]
+    with store.InventoryStore(pathlib.Path(args.store)) as inventory_store:
+        inventory_store.put_many(
+            (
+                config_file.stem,
+                synthetic_home.build_inventory(
+                    synthetic_home.load_synthetic_home(config_file)
+                ),
+            )
+            for config_file in config_files
+        )
+        # Remove objects of the inventories that were replaced
+        inventory_store.collect_garbage()
+        stats = inventory_store.stats()
+    print(
+        f"Stored {len(config_files)} inventories, {stats.inventories} in store "
+        f"with {stats.objects} objects ({stats.dedup_ratio:.1f}x deduplication)",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def run_archive(args: argparse.Namespace) -> int:
+    """Append the inventories of the synthetic homes to an archive."""
+    archive_file = pathlib.Path(args.archive)
+    config_files = [pathlib.Path(config_file) for config_file in args.config_file]
+    archive.append_archive(
+        archive_file,
+        (
+            (
+                config_file.stem,
+                synthetic_home.build_inventory(
+                    synthetic_home.load_synthetic_home(config_file)
+                ),
+            )
+            for config_file in config_files
+        ),
+    )
+    print(f"Appended {len(config_files)} inventories", file=sys.stderr)
+    if args.compact:
+        saved = archive.compact_archive(archive_file)
+        print(f"Compacted archive, saved {saved} bytes", file=sys.stderr)
+    return 0
+
+
+FileStats = dict[pathlib.Path, tuple[int, int]]
+
+
+def _file_stats(paths: list[pathlib.Path]) -> FileStats:
+    """Return the modification time and size of each file that exists."""
+    stats = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        stats[path] = (stat.st_mtime_ns, stat.st_size)
+    return stats
+
+
+async def poll_changes(
+    list_files: Callable[[], list[pathlib.Path]],
+    interval: float = POLL_INTERVAL,
+    debounce: float = DEBOUNCE,
+) -> AsyncGenerator[set[pathlib.Path]]:
+    """Yield the set of files that changed since the previous iteration.
+
+    Files are polled every `interval` seconds. Changes are only reported once
+    no file has changed for `debounce` seconds, so a burst of saves from an
+    editor results in a single rebuild.
+    """
+    stats = _file_stats(list_files())
+    pending: set[pathlib.Path] = set()
+    last_change = 0.0
+    while True:
+        await asyncio.sleep(interval)
+        new_stats = _file_stats(list_files())
+        if changed := {
+            path
+            for path in stats.keys() | new_stats.keys()
+            if stats.get(path) != new_stats.get(path)
+        }:
+            pending |= changed
+            last_change = time.monotonic()
+        stats = new_stats
+        if pending and time.monotonic() - last_change >= debounce:
+            yield pending
+            pending = set()
+
+
+@dataclass
+class _WatchedHome:
+    """A home being watched and its most recent build."""
+
+    output_file: pathlib.Path
+    builder: incremental.IncrementalInventoryBuilder
+    used_device_types: set[str]
+    failed: bool = False
+
+
+class InventoryWatcher:
+    """Rebuilds inventories when homes or device types change.
+
+    The device type registry and the most recent build of each home are kept
+    in memory. When a device type changes only homes using it, or homes whose
+    last build failed, are rebuilt, and an output file is only rewritten when
+    its inventory changed.
+    """
+
+    def __init__(
+        self,
+        config_files: list[pathlib.Path],
+        output_dir: pathlib.Path,
+        registry_paths: list[pathlib.Path] | None = None,
+        output_format: binary.Format = binary.Format.YAML,
+    ) -> None:
+        """Initialize InventoryWatcher.
+
+        The device types are loaded from `registry_paths`, which defaults to
+        the registry search paths.
+        """
+        self._output_dir = output_dir
+        self._output_format = output_format
+        if registry_paths is None:
+            registry_paths = [
+                pathlib.Path(str(path)) for path in device_types.registry_search_paths()
+            ]
+        self._registry_paths = registry_paths
+        self._homes = {
+            config_file: _WatchedHome(
+                output_file=output_file,
+                builder=incremental.IncrementalInventoryBuilder(),
+                used_device_types=set(),
+            )
+            for config_file, output_file in zip(
+                config_files,
+                batch.output_files_for(config_files, output_dir, output_format),
+            )
+        }
+        self._registry = self._load_registry()
+
+    def _load_registry(self) -> device_types.DeviceTypeRegistry:
+        """Load the device type registry.
+
+        Unchanged device types are reused from the registry index cache.
+        """
+        return device_types.load_lazy_registry(
+            self._registry_paths, device_types.snapshot_cache_dir()
+        )
+
+    def watched_files(self) -> list[pathlib.Path]:
+        """Return the home files and device type files to watch."""
+        return [
+            *self._homes,
+            *(
+                device_type_file
+                for registry_path in self._registry_paths
+                for device_type_file in sorted(registry_path.glob("*.yaml"))
+            ),
+        ]
+
+    def build(self, config_file: pathlib.Path) -> None:
+        """Build the inventory for a home and write it if it changed."""
+        watched = self._homes[config_file]
+        start = time.perf_counter()
+        watched.failed = True
+        try:
+            config = synthetic_home.load_synthetic_home_config(config_file)
+            watched.used_device_types = {
+                device.device_type or ""
+                for _, devices in synthetic_home.home_areas(config)
+                for device in devices
+            }
+            result = watched.builder.build(config, self._registry)
+            if result.changed:
+                binary.save_inventory(
+                    result.inventory, watched.output_file, self._output_format
+                )
+        except (SyntheticHomeError, yaml.YAMLError, OSError) as err:
+            print(f"{config_file}: {err}", file=sys.stderr)
+            return
+        watched.failed = False
+        elapsed = (time.perf_counter() - start) * 1000
+        status = f"wrote {watched.output_file}" if result.changed else "unchanged"
+        print(
+            f"{config_file}: {status} in {elapsed:.1f} ms "
+            f"({len(result.rebuilt)} devices rebuilt, {result.reused} reused)",
+            file=sys.stderr,
+        )
+
+    def on_change(self, changed: set[pathlib.Path]) -> None:
+        """Rebuild the homes affected by the changed files."""
+        rebuild = {path for path in changed if path in self._homes}
+        if changed_types := {
+            path.stem for path in changed if path.parent in self._registry_paths
+        }:
+            try:
+                self._registry = self._load_registry()
+            except SyntheticHomeError as err:
+                print(f"Unable to load device types: {err}", file=sys.stderr)
+            else:
+                rebuild |= {
+                    config_file
+                    for config_file, watched in self._homes.items()
+                    if watched.failed or watched.used_device_types & changed_types
+                }
+        for config_file in sorted(rebuild):
+            self.build(config_file)
+
+    async def watch(
+        self,
+        interval: float = POLL_INTERVAL,
+        debounce: float = DEBOUNCE,
+    ) -> None:
+        """Build every home then rebuild homes as files change, until cancelled."""
+        self._output_dir.mkdir(parents=True, exist_ok=True)
+        for config_file in self._homes:
+            self.build(config_file)
+        async for changed in poll_changes(self.watched_files, interval, debounce):
+            _LOGGER.debug("Changed files: %s", changed)
+            self.on_change(changed)
 
 
 async def run(args: argparse.Namespace) -> int:
-    home = synthetic_home.load_synthetic_home(pathlib.Path(args.config_file))
-    inventory = synthetic_home.build_inventory(home)
-    print(inventory.yaml())
+    if args.watch:
+        if args.out is None:
+            print("The --out directory is required with --watch", file=sys.stderr)
+            return 1
+        config_files = [pathlib.Path(config_file) for config_file in args.config_file]
+        if args.batch is not None:
+            config_files.extend(batch.find_config_files(args.batch))
+        if not config_files:
+            print("A config file or --batch is required", file=sys.stderr)
+            return 1
+        watcher = InventoryWatcher(
+            config_files, pathlib.Path(args.out), output_format=args.format
+        )
+        await watcher.watch()
+        return 0
+    if args.batch is not None:
+        return run_batch(args)
+    if not args.config_file:
+        print("A config file or --batch is required", file=sys.stderr)
+        return 1
+    if args.store is not None:
+        return run_store(args)
+    if args.archive is not None:
+        return run_archive(args)
+    for config_file in args.config_file:
+        home = synthetic_home.load_synthetic_home(pathlib.Path(config_file))
+        inv = synthetic_home.build_inventory(home)
+        if args.format == binary.Format.MSGPACK:
+            binary.write_inventory(inv, sys.stdout.buffer)
+            continue
+        inventory.write_inventory(inv, sys.stdout)
+        print()
     return 0
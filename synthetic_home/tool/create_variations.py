@@ -0,0 +1,95 @@
+"""Create variations of a synthetic home from the device states of its devices.
+
+Device types declare the "interesting" states of a device used for evaluation.
+The `create_variations` command enumerates combinations of those states and
+writes a multi-document yaml stream with one document per variation:
+
+```bash
+$ synthetic-home create_variations famhouse-home.yaml --strategy pairwise > variations.yaml
+```
+
+By default each document contains the state of each varied device and the
+entities that differ from the base home. Use `--format full` to write a
+complete inventory for each variation instead. Use `--strategy sample` with
+`--samples` to pick distinct random combinations:
+
+```bash
+$ synthetic-home create_variations famhouse-home.yaml --strategy sample --samples 1000 --seed 1
+```
+"""
+
+import argparse
+import pathlib
+import sys
+
+from synthetic_home import inventory, synthetic_home, variations, yaml_util
+
+
+def create_arguments(args: argparse.ArgumentParser) -> None:
+    """Get parsed passed in arguments."""
+    args.add_argument(
+        "config_file",
+        type=str,
+        help="Specifies the synthetic home config file.",
+    )
+    args.add_argument(
+        "--strategy",
+        type=variations.Strategy,
+        choices=list(variations.Strategy),
+        default=variations.Strategy.PRODUCT,
+        help="How device state combinations are enumerated.",
+    )
+    args.add_argument(
+        "--samples",
+        type=int,
+        default=None,
+        help="The number of variations with --strategy sample.",
+    )
+    args.add_argument(
+        "--seed",
+        type=int,
+        default=None,
+        help="The random seed with --strategy sample.",
+    )
+    args.add_argument(
+        "--device",
+        type=str,
+        action="append",
+        default=None,
+        help="Limit the varied devices to the device id, may be repeated.",
+    )
+    args.add_argument(
+        "--format",
+        type=str,
+        choices=["delta", "full"],
+        default="delta",
+        help="Write the changed entities or the full inventory for each variation.",
+    )
+
+
+async def run(args: argparse.Namespace) -> int:
+    if args.strategy == variations.Strategy.SAMPLE and args.samples is None:
+        print("The --samples count is required with --strategy sample", file=sys.stderr)
+        return 1
+    home = synthetic_home.load_synthetic_home(pathlib.Path(args.config_file))
+    state_variations = variations.StateVariations(home, args.device)
+    for variation in state_variations.variations(
+        args.strategy, samples=args.samples, seed=args.seed
+    ):
+        if args.format == "full":
+            inventory.write_inventory(state_variations.inventory(variation), sys.stdout)
+        else:
+            sys.stdout.write("---\n")
+            sys.stdout.write(
+                yaml_util.dump(
+                    {
+                        "variation": variation.index,
+                        "device_states": variation.device_states,
+                        "entities": [
+                            entity.to_dict(omit_none=True)
+                            for entity in variation.entities
+                        ],
+                    }
+                )
+            )
+    return 0
@@ -0,0 +1,38 @@
+"""Write the differences between two inventory files as a patch.
+
+The patch lists the areas, devices and entities that were added, removed or
+changed, matched by id:
+
+```bash
+$ synthetic-home diff_inventory base-inventory.yaml inventory.yaml > inventory.patch.yaml
+```
+
+The patch can be applied to the base inventory with `patch_inventory`. Either
+inventory may be a home in an archive, given as `ARCHIVE#HOME_ID`.
+"""
+
+import argparse
+import sys
+
+from synthetic_home import archive, diff
+
+
+def create_arguments(args: argparse.ArgumentParser) -> None:
+    """Get parsed passed in arguments."""
+    args.add_argument(
+        "base_file",
+        type=str,
+        help="Specifies the base inventory file, or ARCHIVE#HOME_ID for a home in an archive.",
+    )
+    args.add_argument(
+        "target_file",
+        type=str,
+        help="Specifies the inventory file to compare with the base inventory, or ARCHIVE#HOME_ID.",
+    )
+
+
+async def run(args: argparse.Namespace) -> int:
+    base = archive.load_inventory(args.base_file)
+    target = archive.load_inventory(args.target_file)
+    diff.write_patch(diff.diff_inventory(base, target), sys.stdout)
+    return 0
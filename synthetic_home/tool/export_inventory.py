@@ -8,16 +8,47 @@ $ HASS_URL="http://home-assistant.home-assistant:8123"
 $ API_TOKEN="XXXXXXXXXXX"
 $ synthetic-home --debug export_inventory "${HASS_URL}" "${API_TOKEN}" > inventory.yaml
 ```
+
+With `--follow` the export keeps running after the initial inventory is written,
+subscribing to `state_changed` events and keeping the inventory up to date in
+memory, so only changes are received rather than downloading every state
+again. Each change to an inventory entity is appended to a json lines change
+log with `--changes`, and the full inventory is written to the `--snapshots`
+directory every `--interval` seconds when it changed:
+
+```bash
+$ synthetic-home export_inventory "${HASS_URL}" "${API_TOKEN}" --follow \
+    --changes changes.jsonl --snapshots snapshots/ > inventory.yaml
+```
+
+A change log line has the time of the change and the new state and attributes
+of the entity, where a null state means the entity became unavailable and was
+removed from the inventory:
+
+```json
+{"time": "2024-05-01T12:00:00.000000+00:00", "entity_id": "light.kitchen_light", "state": "off", "attributes": null}
+```
+
+Following stops when the connection to Home Assistant is closed.
 """
 
 import argparse
+import asyncio
+import contextlib
+import json
 import logging
-from typing import Any
+import pathlib
+import re
+import sys
+from collections.abc import Generator, Iterable
+from dataclasses import asdict
+from typing import Any, Self, TextIO
 
 import aiohttp
-import slugify
 
-from synthetic_home import common, inventory
+from synthetic_home import binary, common, inventory
+from synthetic_home.exceptions import SyntheticHomeError
+from synthetic_home.simulation import StateChange
 
 _LOGGER = logging.getLogger(__name__)
 
@@ -26,6 +57,11 @@ DEVICE_REGISTRY_LIST = "config/device_registry/list"
 ENTITY_REGISTRY_LIST = "config/entity_registry/list"
 GET_STATES = "get_states"
 GET_CONFIG = "get_config"
+SUBSCRIBE_EVENTS = "subscribe_events"
+STATE_CHANGED = "state_changed"
+
+SNAPSHOT_INTERVAL = 300.0
+"""Default seconds between snapshots when following state changes."""
 
 DOMAINS = {
     "binary_sensor",
@@ -59,6 +95,9 @@ STRIP_ATTRIBUTES = {
     "icon",
 }
 
+_DECODER = json.JSONDecoder()
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+
 
 def create_arguments(args: argparse.ArgumentParser) -> None:
     """Get parsed passed in arguments."""
@@ -72,6 +111,34 @@ def create_arguments(args: argparse.ArgumentParser) -> None:
         type=str,
         help="Specifies home assistant API token.",
     )
+    args.add_argument(
+        "--format",
+        type=binary.Format,
+        choices=list(binary.Format),
+        default=binary.Format.YAML,
+        help="The format of the inventory that is written.",
+    )
+    args.add_argument(
+        "--follow",
+        action="store_true",
+        help="Keep running after the export and record state changes.",
+    )
+    args.add_argument(
+        "--changes",
+        type=str,
+        help="A json lines file to append state changes to when using --follow.",
+    )
+    args.add_argument(
+        "--snapshots",
+        type=str,
+        help="A directory for periodic inventory snapshots when using --follow.",
+    )
+    args.add_argument(
+        "--interval",
+        type=float,
+        default=SNAPSHOT_INTERVAL,
+        help="Seconds between snapshots when using --follow.",
+    )
 
 
 class Counter:
@@ -85,7 +152,179 @@ class Counter:
         return self._value
 
 
-next_id = Counter()
+def _skip_whitespace(text: str, pos: int) -> int:
+    """Return the position of the next non-whitespace character."""
+    match = _WHITESPACE.match(text, pos)
+    assert match
+    return match.end()
+
+
+def _expect(text: str, pos: int, token: str) -> int:
+    """Return the position after the expected token."""
+    if text[pos : pos + 1] != token:
+        raise ValueError(f"Expected '{token}' at position {pos}")
+    return pos + 1
+
+
+def parse_envelope(text: str) -> tuple[dict[str, Any], int | None]:
+    """Parse the members of a json object message that precede its `result`.
+
+    Returns the parsed members and the position of the `result` value, which
+    is left undecoded, or None when the message has no result.
+    """
+    pos = _expect(text, _skip_whitespace(text, 0), "{")
+    members: dict[str, Any] = {}
+    while (pos := _skip_whitespace(text, pos)) < len(text) and text[pos] != "}":
+        key, pos = _DECODER.raw_decode(text, pos)
+        pos = _skip_whitespace(text, _expect(text, _skip_whitespace(text, pos), ":"))
+        if key == "result":
+            return members, pos
+        members[key], pos = _DECODER.raw_decode(text, pos)
+        pos = _skip_whitespace(text, pos)
+        if text[pos : pos + 1] == ",":
+            pos += 1
+    return members, None
+
+
+def iter_json_array(text: str, pos: int = 0) -> Generator[Any]:
+    """Decode the items of the json array at `pos` one at a time."""
+    pos = _skip_whitespace(text, _expect(text, _skip_whitespace(text, pos), "["))
+    if text[pos : pos + 1] == "]":
+        return
+    while True:
+        item, pos = _DECODER.raw_decode(text, pos)
+        yield item
+        pos = _skip_whitespace(text, pos)
+        if text[pos : pos + 1] == "]":
+            return
+        pos = _skip_whitespace(text, _expect(text, pos, ","))
+
+
+class WebsocketClient:
+    """Sends commands to the Home Assistant websocket API.
+
+    Many commands may be in flight at once on the same connection. Results
+    are matched to their command by id, so they may arrive in any order.
+
+    Large results such as `get_states` may be streamed, which returns an
+    iterator that decodes one item of the result at a time rather than the
+    decoding the whole result into memory at once.
+
+    Events from a subscription are put on a queue, which receives None when
+    the websocket is closed.
+    """
+
+    def __init__(self, ws: aiohttp.ClientWebSocketResponse) -> None:
+        """Initialize WebsocketClient."""
+        self._ws = ws
+        self._next_id = Counter()
+        self._pending: dict[int, asyncio.Future[Any]] = {}
+        self._streaming: set[int] = set()
+        self._subscriptions: dict[int, asyncio.Queue[dict[str, Any] | None]] = {}
+        self._reader: asyncio.Task[None] | None = None
+
+    async def __aenter__(self) -> Self:
+        """Start reading results from the websocket."""
+        self._reader = asyncio.create_task(self._read_results())
+        return self
+
+    async def __aexit__(self, *args: object) -> None:
+        """Stop reading results from the websocket."""
+        if self._reader is not None:
+            self._reader.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await self._reader
+
+    async def send(
+        self, command_type: str, stream: bool = False
+    ) -> asyncio.Future[Any]:
+        """Send a command, returning a future for its result.
+
+        When `stream` is set the result is an iterator over the items of the
+        result list, decoded as they are consumed.
+        """
+        _, future = await self._send({"type": command_type}, stream=stream)
+        return future
+
+    async def subscribe_events(
+        self, event_type: str
+    ) -> asyncio.Queue[dict[str, Any] | None]:
+        """Subscribe to events of a type, returning a queue of the events."""
+        queue: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+        command_id, future = await self._send(
+            {"type": SUBSCRIBE_EVENTS, "event_type": event_type}, subscription=queue
+        )
+        try:
+            await future
+        except SyntheticHomeError:
+            del self._subscriptions[command_id]
+            raise
+        return queue
+
+    async def _send(
+        self,
+        command: dict[str, Any],
+        stream: bool = False,
+        subscription: asyncio.Queue[dict[str, Any] | None] | None = None,
+    ) -> tuple[int, asyncio.Future[Any]]:
+        """Send a command, returning its id and a future for its result."""
+        command_id = self._next_id.increment()
+        future: asyncio.Future[Any] = asyncio.get_running_loop().create_future()
+        self._pending[command_id] = future
+        if stream:
+            self._streaming.add(command_id)
+        if subscription is not None:
+            self._subscriptions[command_id] = subscription
+        await self._ws.send_json({"id": command_id, **command})
+        return command_id, future
+
+    def _handle_message(self, text: str) -> None:
+        """Resolve the pending command for a message."""
+        data, result_pos = parse_envelope(text)
+        if result_pos is not None and not {"id", "success"} <= data.keys():
+            # The result preceded the fields needed to handle it
+            data, result_pos = json.loads(text), None
+        command_id = data.get("id", -1)
+        if data.get("type") == "event" and (
+            queue := self._subscriptions.get(command_id)
+        ):
+            queue.put_nowait(data["event"])
+            return
+        if (future := self._pending.pop(command_id, None)) is None:
+            _LOGGER.debug("Ignoring unexpected message: %s", data.get("type"))
+            return
+        if not data.get("success", True):
+            future.set_exception(
+                SyntheticHomeError(f"Command failed: {data.get('error')}")
+            )
+            return
+        if result_pos is None:
+            result: Any = data.get("result")
+            future.set_result(iter(result) if command_id in self._streaming else result)
+        elif command_id in self._streaming:
+            future.set_result(iter_json_array(text, result_pos))
+        else:
+            future.set_result(_DECODER.raw_decode(text, result_pos)[0])
+        self._streaming.discard(command_id)
+
+    async def _read_results(self) -> None:
+        """Read messages from the websocket and resolve pending commands."""
+        try:
+            async for msg in self._ws:
+                if msg.type != aiohttp.WSMsgType.TEXT:
+                    continue
+                self._handle_message(msg.data)
+        finally:
+            for future in self._pending.values():
+                if not future.done():
+                    future.set_exception(
+                        SyntheticHomeError(
+                            "Websocket closed before a result was received"
+                        )
+                    )
+            self._pending.clear()
+            for queue in self._subscriptions.values():
+                queue.put_nowait(None)
 
 
 async def auth_login(ws: aiohttp.ClientWebSocketResponse, auth_token: str) -> None:
@@ -99,45 +338,30 @@ async def auth_login(ws: aiohttp.ClientWebSocketResponse, auth_token: str) -> No
     assert auth_ok["type"] == "auth_ok"
 
 
-async def fetch_config(ws: aiohttp.ClientWebSocketResponse) -> dict[str, Any]:
-    """Fetch areas from websocket."""
-    await ws.send_json({"id": next_id.increment(), "type": GET_CONFIG})
-    data = await ws.receive_json()
-    _LOGGER.info(data["result"])
-    assert data["result"]
-    return data["result"]  # type: ignore[no-any-return]
-
-
-async def fetch_areas(ws: aiohttp.ClientWebSocketResponse) -> dict[str, inventory.Area]:
-    """Fetch areas from websocket."""
-    await ws.send_json({"id": next_id.increment(), "type": AREA_REGISTRY_LIST})
-    data = await ws.receive_json()
+def build_areas(result: list[dict[str, Any]]) -> dict[str, inventory.Area]:
+    """Build areas from the area registry."""
     areas = {
         area["area_id"]: inventory.Area(
-            id=slugify.slugify(area["name"], separator="_"),
+            id=inventory.slugify_id(area["name"]),
             name=area["name"],
             floor=area["floor_id"],
         )
-        for area in data["result"]
+        for area in result
     }
     return areas
 
 
-async def fetch_devices(
-    ws: aiohttp.ClientWebSocketResponse, areas: dict[str, inventory.Area]
+def build_devices(
+    result: list[dict[str, Any]], areas: dict[str, inventory.Area]
 ) -> dict[str, inventory.Device]:
-    """Fetch areas from websocket."""
-
-    await ws.send_json({"id": next_id.increment(), "type": DEVICE_REGISTRY_LIST})
-    data = await ws.receive_json()
-
+    """Build devices from the device registry."""
     devices = {}
-    for device in data["result"]:
+    for device in result:
         if device.get("disabled_by") is not None:
             continue
         inv_device = inventory.Device(
             name=device["name"],
-            id=slugify.slugify(device["name"], separator="_"),
+            id=inventory.slugify_id(device["name"]),
         )
         if any(device.get(n) for n in ("model", "manufacturer", "sw_version")):
             device_info = common.DeviceInfo()
@@ -154,17 +378,14 @@ async def fetch_devices(
     return devices
 
 
-async def fetch_entities(
-    ws: aiohttp.ClientWebSocketResponse,
+def build_entities(
+    result: list[dict[str, Any]],
     areas: dict[str, inventory.Area],
     devices: dict[str, inventory.Device],
 ) -> dict[str, inventory.Entity]:
-    """Fetch devices from websocket."""
-    await ws.send_json({"id": next_id.increment(), "type": ENTITY_REGISTRY_LIST})
-    data = await ws.receive_json()
-
+    """Build entities from the entity registry."""
     entities = {}
-    for entity in data["result"]:
+    for entity in result:
         if entity.get("disabled_by") is not None:
             continue
         if entity.get("hidden_by") is not None:
@@ -192,73 +413,270 @@ async def fetch_entities(
     return entities
 
 
-async def build_states(
-    ws: aiohttp.ClientWebSocketResponse,
+def build_states(
+    result: Iterable[dict[str, Any]],
     entities: dict[str, inventory.Entity],
     unit_system: dict[str, str],
 ) -> list[inventory.Entity]:
-    """Fetch states from websocket and update inventory."""
-
-    await ws.send_json({"id": next_id.increment(), "type": GET_STATES})
-    data = await ws.receive_json()
+    """Update inventory entities with their current states.
 
+    The states may be streamed, in which case each state is discarded once
+    it is processed so only the states of the inventory entities are kept.
+    """
     temperature_unit = unit_system["temperature"]
     results = []
-    for state in data["result"]:
-        entity_id = state["entity_id"]
-        if (inv_entity := entities.get(entity_id)) is None:
-            continue
-        entity_state = state["state"]
-        if entity_state in ("unavailable", "unknown"):
+    for state in result:
+        if (inv_entity := entities.get(state["entity_id"])) is None:
             continue
-        inv_entity.state = entity_state
-        if (attributes := state.get("attributes")) is not None:
-            if friendly_name := attributes.get("friendly_name"):
-                inv_entity.name = friendly_name.strip()
-            inv_attributes = {
-                k: v
-                for k, v in attributes.items()
-                if (v is not None) and (k not in STRIP_ATTRIBUTES)
-            }
-
-            if entity_id.startswith("climate."):
-                inv_attributes["unit_of_measurement"] = temperature_unit
-            if inv_attributes:
-                inv_entity.attributes = inv_attributes
-        results.append(inv_entity)
+        if update_entity(inv_entity, state, temperature_unit):
+            results.append(inv_entity)
     return results
 
 
+def update_entity(
+    inv_entity: inventory.Entity, state: dict[str, Any], temperature_unit: str
+) -> bool:
+    """Update an inventory entity from a state object.
+
+    Returns False when the entity is unavailable and should not be in the
+    inventory.
+    """
+    entity_state = state["state"]
+    if entity_state in ("unavailable", "unknown"):
+        return False
+    inv_entity.state = entity_state
+    if (attributes := state.get("attributes")) is not None:
+        if friendly_name := attributes.get("friendly_name"):
+            inv_entity.name = friendly_name.strip()
+        inv_attributes = {
+            k: v
+            for k, v in attributes.items()
+            if (v is not None) and (k not in STRIP_ATTRIBUTES)
+        }
+
+        if inv_entity.id and inv_entity.id.startswith("climate."):
+            inv_attributes["unit_of_measurement"] = temperature_unit
+        inv_entity.attributes = inv_attributes or None
+    return True
+
+
+async def _fetch(
+    client: WebsocketClient,
+) -> tuple[inventory.Inventory, dict[str, inventory.Entity], str]:
+    """Fetch the inventory, the registry entities and the temperature unit."""
+    config_result = await client.send(GET_CONFIG)
+    areas_result = await client.send(AREA_REGISTRY_LIST)
+    devices_result = await client.send(DEVICE_REGISTRY_LIST)
+    entities_result = await client.send(ENTITY_REGISTRY_LIST)
+    states_result = await client.send(GET_STATES, stream=True)
+
+    areas = build_areas(await areas_result)
+    devices = build_devices(await devices_result, areas)
+    entities = build_entities(await entities_result, areas, devices)
+    required_device_ids = set({entity.device for entity in entities.values()})
+
+    config = await config_result
+    _LOGGER.info(config)
+    unit_system = config["unit_system"]
+
+    # Only include required devices for entities
+    inv = inventory.Inventory()
+
+    # Fetch state for all relevant entities
+    inv.entities = build_states(await states_result, entities, unit_system)
+    inv.areas = list(areas.values())
+    inv.devices = [
+        device for device in devices.values() if device.id in required_device_ids
+    ]
+    return inv, entities, unit_system["temperature"]
+
+
+async def fetch_inventory(client: WebsocketClient) -> inventory.Inventory:
+    """Fetch the inventory from Home Assistant.
+
+    All commands are sent up front and each result is processed as soon as it
+    and the results it depends on have arrived, while the remaining results
+    are still being received.
+    """
+    inv, _, _ = await _fetch(client)
+    return inv
+
+
+class InventoryFollower:
+    """Keeps an exported inventory up to date from `state_changed` events.
+
+    Entities are only tracked if they were in the entity registry at the time
+    of the export. An entity that becomes unavailable is removed from the
+    inventory, and is added back at the end when it has a state again.
+    """
+
+    def __init__(
+        self,
+        inv: inventory.Inventory,
+        entities: dict[str, inventory.Entity],
+        temperature_unit: str,
+    ) -> None:
+        """Initialize InventoryFollower."""
+        self._inventory = inv
+        self._registry_entities = entities
+        self._temperature_unit = temperature_unit
+        self._entities = {str(entity.id): entity for entity in inv.entities}
+        self.changed = False
+        """True when the inventory changed since this was last cleared."""
+
+    def apply(self, event: dict[str, Any]) -> StateChange | None:
+        """Apply a `state_changed` event, returning the change to the inventory."""
+        data = event["data"]
+        entity_id = data["entity_id"]
+        if (inv_entity := self._registry_entities.get(entity_id)) is None:
+            return None
+        new_state = data.get("new_state")
+        if new_state is None or not update_entity(
+            inv_entity, new_state, self._temperature_unit
+        ):
+            if self._entities.pop(entity_id, None) is None:
+                return None
+            change = StateChange(entity_id=entity_id, state=None, attributes=None)
+        else:
+            self._entities[entity_id] = inv_entity
+            change = StateChange(
+                entity_id=entity_id,
+                state=inv_entity.state,
+                attributes=inv_entity.attributes,
+            )
+        self.changed = True
+        return change
+
+    def inventory(self) -> inventory.Inventory:
+        """Return the current inventory.
+
+        The areas, devices and entities are shared with the follower.
+        """
+        return inventory.Inventory(
+            language=self._inventory.language,
+            areas=self._inventory.areas,
+            devices=self._inventory.devices,
+            entities=list(self._entities.values()),
+        )
+
+
+class _SnapshotWriter:
+    """Writes numbered snapshots of the inventory to a directory."""
+
+    def __init__(
+        self, snapshot_dir: pathlib.Path, output_format: binary.Format
+    ) -> None:
+        """Initialize _SnapshotWriter."""
+        self._snapshot_dir = snapshot_dir
+        self._output_format = output_format
+        self._index = 0
+
+    def write(self, inv: inventory.Inventory) -> None:
+        """Write the inventory as the next snapshot."""
+        self._snapshot_dir.mkdir(parents=True, exist_ok=True)
+        snapshot_file = self._snapshot_dir / (
+            f"inventory-{self._index:05d}{self._output_format.suffix}"
+        )
+        binary.save_inventory(inv, snapshot_file, self._output_format)
+        _LOGGER.info("Wrote snapshot %s", snapshot_file)
+        self._index += 1
+
+
+async def follow_inventory(
+    subscription: asyncio.Queue[dict[str, Any] | None],
+    follower: InventoryFollower,
+    changes: TextIO | None = None,
+    snapshots: _SnapshotWriter | None = None,
+    interval: float = SNAPSHOT_INTERVAL,
+) -> None:
+    """Apply events from the subscription until the websocket is closed.
+
+    Each change is appended to the `changes` log as a line of json, and a
+    snapshot of the inventory is written every `interval` seconds when it
+    changed and once more when following stops.
+    """
+
+    def write_snapshot() -> None:
+        if snapshots is not None and follower.changed:
+            snapshots.write(follower.inventory())
+        follower.changed = False
+
+    async def write_snapshots() -> None:
+        while True:
+            await asyncio.sleep(interval)
+            write_snapshot()
+
+    snapshot_task = asyncio.create_task(write_snapshots())
+    try:
+        while (event := await subscription.get()) is not None:
+            if (change := follower.apply(event)) is None or changes is None:
+                continue
+            changes.write(
+                json.dumps({"time": event.get("time_fired"), **asdict(change)}) + "\n"
+            )
+            changes.flush()
+    finally:
+        snapshot_task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await snapshot_task
+        write_snapshot()
+
+
+def _open_changes(changes_file: str) -> TextIO:
+    """Open the change log for appending."""
+    return pathlib.Path(changes_file).open("a")
+
+
+def _write_inventory(inv: inventory.Inventory, output_format: binary.Format) -> None:
+    """Write the inventory to stdout."""
+    if output_format == binary.Format.MSGPACK:
+        binary.write_inventory(inv, sys.stdout.buffer)
+        sys.stdout.buffer.flush()
+    else:
+        print(inv.yaml(), flush=True)
+
+
 async def run(args: argparse.Namespace) -> int:
     url = args.homeassistant_url
     auth_token = args.auth_token
+    follow = args.follow
+    if follow and args.changes is None and args.snapshots is None:
+        print("--follow requires --changes or --snapshots", file=sys.stderr)
+        return 1
 
     async with aiohttp.ClientSession() as session:
         area_url = f"{url}/api/websocket"
         _LOGGER.info("Fetching areas from %s", url)
         async with session.ws_connect(area_url) as ws:
             await auth_login(ws, auth_token)
-
-            config = await fetch_config(ws)
-            unit_system = config["unit_system"]
-            areas = await fetch_areas(ws)
-            devices = await fetch_devices(ws, areas)
-            entities = await fetch_entities(ws, areas, devices)
-
-            required_device_ids = set({entity.device for entity in entities.values()})
-
-            # Only include required devices for entities
-            inv = inventory.Inventory()
-
-            # Fetch state for all relevant entities
-            inv.entities = await build_states(ws, entities, unit_system)
-            inv.areas = list(areas.values())
-            inv.devices = [
-                device
-                for device in devices.values()
-                if device.id in required_device_ids
-            ]
-
-            print(inv.yaml())
+            async with WebsocketClient(ws) as client:
+                if not follow:
+                    _write_inventory(await fetch_inventory(client), args.format)
+                    return 0
+
+                # Subscribe first so no change is missed after the export
+                subscription = await client.subscribe_events(STATE_CHANGED)
+                inv, entities, temperature_unit = await _fetch(client)
+                _write_inventory(inv, args.format)
+                snapshots = None
+                if args.snapshots is not None:
+                    snapshots = _SnapshotWriter(
+                        pathlib.Path(args.snapshots), args.format
+                    )
+                    snapshots.write(inv)
+                with contextlib.ExitStack() as stack:
+                    changes: TextIO | None = None
+                    if args.changes is not None:
+                        changes = stack.enter_context(
+                            await asyncio.to_thread(_open_changes, args.changes)
+                        )
+                    await follow_inventory(
+                        subscription,
+                        InventoryFollower(inv, entities, temperature_unit),
+                        changes,
+                        snapshots,
+                        args.interval,
+                    )
+                _LOGGER.info("Connection to %s closed", url)
 
     return 0
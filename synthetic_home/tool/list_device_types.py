@@ -3,9 +3,7 @@
 import argparse
 import dataclasses
 
-import yaml
-
-from synthetic_home import device_types
+from synthetic_home import device_types, yaml_util
 
 
 def create_arguments(args: argparse.ArgumentParser) -> None:
@@ -18,12 +16,20 @@ def create_arguments(args: argparse.ArgumentParser) -> None:
 
 
 async def run(args: argparse.Namespace) -> int:
-    registry = device_types.load_device_type_registry()
-    data = registry.device_types
     if args.device_type is not None:
-        device_type = data[args.device_type]
-        data = {device_type.device_type: data[args.device_type]}
+        device_type = device_types.load_device_type_registry().device_types[
+            args.device_type
+        ]
+        data = {device_type.device_type: device_type}
+    else:
+        # Every device type is listed, so load them all from the snapshot
+        data = dict(
+            device_types.load_registry_snapshot(
+                device_types.registry_search_paths(),
+                device_types.snapshot_cache_dir(),
+            ).device_types
+        )
     dict_data = {k: dataclasses.asdict(v) for k, v in data.items()}
-    yaml_dump = yaml.dump(dict_data, sort_keys=False)
+    yaml_dump = yaml_util.dump(dict_data)
     print(yaml_dump)
     return 0
@@ -0,0 +1,38 @@
+"""Apply patches from `diff_inventory` to an inventory file.
+
+The patches are applied in order and the resulting inventory is written to
+stdout:
+
+```bash
+$ synthetic-home patch_inventory base-inventory.yaml inventory.patch.yaml > inventory.yaml
+```
+"""
+
+import argparse
+import pathlib
+import sys
+
+from synthetic_home import archive, diff, inventory
+
+
+def create_arguments(args: argparse.ArgumentParser) -> None:
+    """Get parsed passed in arguments."""
+    args.add_argument(
+        "base_file",
+        type=str,
+        help="Specifies the base inventory file, or ARCHIVE#HOME_ID for a home in an archive.",
+    )
+    args.add_argument(
+        "patch_file",
+        type=str,
+        nargs="+",
+        help="Specifies the patch files to apply in order.",
+    )
+
+
+async def run(args: argparse.Namespace) -> int:
+    inv = archive.load_inventory(args.base_file)
+    for patch_file in args.patch_file:
+        inv = diff.apply_patch(inv, diff.load_patch(pathlib.Path(patch_file)))
+    inventory.write_inventory(inv, sys.stdout)
+    return 0
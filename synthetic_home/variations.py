@@ -0,0 +1,267 @@
+"""Enumerate the device state variations of a synthetic home.
+
+Device types declare a list of "interesting" device states used for
+evaluation. `StateVariations` expands a synthetic home into combinations of
+those states, either the full cartesian product, a pairwise covering set, or
+a random sample, and renders each variation as an inventory or as the entities
+that differ from the base home.
+
+Variations are produced lazily. The entities for each device state are built
+once and shared by every variation, so the memory used does not grow with the
+number of variations enumerated. Shared entities must be treated as read-only.
+"""
+
+import itertools
+import logging
+import random
+import sys
+from collections.abc import Generator
+from dataclasses import dataclass, field
+from enum import StrEnum
+from math import prod
+
+from . import inventory
+from .device_types import DeviceTypeRegistry
+from .exceptions import SyntheticHomeError
+from .synthetic_home import DeviceStateEntities, SyntheticHome, home_devices
+
+__all__ = [
+    "Strategy",
+    "VariationAxis",
+    "Variation",
+    "StateVariations",
+]
+
+_LOGGER = logging.getLogger(__name__)
+
+
+class Strategy(StrEnum):
+    """How device state combinations are enumerated."""
+
+    PRODUCT = "product"
+    """Every combination of device states."""
+
+    PAIRWISE = "pairwise"
+    """Combinations covering every pair of states of any two devices."""
+
+    SAMPLE = "sample"
+    """Distinct combinations picked at random."""
+
+
+@dataclass(frozen=True)
+class VariationAxis:
+    """A device whose state is varied and the states it may be in."""
+
+    device_id: str
+    """The inventory id of the device."""
+
+    states: tuple[str, ...]
+    """The device state names, starting with the state in the base home."""
+
+
+@dataclass
+class Variation:
+    """A combination of device states for the home."""
+
+    index: int
+    """The position of the variation in the enumeration."""
+
+    device_states: dict[str, str]
+    """The state name of each varied device, by device id."""
+
+    entities: list[inventory.Entity] = field(default_factory=list)
+    """The entities that differ from the base home."""
+
+
+class StateVariations:
+    """Enumerates combinations of device states for a synthetic home.
+
+    Every device whose device type declares more than one device state is
+    varied, unless limited to specific device ids. Devices with a custom
+    device state in the home are never varied.
+    """
+
+    def __init__(
+        self, home: SyntheticHome, device_ids: list[str] | None = None
+    ) -> None:
+        """Initialize StateVariations."""
+        registry = home.device_type_registry
+        if registry is None:
+            raise SyntheticHomeError("Synthetic home has no device type registry")
+        self._registry: DeviceTypeRegistry = registry
+        self._base = inventory.Inventory()
+        self._devices: list[DeviceStateEntities] = []
+        self._axes: list[VariationAxis] = []
+        self._build_base(home)
+        if device_ids is not None:
+            unknown = set(device_ids) - {axis.device_id for axis in self._axes}
+            if unknown:
+                raise SyntheticHomeError(
+                    f"Devices {sorted(unknown)} do not have device states to vary"
+                )
+            self._axes = [axis for axis in self._axes if axis.device_id in device_ids]
+        axis_index = {axis.device_id: i for i, axis in enumerate(self._axes)}
+        self._device_axes = [axis_index.get(entry.device_id) for entry in self._devices]
+
+    def _build_base(self, home: SyntheticHome) -> None:
+        """Build the base inventory and find the devices that can be varied."""
+        entities: list[inventory.Entity] = []
+        for home_device in home_devices(home, self._base.areas):
+            self._base.devices.append(home_device.device)
+            entry = DeviceStateEntities.from_home_device(home_device, self._registry)
+            self._devices.append(entry)
+            entities.extend(entry.state_entities(entry.base_state))
+            device_type = entry.device_type
+            if entry.base_state is None or len(device_type.device_states) < 2:
+                continue
+            self._axes.append(
+                VariationAxis(
+                    device_id=entry.device_id,
+                    states=(
+                        entry.base_state,
+                        *(
+                            device_state.name
+                            for device_state in device_type.device_states
+                            if device_state.name != entry.base_state
+                        ),
+                    ),
+                )
+            )
+        self._base.entities = entities
+
+    @property
+    def base(self) -> inventory.Inventory:
+        """The inventory of the home with every device in its base state."""
+        return self._base
+
+    @property
+    def axes(self) -> list[VariationAxis]:
+        """The devices that are varied and their states."""
+        return self._axes
+
+    @property
+    def count(self) -> int:
+        """The number of combinations in the full cartesian product."""
+        return prod(len(axis.states) for axis in self._axes)
+
+    def _combinations(
+        self, strategy: Strategy, samples: int | None, seed: int | None
+    ) -> Generator[tuple[int, ...]]:
+        """Yield combinations as the index of the state of each axis."""
+        sizes = [len(axis.states) for axis in self._axes]
+        if strategy == Strategy.PRODUCT:
+            yield from itertools.product(*(range(size) for size in sizes))
+        elif strategy == Strategy.PAIRWISE:
+            yield from _pairwise(sizes)
+        elif strategy == Strategy.SAMPLE:
+            if samples is None:
+                raise SyntheticHomeError("The number of samples is required")
+            rng = random.Random(seed)
+            count = self.count
+            if count <= sys.maxsize:
+                for index in rng.sample(range(count), min(samples, count)):
+                    yield _unrank(index, sizes)
+                return
+            # Too large for sample(), so collisions between draws are rare
+            seen: set[int] = set()
+            while len(seen) < samples:
+                if (index := rng.randrange(count)) not in seen:
+                    seen.add(index)
+                    yield _unrank(index, sizes)
+        else:
+            raise SyntheticHomeError(f"Unknown variation strategy '{strategy}'")
+
+    def variations(
+        self,
+        strategy: Strategy = Strategy.PRODUCT,
+        samples: int | None = None,
+        seed: int | None = None,
+    ) -> Generator[Variation]:
+        """Yield the variations of the home for the strategy.
+
+        The product starts with the base home. Sampling picks `samples`
+        distinct combinations, reproducible given the same `seed`.
+        """
+        for index, combination in enumerate(
+            self._combinations(strategy, samples, seed)
+        ):
+            variation = Variation(
+                index=index,
+                device_states={
+                    axis.device_id: axis.states[state]
+                    for axis, state in zip(self._axes, combination)
+                },
+            )
+            for entry, axis in zip(self._devices, self._device_axes, strict=True):
+                if axis is not None and combination[axis]:
+                    state_name = self._axes[axis].states[combination[axis]]
+                    variation.entities.extend(entry.state_entities(state_name))
+            yield variation
+
+    def inventory(self, variation: Variation) -> inventory.Inventory:
+        """Return the full inventory for the variation.
+
+        The areas, devices and unchanged entities are shared with the base
+        inventory.
+        """
+        entities: list[inventory.Entity] = []
+        for entry, axis in zip(self._devices, self._device_axes, strict=True):
+            state_name = entry.base_state
+            if axis is not None:
+                state_name = variation.device_states[self._axes[axis].device_id]
+            entities.extend(entry.state_entities(state_name))
+        return inventory.Inventory(
+            language=self._base.language,
+            areas=list(self._base.areas),
+            devices=list(self._base.devices),
+            entities=entities,
+        )
+
+
+def _unrank(index: int, sizes: list[int]) -> tuple[int, ...]:
+    """Return the combination at the index of the cartesian product."""
+    combination = []
+    for size in reversed(sizes):
+        index, state = divmod(index, size)
+        combination.append(state)
+    return tuple(reversed(combination))
+
+
+def _pairwise(sizes: list[int]) -> Generator[tuple[int, ...]]:
+    """Yield combinations until every pair of values of two axes is covered.
+
+    This greedily seeds each combination with the first uncovered pair then
+    picks the value for each remaining axis that covers the most uncovered
+    pairs, preferring earlier values on ties.
+    """
+    if len(sizes) < 2:
+        yield from itertools.product(*(range(size) for size in sizes))
+        return
+    uncovered = {
+        (i, a, j, b)
+        for i, j in itertools.combinations(range(len(sizes)), 2)
+        for a in range(sizes[i])
+        for b in range(sizes[j])
+    }
+    while uncovered:
+        i, a, j, b = min(uncovered)
+        row: list[int | None] = [None] * len(sizes)
+        row[i] = a
+        row[j] = b
+        for k in range(len(sizes)):
+            if row[k] is not None:
+                continue
+            assigned = [(p, v) for p, v in enumerate(row) if v is not None]
+            row[k] = max(
+                range(sizes[k]),
+                key=lambda value: sum(
+                    ((p, v, k, value) if p < k else (k, value, p, v)) in uncovered
+                    for p, v in assigned
+                ),
+            )
+        combination = tuple(v for v in row if v is not None)
+        uncovered -= {
+            (p, combination[p], q, combination[q])
+            for p, q in itertools.combinations(range(len(sizes)), 2)
+        }
+        yield combination
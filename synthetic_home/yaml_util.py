@@ -0,0 +1,81 @@
+"""Yaml loading and dumping used across the library.
+
+The libyaml C bindings are used when PyYAML was built with them, falling back
+to the pure python implementation otherwise. Output is byte-identical with
+either implementation.
+"""
+
+from collections.abc import Generator
+from typing import Any, TextIO
+
+import yaml
+from mashumaro.codecs import BasicDecoder
+
+from . import profiling
+
+__all__ = [
+    "HAS_LIBYAML",
+    "load",
+    "load_all",
+    "dump",
+    "decode",
+]
+
+HAS_LIBYAML: bool = getattr(yaml, "__with_libyaml__", False)
+"""True when the libyaml C bindings are available."""
+
+SafeLoader: type[yaml.SafeLoader] = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+SafeDumper: type[yaml.SafeDumper] = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
+# The default PyYAML preferred line width
+_BEST_WIDTH = 80
+
+
+def load(content: str | bytes | TextIO) -> Any:
+    """Load a single yaml document."""
+    return yaml.load(content, Loader=SafeLoader)
+
+
+def load_all(content: str | bytes | TextIO) -> Generator[Any]:
+    """Load each document in a multi-document yaml stream as it is read."""
+    yield from yaml.load_all(content, Loader=SafeLoader)
+
+
+def _may_differ(text: str) -> bool:
+    """Return True if the libyaml output may differ from the pure python output.
+
+    The two emitters only differ in how they wrap double quoted scalars that
+    are longer than the line width, so this looks for lines that are too long
+    or where a quoted scalar continues on the next line.
+    """
+    if '"' not in text:
+        return False
+    for line in text.splitlines():
+        if '"' not in line:
+            continue
+        if len(line) > _BEST_WIDTH:
+            return True
+        if line.replace("\\\\", "").replace('\\"', "").count('"') % 2:
+            return True
+    return False
+
+
+def dump(data: Any, **kwargs: Any) -> str:
+    """Dump the data as yaml, preserving the key order of dictionaries."""
+    text: str = yaml.dump(data, Dumper=SafeDumper, sort_keys=False, **kwargs)
+    if SafeDumper is not yaml.SafeDumper and _may_differ(text):
+        text = yaml.dump(data, Dumper=yaml.SafeDumper, sort_keys=False, **kwargs)
+    return text
+
+
+# Decoders by type, since they are expensive to build
+_DECODERS: dict[Any, BasicDecoder[Any]] = {}
+
+
+def decode[T](content: str | bytes, shape_type: type[T]) -> T:
+    """Decode the yaml content into the specified type."""
+    if (decoder := _DECODERS.get(shape_type)) is None:
+        decoder = _DECODERS[shape_type] = BasicDecoder(shape_type)
+    with profiling.stage("yaml_decode"):
+        result: T = decoder.decode(load(content))
+    return result
@@ -7,6 +7,8 @@ from syrupy import SnapshotAssertion
 from syrupy.extensions.amber import AmberSnapshotExtension
 from syrupy.location import PyTestLocation
 
+from synthetic_home import device_types
+
 DIFFERENT_DIRECTORY = "snapshots"
 
 
@@ -25,3 +27,9 @@ class DifferentDirectoryExtension(AmberSnapshotExtension):
 def snapshot(snapshot: SnapshotAssertion) -> SnapshotAssertion:
     """Fixture to override the snapshot directory."""
     return snapshot.use_extension(DifferentDirectoryExtension)
+
+
+@pytest.fixture(autouse=True)
+def mock_cache_dir(tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    """Fixture to write registry snapshots to a temporary directory."""
+    monkeypatch.setenv(device_types.CACHE_DIR_ENV, str(tmp_path / "cache"))
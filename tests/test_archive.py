@@ -0,0 +1,159 @@
+"""Test for archive."""
+
+import pathlib
+from collections.abc import Iterator
+
+import pytest
+
+from synthetic_home import archive, binary, inventory, synthetic_home
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+
+
+def build_inventories() -> dict[str, inventory.Inventory]:
+    """Build an inventory for each test home by home id."""
+    return {
+        home_filename.stem: synthetic_home.build_inventory(
+            synthetic_home.load_synthetic_home(home_filename)
+        )
+        for home_filename in sorted(TEST_HOMES.glob("*.yaml"))
+    }
+
+
+def test_archive(tmp_path: pathlib.Path) -> None:
+    """Test reading inventories from an archive by home id."""
+    inventories = build_inventories()
+    path = tmp_path / "homes.archive"
+    archive.append_archive(path, inventories.items())
+
+    with archive.InventoryArchive(path) as reader:
+        assert reader.ids() == list(inventories)
+        assert len(reader) == len(inventories)
+        assert "home1" in reader
+        assert "unknown" not in reader
+        for home_id in reversed(list(reader)):
+            inv = inventories[home_id]
+            assert reader.load(home_id) == inv
+            assert binary.decode_inventory(reader.read(home_id)) == inv
+            assert reader.load_entities(home_id) == inv.entities
+        with pytest.raises(SyntheticHomeError, match="unknown"):
+            reader.load("unknown")
+
+
+def test_append(tmp_path: pathlib.Path) -> None:
+    """Test appending to an archive keeps the existing inventories."""
+    inventories = build_inventories()
+    path = tmp_path / "homes.archive"
+    items = list(inventories.items())
+    archive.append_archive(path, items[:2])
+    archive.append_archive(path, [])
+    archive.append_archive(path, items[2:])
+    replacement = inventory.Inventory(areas=[inventory.Area(name="Kitchen")])
+    archive.append_archive(path, [(items[0][0], replacement)])
+
+    with archive.InventoryArchive(path) as reader:
+        assert reader.ids() == list(inventories)
+        assert reader.load(items[0][0]) == replacement
+        assert reader.load_entities(items[0][0]) == []
+        for home_id, inv in items[1:]:
+            assert reader.load(home_id) == inv
+
+    # Previous indexes are left unused until the archive is compacted
+    one_at_a_time = tmp_path / "one-at-a-time.archive"
+    for item in items:
+        archive.append_archive(one_at_a_time, [item])
+    all_at_once = tmp_path / "all-at-once.archive"
+    archive.append_archive(all_at_once, items)
+    assert one_at_a_time.stat().st_size > all_at_once.stat().st_size
+    archive.compact_archive(one_at_a_time)
+    assert one_at_a_time.read_bytes() == all_at_once.read_bytes()
+
+
+def test_append_failure(tmp_path: pathlib.Path) -> None:
+    """Test an append that fails partway leaves the archive unchanged."""
+    items = list(build_inventories().items())
+    path = tmp_path / "homes.archive"
+    archive.append_archive(path, items[:2])
+    content = path.read_bytes()
+
+    def failing_inventories() -> Iterator[tuple[str, inventory.Inventory]]:
+        yield items[0][0], inventory.Inventory()
+        yield from items[2:]
+        raise SyntheticHomeError("Failed to build home")
+
+    with pytest.raises(SyntheticHomeError, match="Failed to build home"):
+        archive.append_archive(path, failing_inventories())
+    assert path.read_bytes() == content
+
+    with archive.InventoryArchive(path) as reader:
+        assert reader.ids() == [home_id for home_id, _ in items[:2]]
+        for home_id, inv in items[:2]:
+            assert reader.load(home_id) == inv
+
+
+def test_compact(tmp_path: pathlib.Path) -> None:
+    """Test compacting an archive removes replaced inventories."""
+    items = list(build_inventories().items())
+    path = tmp_path / "homes.archive"
+    archive.append_archive(path, items)
+    archive.append_archive(path, items[:2])
+    size = path.stat().st_size
+
+    saved = archive.compact_archive(path)
+    assert saved > 0
+    assert path.stat().st_size == size - saved
+    expected = tmp_path / "expected.archive"
+    archive.append_archive(expected, items)
+    assert path.read_bytes() == expected.read_bytes()
+    assert archive.compact_archive(path) == 0
+    assert sorted(file.name for file in tmp_path.iterdir()) == [
+        "expected.archive",
+        "homes.archive",
+    ]
+
+
+def test_load_inventory(tmp_path: pathlib.Path) -> None:
+    """Test loading inventory files or homes from an archive."""
+    inventories = build_inventories()
+    path = tmp_path / "homes.archive"
+    archive.append_archive(path, inventories.items())
+    assert archive.load_inventory(f"{path}#home1") == inventories["home1"]
+    with pytest.raises(SyntheticHomeError, match="'unknown' is not in archive"):
+        archive.load_inventory(f"{path}#unknown")
+
+    inventory_file = tmp_path / "inventory.yaml"
+    inventory_file.write_text(inventories["home1"].yaml())
+    assert archive.load_inventory(str(inventory_file)) == inventory.load_inventory(
+        inventory_file
+    )
+    with pytest.raises(SyntheticHomeError, match="does not exist"):
+        archive.load_inventory(f"{tmp_path}/missing.yaml#home1")
+
+
+def test_invalid_archive(tmp_path: pathlib.Path) -> None:
+    """Test errors opening files that are not archives."""
+    with pytest.raises(SyntheticHomeError, match="does not exist"):
+        archive.InventoryArchive(tmp_path / "missing.archive")
+
+    path = tmp_path / "home1.yaml"
+    path.write_text((TEST_HOMES / "home1.yaml").read_text())
+    with pytest.raises(SyntheticHomeError, match="not an inventory archive"):
+        archive.InventoryArchive(path)
+    with pytest.raises(SyntheticHomeError, match="not an inventory archive"):
+        archive.append_archive(path, [])
+
+    path = tmp_path / "empty.archive"
+    archive.append_archive(path, [])
+    with archive.InventoryArchive(path) as reader:
+        assert reader.ids() == []
+
+    path = tmp_path / "corrupt.archive"
+    archive.append_archive(path, list(build_inventories().items())[:1])
+    content = bytearray(path.read_bytes())
+    content[-2:] = b"]]"
+    path.write_bytes(content)
+    with pytest.raises(SyntheticHomeError, match="invalid index"):
+        archive.InventoryArchive(path)
+    with pytest.raises(SyntheticHomeError, match="invalid index"):
+        archive.append_archive(path, [])
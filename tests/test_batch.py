@@ -0,0 +1,131 @@
+"""Test for batch."""
+
+import pathlib
+import shutil
+from unittest.mock import patch
+
+import pytest
+
+from synthetic_home import batch, device_types
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+TEST_FIXTURES = pathlib.Path("tests/fixtures")
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_build_inventories(tmp_path: pathlib.Path, jobs: int) -> None:
+    """Test building inventories for a directory of homes."""
+
+    config_files = batch.find_config_files(str(TEST_HOMES))
+    assert config_files
+
+    results = list(batch.build_inventories(config_files, tmp_path, jobs=jobs))
+    assert [result.config_file for result in results] == config_files
+    for result in results:
+        assert result.error is None
+        assert result.output_file == tmp_path / result.config_file.name
+        inventory_content = (TEST_FIXTURES / result.config_file.name).read_text()
+        assert result.output_file.read_text().strip() == inventory_content.strip()
+
+
+def test_build_inventories_errors(tmp_path: pathlib.Path) -> None:
+    """Test that a failing home is reported without stopping the batch."""
+
+    invalid_home = tmp_path / "invalid.yaml"
+    invalid_home.write_text(
+        "name: Invalid\ndevices:\n  Kitchen:\n  - name: Light\n    device_type: unknown\n"
+    )
+    unnamed_home = tmp_path / "unnamed.yaml"
+    unnamed_home.write_text(
+        "devices:\n  Kitchen:\n  - name: Light\n    device_type: light\n"
+    )
+    config_files = [
+        TEST_HOMES / "home1.yaml",
+        invalid_home,
+        tmp_path / "missing.yaml",
+        unnamed_home,
+    ]
+    output_dir = tmp_path / "out"
+
+    results = list(batch.build_inventories(config_files, output_dir, jobs=2))
+    assert [result.output_file for result in results] == [
+        output_dir / "home1.yaml",
+        None,
+        None,
+        None,
+    ]
+    assert results[1].error
+    assert "unknown" in results[1].error
+    assert results[2].error
+    assert "does not exist" in results[2].error
+    assert results[3].error
+    assert '"name"' in results[3].error
+
+
+def test_build_inventories_preloads_registry(tmp_path: pathlib.Path) -> None:
+    """Test device types are parsed once before starting the worker processes."""
+
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    (registry_dir / "broken.yaml").write_text((registry_dir / "light.yaml").read_text())
+    registry = device_types.load_lazy_registry([registry_dir])
+    broken_home = tmp_path / "broken.yaml"
+    broken_home.write_text(
+        "name: Broken\ndevices:\n  Kitchen:\n  - name: Light\n    device_type: broken\n"
+    )
+    config_files = [TEST_HOMES / "home1.yaml", broken_home]
+
+    with patch(
+        "synthetic_home.device_types._read_device_type",
+        wraps=device_types._read_device_type,
+    ) as mock_read:
+        results = list(
+            batch.build_inventories(
+                config_files,
+                tmp_path / "out",
+                jobs=2,
+                device_type_registry=registry,
+            )
+        )
+    assert mock_read.call_count == len(registry.device_types)
+    assert results[0].error is None
+    assert results[1].error
+    assert "does not match" in results[1].error
+
+
+def test_build_inventories_registry_snapshot(tmp_path: pathlib.Path) -> None:
+    """Test workers share the device types loaded from the registry snapshot."""
+
+    config_files = [TEST_HOMES / "home1.yaml", TEST_HOMES / "light-example.yaml"]
+    results = list(batch.build_inventories(config_files, tmp_path / "out", jobs=2))
+    assert [result.error for result in results] == [None, None]
+    assert len(list((tmp_path / "cache").glob("registry-*.pickle"))) == 1
+
+    with patch(
+        "synthetic_home.device_types._read_device_type", side_effect=AssertionError
+    ):
+        results = list(batch.build_inventories(config_files, tmp_path / "out", jobs=2))
+    assert [result.error for result in results] == [None, None]
+
+
+def test_find_config_files_glob() -> None:
+    """Test finding config files using a glob pattern."""
+
+    config_files = batch.find_config_files(str(TEST_HOMES / "light-*.yaml"))
+    assert config_files == sorted(TEST_HOMES.glob("light-*.yaml"))
+
+
+def test_duplicate_output_files(tmp_path: pathlib.Path) -> None:
+    """Test that homes writing the same output file are rejected."""
+
+    other_dir = tmp_path / "other"
+    other_dir.mkdir()
+    (other_dir / "home1.yaml").write_text((TEST_HOMES / "home1.yaml").read_text())
+
+    with pytest.raises(SyntheticHomeError, match="would both write"):
+        list(
+            batch.build_inventories(
+                [TEST_HOMES / "home1.yaml", other_dir / "home1.yaml"], tmp_path / "out"
+            )
+        )
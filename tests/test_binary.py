@@ -0,0 +1,105 @@
+"""Test for binary."""
+
+import io
+import pathlib
+
+import pytest
+
+from synthetic_home import binary, inventory, synthetic_home, variations
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+TEST_FIXTURES = pathlib.Path("tests/fixtures")
+
+
+@pytest.mark.parametrize(
+    ("fixture_filename"),
+    list(TEST_FIXTURES.glob("*.yaml")),
+    ids=[str(filename) for filename in TEST_FIXTURES.glob("*.yaml")],
+)
+def test_inventory_yaml_round_trip(fixture_filename: pathlib.Path) -> None:
+    """Test converting a yaml inventory to the binary format and back."""
+    inv = inventory.decode_inventory(fixture_filename.read_text())
+    result = binary.decode_inventory(binary.encode_inventory(inv))
+    assert result == inv
+    assert result.yaml() == inv.yaml()
+
+
+@pytest.mark.parametrize(
+    ("home_filename"),
+    list(TEST_HOMES.glob("*.yaml")),
+    ids=[str(filename) for filename in TEST_HOMES.glob("*.yaml")],
+)
+def test_home_round_trip(home_filename: pathlib.Path) -> None:
+    """Test a compiled home in the binary format builds the same inventory."""
+    home = synthetic_home.load_synthetic_home(home_filename)
+    result = binary.decode_home(binary.encode_home(home))
+    assert result.name == home.name
+    assert result.devices == home.devices
+    assert result.services == home.services
+    assert (
+        synthetic_home.build_inventory(result).yaml()
+        == synthetic_home.build_inventory(home).yaml()
+    )
+
+
+def test_home_round_trip_variations() -> None:
+    """Test devices of a decoded home keep the device states of the registry."""
+    home = synthetic_home.load_synthetic_home(TEST_HOMES / "home1.yaml")
+    result = binary.decode_home(binary.encode_home(home), home.device_type_registry)
+    expected = variations.StateVariations(home)
+    assert expected.axes
+    state_variations = variations.StateVariations(result)
+    assert state_variations.axes == expected.axes
+    assert state_variations.base == expected.base
+
+
+def test_built_inventory_round_trip() -> None:
+    """Test state values keep their types in the binary format."""
+    home = synthetic_home.load_synthetic_home(TEST_HOMES / "home1.yaml")
+    inv = synthetic_home.build_inventory(home)
+    result = binary.decode_inventory(binary.encode_inventory(inv))
+    assert result == inv
+    assert result.yaml() == inv.yaml()
+
+
+def test_stream() -> None:
+    """Test decoding a stream of documents."""
+    home = synthetic_home.load_synthetic_home(TEST_HOMES / "home1.yaml")
+    inv = synthetic_home.build_inventory(home)
+    stream = io.BytesIO()
+    binary.write_inventory(inv, stream)
+    stream.write(binary.encode_home(home))
+    binary.write_inventory(inventory.Inventory(), stream)
+    stream.seek(0)
+    documents = list(binary.decode_stream(stream))
+    assert len(documents) == 3
+    assert documents[0] == inv
+    assert isinstance(documents[1], synthetic_home.SyntheticHome)
+    assert documents[1].devices == home.devices
+    assert documents[2] == inventory.Inventory()
+
+
+def test_invalid_documents() -> None:
+    """Test errors decoding invalid binary documents."""
+    content = binary.encode_inventory(inventory.Inventory())
+    with pytest.raises(SyntheticHomeError, match="Expected a home document"):
+        binary.decode_home(content)
+    with pytest.raises(SyntheticHomeError, match="not a synthetic home"):
+        binary.decode_inventory(b"\x93\x01\x02\x03")
+    with pytest.raises(SyntheticHomeError, match="Could not decode"):
+        binary.decode_inventory(b"\xc1")
+    with pytest.raises(SyntheticHomeError, match="schema version 99"):
+        binary.decode_inventory(content.replace(b"\x01", b"\x63", 1))
+
+
+def test_save_and_load(tmp_path: pathlib.Path) -> None:
+    """Test saving and loading an inventory file."""
+    home = synthetic_home.load_synthetic_home(TEST_HOMES / "home1.yaml")
+    inv = synthetic_home.build_inventory(home)
+    binary.save_inventory(inv, tmp_path / "home1.msgpack", binary.Format.MSGPACK)
+    assert binary.load_inventory(tmp_path / "home1.msgpack") == inv
+    binary.save_inventory(inv, tmp_path / "home1.yaml")
+    assert (tmp_path / "home1.yaml").read_text() == inv.yaml()
+    with pytest.raises(SyntheticHomeError, match="does not exist"):
+        binary.load_inventory(tmp_path / "missing.msgpack")
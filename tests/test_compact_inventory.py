@@ -0,0 +1,80 @@
+"""Test for compact_inventory."""
+
+import pathlib
+
+import pytest
+
+from synthetic_home import compact_inventory, inventory, synthetic_home
+
+TEST_HOMES = pathlib.Path("tests/homes")
+
+
+@pytest.mark.parametrize(
+    ("home_filename"),
+    list(TEST_HOMES.glob("*.yaml")),
+    ids=[str(filename) for filename in TEST_HOMES.glob("*.yaml")],
+)
+def test_round_trip(home_filename: pathlib.Path) -> None:
+    """Test converting an inventory to a compact inventory and back."""
+    inv = synthetic_home.build_inventory(
+        synthetic_home.load_synthetic_home(home_filename)
+    )
+    compact = compact_inventory.CompactInventory.from_inventory(inv)
+    assert compact.to_inventory() == inv
+    assert compact.to_inventory().yaml() == inv.yaml()
+    assert compact.device_dict() == inv.device_dict()
+    assert compact.area_dict() == inv.area_dict()
+    assert compact.floors == inv.floors
+
+
+def test_shared_values() -> None:
+    """Test identical values are stored once without losing their types."""
+    inv = inventory.Inventory(
+        language="en",
+        areas=[
+            inventory.Area(name="Kitchen", floor="First"),
+            inventory.Area(name="Bedroom", floor="Second"),
+            inventory.Area(name="Attic"),
+        ],
+        devices=[
+            inventory.Device(name="Light", area="kitchen"),
+            inventory.Device(name="Fan", area="bedroom"),
+        ],
+        entities=[
+            inventory.Entity(
+                id="light.light",
+                device="light",
+                area="kitchen",
+                state="on",
+                attributes={"brightness": 1, "color_mode": "brightness"},
+            ),
+            inventory.Entity(
+                id="switch.light",
+                device="light",
+                state=True,  # type: ignore[arg-type]
+                attributes={"brightness": True, "color_mode": "brightness"},
+            ),
+            inventory.Entity(
+                id="fan.fan",
+                device="fan",
+                state=1,  # type: ignore[arg-type]
+                attributes={"brightness": 1, "color_mode": "brightness"},
+            ),
+            inventory.Entity(id="sensor.outside"),
+        ],
+    )
+    compact = compact_inventory.CompactInventory.from_inventory(inv)
+    result = compact.to_inventory()
+    assert result == inv
+    assert [type(entity.state) for entity in result.entities] == [
+        str,
+        bool,
+        int,
+        type(None),
+    ]
+    assert result.entities[0].attributes is result.entities[2].attributes
+    assert result.entities[0].attributes is not result.entities[1].attributes
+    assert result.entities[0].area is result.devices[0].area
+    assert compact.floors == {"First", "Second"}
+    assert list(compact.area_dict()) == ["kitchen", "bedroom", "attic"]
+    assert list(compact.device_dict()) == ["light", "fan"]
@@ -1,6 +1,15 @@
 """Test for device_types."""
 
+import os
+import pathlib
+import shutil
+from collections.abc import Mapping
+from unittest.mock import patch
+
+import pytest
+
 from synthetic_home import device_types
+from synthetic_home.exceptions import SyntheticHomeError
 
 
 def test_load_device_type_registry() -> None:
@@ -11,7 +20,7 @@ def test_load_device_type_registry() -> None:
         assert name
         assert device_type.device_type
         assert device_type.desc
-        assert isinstance(device_type.device_states_dict, dict)
+        assert isinstance(device_type.device_states_dict, Mapping)
         assert device_type.entities, "Device must have at least one entity"
         for domain, entity_entries in device_type.entities.items():
             assert domain
@@ -57,3 +66,284 @@ def test_camera_device() -> None:
             {"device_class": "binary_sensor.BinarySensorDeviceClass.SOUND"},
         ),
     ]
+
+
+def test_registry_snapshot(tmp_path: pathlib.Path) -> None:
+    """Test the registry snapshot is written and reused."""
+
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    cache_dir = tmp_path / "cache"
+
+    reg = device_types.load_registry_snapshot(registry_dir, cache_dir)
+    snapshots = list(cache_dir.glob("registry-*.pickle"))
+    assert len(snapshots) == 1
+    assert reg == device_types.load_device_type_registry()
+
+    # Loading again reads from the snapshot without parsing yaml
+    with patch(
+        "synthetic_home.device_types._read_registry", side_effect=AssertionError
+    ):
+        cached_reg = device_types.load_registry_snapshot(registry_dir, cache_dir)
+    assert cached_reg == reg
+
+    # Editing a device type invalidates the snapshot
+    light_file = registry_dir / "light.yaml"
+    light_file.write_text(
+        light_file.read_text().replace(
+            "A generic light that can be turned on/off.", "An updated light."
+        )
+    )
+    updated_reg = device_types.load_registry_snapshot(registry_dir, cache_dir)
+    assert updated_reg.device_types["light"].desc == "An updated light."
+    new_snapshots = list(cache_dir.glob("registry-*.pickle"))
+    assert len(new_snapshots) == 1
+    assert new_snapshots != snapshots
+
+
+def test_registry_snapshot_corrupt(tmp_path: pathlib.Path) -> None:
+    """Test that an unreadable snapshot is rebuilt from yaml."""
+
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    cache_dir = tmp_path / "cache"
+    cache_dir.mkdir()
+    device_types.load_registry_snapshot(registry_dir, cache_dir)
+    (snapshot_file,) = cache_dir.glob("registry-*.pickle")
+    snapshot_file.write_bytes(b"garbage")
+
+    reg = device_types.load_registry_snapshot(registry_dir, cache_dir)
+    assert reg == device_types.load_device_type_registry()
+    assert device_types.load_registry_snapshot(registry_dir, cache_dir) == reg
+
+
+def test_registry_snapshot_search_paths(tmp_path: pathlib.Path) -> None:
+    """Test snapshots of several registry directories do not replace each other."""
+
+    custom_dir = tmp_path / "custom"
+    custom_dir.mkdir()
+    light = (device_types.DEVICE_TYPES_RESOURCE_PATH / "light.yaml").read_text()
+    (custom_dir / "light.yaml").write_text(
+        light.replace("A generic light that can be turned on/off.", "A custom light.")
+    )
+    cache_dir = tmp_path / "cache"
+    paths = [custom_dir, device_types.DEVICE_TYPES_RESOURCE_PATH]
+
+    reg = device_types.load_registry_snapshot(paths, cache_dir)
+    assert reg.device_types["light"].desc == "A custom light."
+    assert set(reg.device_types) == set(
+        device_types.load_device_type_registry().device_types
+    )
+    assert reg == device_types.load_lazy_registry(paths)
+    packaged_reg = device_types.load_registry_snapshot(
+        device_types.DEVICE_TYPES_RESOURCE_PATH, cache_dir
+    )
+    assert len(list(cache_dir.glob("registry-*.pickle"))) == 2
+
+    # Each registry is read from its own snapshot
+    with patch(
+        "synthetic_home.device_types._read_registry", side_effect=AssertionError
+    ):
+        assert device_types.load_registry_snapshot(paths, cache_dir) == reg
+        assert (
+            device_types.load_registry_snapshot(
+                device_types.DEVICE_TYPES_RESOURCE_PATH, cache_dir
+            )
+            == packaged_reg
+        )
+
+
+def test_snapshot_cache_dir(monkeypatch: pytest.MonkeyPatch) -> None:
+    """Test overriding and disabling the snapshot directory."""
+
+    monkeypatch.setenv(device_types.CACHE_DIR_ENV, "/tmp/example")
+    assert device_types.snapshot_cache_dir() == pathlib.Path("/tmp/example")
+    monkeypatch.setenv(device_types.CACHE_DIR_ENV, "")
+    assert device_types.snapshot_cache_dir() is None
+
+
+def test_device_type_indexes() -> None:
+    """Test the precomputed device type indexes are shared and read-only."""
+
+    reg = device_types.load_device_type_registry()
+    camera = reg.device_types["camera"]
+    assert camera.device_states_dict["idle"] is camera.device_states[0]
+    assert camera.entity_dict["binary_sensor.motion"].key == "motion"
+    with pytest.raises(TypeError):
+        camera.device_states_dict["other"] = camera.device_states[0]  # type: ignore[index]
+
+    device_state = camera.device_states_dict["motion-detected"]
+    assert device_state.entity_states_dict == {
+        state.domain_key: state for state in device_state.entity_states
+    }
+
+
+def test_merge_entity_state_attributes() -> None:
+    """Test merging entity states from a list or an index."""
+
+    entry = device_types.EntityEntry(key="motion", attributes={"device_class": "x"})
+    device_state = device_types.DeviceState(
+        name="motion",
+        entity_states=[
+            device_types.EntityState(domain="binary_sensor", key="motion", state=True),
+            device_types.EntityState(domain="sensor", key="motion", state="1"),
+        ],
+    )
+    expected = device_types.EntityEntry(
+        key="motion", attributes={"device_class": "x", "state": True}
+    )
+    assert (
+        device_types.merge_entity_state_attributes(
+            "binary_sensor", entry, device_state.entity_states
+        )
+        == expected
+    )
+    assert (
+        device_types.merge_entity_state_attributes(
+            "binary_sensor", entry, device_state.entity_states_dict
+        )
+        == expected
+    )
+    assert (
+        device_types.merge_entity_state_attributes(
+            "switch", entry, device_state.entity_states_dict
+        )
+        is entry
+    )
+
+
+def test_lazy_registry(tmp_path: pathlib.Path) -> None:
+    """Test device types are only parsed when first used."""
+
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    (registry_dir / "README.md").write_text("Not a device type")
+    (registry_dir / "broken.yaml").write_text(
+        "device_type: not-broken\ndesc: A device\ndevice_states: {}\n"
+    )
+
+    reg = device_types.load_lazy_registry(registry_dir)
+    with patch(
+        "synthetic_home.device_types._read_device_type",
+        wraps=device_types._read_device_type,
+    ) as mock_read:
+        assert "light" in reg.device_types
+        assert "broken" in reg.device_types
+        assert "README" not in reg.device_types
+        assert len(reg.device_types) == len(list(registry_dir.glob("*.yaml")))
+        assert not mock_read.called
+
+        light = reg.device_types["light"]
+        assert reg.device_types["light"] is light
+        assert mock_read.call_count == 1
+
+    with pytest.raises(KeyError):
+        reg.device_types["unknown"]
+
+    # Errors are raised when the invalid device type is used or validated
+    with pytest.raises(SyntheticHomeError, match="does not match"):
+        reg.device_types["broken"]
+    with pytest.raises(SyntheticHomeError, match="does not match"):
+        reg.validate_all()
+
+    (registry_dir / "broken.yaml").unlink()
+    reg = device_types.load_lazy_registry(registry_dir)
+    reg.validate_all()
+    assert reg == device_types.load_registry_snapshot(registry_dir)
+
+
+def test_registry_search_paths(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test device types in earlier directories override later directories."""
+
+    custom_dir = tmp_path / "custom"
+    custom_dir.mkdir()
+    light = (device_types.DEVICE_TYPES_RESOURCE_PATH / "light.yaml").read_text()
+    (custom_dir / "light.yaml").write_text(light.replace("desc:", "desc: Custom", 1))
+    (custom_dir / "custom-light.yaml").write_text(
+        light.replace("device_type: light", "device_type: custom-light")
+    )
+    monkeypatch.setenv(
+        device_types.REGISTRY_PATH_ENV, f"{custom_dir}{os.pathsep}{tmp_path / 'none'}"
+    )
+    assert device_types.registry_search_paths() == [
+        custom_dir,
+        tmp_path / "none",
+        device_types.DEVICE_TYPES_RESOURCE_PATH,
+    ]
+    with pytest.raises(SyntheticHomeError, match="does not exist"):
+        device_types.load_lazy_registry(device_types.registry_search_paths())
+
+    monkeypatch.setenv(device_types.REGISTRY_PATH_ENV, str(custom_dir))
+    reg = device_types.load_lazy_registry(device_types.registry_search_paths())
+    assert reg.device_types["light"].desc.startswith("Custom")
+    assert reg.device_types["custom-light"].device_type == "custom-light"
+    assert "switch" in reg.device_types
+    assert (
+        len(reg.device_types) == len(device_types.load_lazy_registry().device_types) + 1
+    )
+
+
+def test_registry_index_cache(tmp_path: pathlib.Path) -> None:
+    """Test parsed device types are cached until their file changes."""
+
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    cache_dir = tmp_path / "cache"
+
+    reg = device_types.load_lazy_registry([registry_dir], cache_dir)
+    reg.device_types["light"]
+    reg.device_types["switch"]
+    assert len(list(cache_dir.glob("index-*"))) == 1
+    assert len(list(cache_dir.glob("index-*/*.type.pickle"))) == 2
+
+    with patch(
+        "synthetic_home.device_types._read_device_type",
+        wraps=device_types._read_device_type,
+    ) as mock_read:
+        reg = device_types.load_lazy_registry([registry_dir], cache_dir)
+        assert reg.device_types["light"].device_type == "light"
+        assert not mock_read.called
+
+        # An edited file is parsed again
+        light_file = registry_dir / "light.yaml"
+        light_file.write_text(light_file.read_text().replace("desc:", "desc: New", 1))
+        reg = device_types.load_lazy_registry([registry_dir], cache_dir)
+        assert reg.device_types["light"].desc.startswith("New")
+        assert mock_read.call_count == 1
+
+    # Added and removed files are picked up
+    shutil.copy(light_file, registry_dir / "other.yaml")
+    (registry_dir / "switch.yaml").unlink()
+    reg = device_types.load_lazy_registry([registry_dir], cache_dir)
+    assert "other" in reg.device_types
+    assert "switch" not in reg.device_types
+    with pytest.raises(SyntheticHomeError, match="does not match"):
+        reg.device_types["other"]
+    assert not list(cache_dir.glob("index-*/switch.type.pickle"))
+
+    # Corrupt index files are ignored
+    for index_file in cache_dir.glob("index-*/*.pickle"):
+        index_file.write_bytes(b"invalid")
+    reg = device_types.load_lazy_registry([registry_dir], cache_dir)
+    assert reg.device_types["light"].desc.startswith("New")
+
+
+def test_registry_index_writes(tmp_path: pathlib.Path) -> None:
+    """Test each parsed device type is written to the cache once."""
+    cache_dir = tmp_path / "cache"
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    with patch(
+        "synthetic_home.device_types._write_pickle",
+        wraps=device_types._write_pickle,
+    ) as mock_write:
+        reg = device_types.load_lazy_registry([registry_dir], cache_dir)
+        reg.validate_all()
+        # One listing plus one entry for each device type
+        assert mock_write.call_count == len(reg.device_types) + 1
+
+        mock_write.reset_mock()
+        device_types.load_lazy_registry([registry_dir], cache_dir).validate_all()
+        assert not mock_write.called
@@ -0,0 +1,152 @@
+"""Test for diff."""
+
+import pathlib
+
+import pytest
+
+from synthetic_home import diff, inventory, synthetic_home, variations
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+TEST_FIXTURES = pathlib.Path("tests/fixtures")
+
+
+def test_diff_variations() -> None:
+    """Test patches between state variations of a home."""
+    state_variations = variations.StateVariations(
+        synthetic_home.load_synthetic_home(TEST_HOMES / "home1.yaml")
+    )
+    # Compare inventories as read from files, where entity states are strings
+    base = inventory.decode_inventory(state_variations.base.yaml())
+    for variation in state_variations.variations(variations.Strategy.PAIRWISE):
+        target = inventory.decode_inventory(
+            state_variations.inventory(variation).yaml()
+        )
+        patch = diff.diff_inventory(base, target)
+        assert not patch.areas
+        assert not patch.devices
+        assert len(patch.entities.changed) <= len(variation.entities)
+        assert not patch.entities.added
+        assert not patch.entities.removed
+        assert diff.apply_patch(base, patch).yaml() == target.yaml()
+
+        # Round trip through yaml
+        assert diff.decode_patch(patch.yaml()) == patch
+
+    assert not diff.diff_inventory(base, base)
+    assert diff.diff_inventory(base, base).yaml() == "---\n"
+    assert diff.decode_patch("---\n") == diff.InventoryPatch()
+
+
+def test_diff_records() -> None:
+    """Test patches that add, remove and change records."""
+    base = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    target = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    target.language = "fr"
+    target.areas.append(inventory.Area(name="Attic", floor="Second"))
+    removed = target.devices.pop(0)
+    target.entities = [
+        entity for entity in target.entities if entity.device != removed.id
+    ]
+    target.devices[0].info = None
+    target.entities[0].state = "unavailable"
+    target.entities[0].attributes = None
+
+    patch = diff.diff_inventory(base, target)
+    assert patch.language == "fr"
+    assert patch.areas.added == [{"name": "Attic", "id": "attic", "floor": "Second"}]
+    assert patch.devices.removed == [removed.id]
+    assert patch.devices.changed == {target.devices[0].id: {"info": None}}
+    assert patch.entities.removed
+    assert patch.entities.changed[str(target.entities[0].id)]["state"] == "unavailable"
+
+    result = diff.apply_patch(base, diff.decode_patch(patch.yaml()))
+    assert result.yaml() == target.yaml()
+
+    # Unchanged records are shared with the base inventory
+    assert result.areas[0] is base.areas[0]
+
+    # Removing the language
+    target.language = None
+    patch = diff.diff_inventory(result, target)
+    assert patch.remove_language
+    assert "remove_language: true" in patch.yaml()
+    result = diff.apply_patch(result, diff.decode_patch(patch.yaml()))
+    assert result.language is None
+    assert result.yaml() == target.yaml()
+
+
+def test_diff_attributes() -> None:
+    """Test patches only contain the entity attributes that changed."""
+    base = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    target = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    changed, emptied = [entity for entity in target.entities if entity.attributes][:2]
+    assert changed.attributes is not None
+    assert emptied.attributes is not None
+    removed_key = next(iter(changed.attributes))
+    emptied_keys = list(emptied.attributes)
+    del changed.attributes[removed_key]
+    changed.attributes["color_temp"] = 300
+    emptied.attributes = {}
+
+    patch = diff.diff_inventory(base, target)
+    assert patch.entities.changed == {
+        changed.id: {
+            "attributes": {"color_temp": 300},
+            "removed_attributes": [removed_key],
+        },
+        emptied.id: {"removed_attributes": emptied_keys},
+    }
+    result = diff.apply_patch(base, diff.decode_patch(patch.yaml()))
+    assert result == target
+    assert result.yaml() == target.yaml()
+
+
+def test_invalid_patch() -> None:
+    """Test applying a patch that does not match the inventory."""
+    base = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    with pytest.raises(SyntheticHomeError, match="removes area 'unknown'"):
+        diff.apply_patch(
+            base, diff.InventoryPatch(areas=diff.SectionPatch(removed=["unknown"]))
+        )
+    with pytest.raises(SyntheticHomeError, match="changes entity 'light.unknown'"):
+        diff.apply_patch(
+            base,
+            diff.InventoryPatch(
+                entities=diff.SectionPatch(changed={"light.unknown": {"state": "on"}})
+            ),
+        )
+    device = base.devices[0]
+    with pytest.raises(SyntheticHomeError, match=f"adds device '{device.id}'"):
+        diff.apply_patch(
+            base,
+            diff.InventoryPatch(
+                devices=diff.SectionPatch(added=[device.to_dict(omit_none=True)])
+            ),
+        )
+
+
+def test_duplicate_ids() -> None:
+    """Test inventories with duplicate ids can not be diffed or patched."""
+    base = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    base.devices.append(base.devices[0])
+    with pytest.raises(SyntheticHomeError, match="duplicate device ids"):
+        diff.diff_inventory(base, base)
+    with pytest.raises(SyntheticHomeError, match="duplicate device ids"):
+        diff.apply_patch(base, diff.InventoryPatch())
+
+    with pytest.raises(SyntheticHomeError, match="both changes and removes"):
+        diff.apply_patch(
+            inventory.Inventory(),
+            diff.InventoryPatch(language="fr", remove_language=True),
+        )
+
+
+def test_load_patch(tmp_path: pathlib.Path) -> None:
+    """Test loading patch files."""
+    with pytest.raises(SyntheticHomeError, match="does not exist"):
+        diff.load_patch(tmp_path / "missing.yaml")
+    patch_file = tmp_path / "patch.yaml"
+    patch_file.write_text("entities:\n  changed: [1, 2]\n")
+    with pytest.raises(SyntheticHomeError, match="Could not parse"):
+        diff.load_patch(patch_file)
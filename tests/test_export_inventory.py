@@ -0,0 +1,414 @@
+"""Tests for the synthetic-home `export_inventory` command."""
+
+import argparse
+import asyncio
+import json
+import pathlib
+from collections.abc import AsyncGenerator
+from typing import Any
+
+import aiohttp
+import pytest
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from synthetic_home import binary, inventory
+from synthetic_home.tool import export_inventory
+
+AUTH_TOKEN = "some-token"
+
+RESULTS: dict[str, Any] = {
+    export_inventory.GET_CONFIG: {"unit_system": {"temperature": "°C"}},
+    export_inventory.AREA_REGISTRY_LIST: [
+        {"area_id": "kitchen", "name": "Kitchen", "floor_id": "ground"},
+        {"area_id": "bedroom", "name": "Bedroom", "floor_id": None},
+    ],
+    export_inventory.DEVICE_REGISTRY_LIST: [
+        {
+            "id": "device-1",
+            "name": "Kitchen Light",
+            "area_id": "kitchen",
+            "manufacturer": "Phillips",
+        },
+        {"id": "device-2", "name": "Thermostat", "area_id": "bedroom"},
+        {"id": "device-3", "name": "Unused", "area_id": "bedroom"},
+        {"id": "device-4", "name": "Disabled", "disabled_by": "user"},
+    ],
+    export_inventory.ENTITY_REGISTRY_LIST: [
+        {
+            "entity_id": "light.kitchen_light",
+            "name": None,
+            "device_id": "device-1",
+        },
+        {
+            "entity_id": "climate.thermostat",
+            "name": None,
+            "device_id": "device-2",
+            "area_id": "bedroom",
+        },
+        {
+            "entity_id": "sensor.diagnostic",
+            "name": None,
+            "entity_category": "diagnostic",
+        },
+        {"entity_id": "automation.unsupported", "name": None},
+    ],
+    export_inventory.GET_STATES: [
+        {
+            "entity_id": "light.kitchen_light",
+            "state": "on",
+            "attributes": {
+                "friendly_name": "Kitchen Light ",
+                "icon": "mdi:light",
+                "brightness": 255,
+                "effect": None,
+            },
+        },
+        {
+            "entity_id": "climate.thermostat",
+            "state": "heat",
+            "attributes": {"current_temperature": 21.5},
+        },
+        {"entity_id": "automation.unsupported", "state": "on", "attributes": {}},
+        {"entity_id": "sensor.diagnostic", "state": "unknown", "attributes": {}},
+    ],
+}
+
+
+async def websocket_handler(request: web.Request) -> web.WebSocketResponse:
+    """Fake Home Assistant websocket API that replies in reverse order."""
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    await ws.send_json({"type": "auth_required"})
+    auth = await ws.receive_json()
+    assert auth == {"type": "auth", "access_token": AUTH_TOKEN}
+    await ws.send_json({"type": "auth_ok"})
+
+    commands = [await ws.receive_json() for _ in range(len(RESULTS))]
+    for command in reversed(commands):
+        await ws.send_json(
+            {
+                "id": command["id"],
+                "type": "result",
+                "success": True,
+                "result": RESULTS[command["type"]],
+            }
+        )
+    await ws.receive()
+    return ws
+
+
+@pytest.fixture(name="server")
+async def mock_server() -> AsyncGenerator[TestServer]:
+    """Fixture for a fake Home Assistant server."""
+    app = web.Application()
+    app.router.add_get("/api/websocket", websocket_handler)
+    async with TestServer(app) as server:
+        yield server
+
+
+def state_changed(entity_id: str, new_state: dict[str, Any] | None) -> dict[str, Any]:
+    """Return a `state_changed` event for an entity."""
+    return {
+        "event_type": export_inventory.STATE_CHANGED,
+        "time_fired": "2024-05-01T12:00:00+00:00",
+        "data": {"entity_id": entity_id, "old_state": None, "new_state": new_state},
+    }
+
+
+EVENTS = [
+    state_changed(
+        "light.kitchen_light",
+        {
+            "entity_id": "light.kitchen_light",
+            "state": "off",
+            "attributes": {"friendly_name": "Kitchen Light", "brightness": None},
+        },
+    ),
+    state_changed(
+        "automation.unsupported",
+        {"entity_id": "automation.unsupported", "state": "off", "attributes": {}},
+    ),
+    state_changed(
+        "climate.thermostat",
+        {"entity_id": "climate.thermostat", "state": "unavailable", "attributes": {}},
+    ),
+    state_changed(
+        "climate.thermostat",
+        {
+            "entity_id": "climate.thermostat",
+            "state": "cool",
+            "attributes": {"current_temperature": 24},
+        },
+    ),
+]
+
+
+async def follow_websocket_handler(request: web.Request) -> web.WebSocketResponse:
+    """Fake Home Assistant websocket API that sends state changes after the export."""
+    ws = web.WebSocketResponse()
+    await ws.prepare(request)
+    await ws.send_json({"type": "auth_required"})
+    await ws.receive_json()
+    await ws.send_json({"type": "auth_ok"})
+
+    subscribe = await ws.receive_json()
+    assert subscribe["type"] == export_inventory.SUBSCRIBE_EVENTS
+    assert subscribe["event_type"] == export_inventory.STATE_CHANGED
+    await ws.send_json(
+        {"id": subscribe["id"], "type": "result", "success": True, "result": None}
+    )
+    for _ in range(len(RESULTS)):
+        command = await ws.receive_json()
+        await ws.send_json(
+            {
+                "id": command["id"],
+                "type": "result",
+                "success": True,
+                "result": RESULTS[command["type"]],
+            }
+        )
+    for event in EVENTS:
+        await ws.send_json({"id": subscribe["id"], "type": "event", "event": event})
+    await ws.close()
+    return ws
+
+
+@pytest.fixture(name="follow_server")
+async def mock_follow_server() -> AsyncGenerator[TestServer]:
+    """Fixture for a fake Home Assistant server with state changes."""
+    app = web.Application()
+    app.router.add_get("/api/websocket", follow_websocket_handler)
+    async with TestServer(app) as server:
+        yield server
+
+
+EXPECTED_INVENTORY = """---
+areas:
+- name: Kitchen
+  id: kitchen
+  floor: ground
+- name: Bedroom
+  id: bedroom
+devices:
+- name: Kitchen Light
+  id: kitchen_light
+  area: kitchen
+  info:
+    manufacturer: Phillips
+- name: Thermostat
+  id: thermostat
+  area: bedroom
+entities:
+- name: Kitchen Light
+  id: light.kitchen_light
+  device: kitchen_light
+  state: 'on'
+  attributes:
+    brightness: 255
+- id: climate.thermostat
+  area: bedroom
+  device: thermostat
+  state: heat
+  attributes:
+    current_temperature: 21.5
+    unit_of_measurement: "\\xB0C"
+"""
+
+
+async def test_fetch_inventory(server: TestServer) -> None:
+    """Test fetching an inventory with results arriving out of order."""
+    async with (
+        aiohttp.ClientSession() as session,
+        session.ws_connect(server.make_url("/api/websocket")) as ws,
+    ):
+        await export_inventory.auth_login(ws, AUTH_TOKEN)
+        async with export_inventory.WebsocketClient(ws) as client:
+            inv = await export_inventory.fetch_inventory(client)
+
+    assert inv.yaml() == EXPECTED_INVENTORY
+
+
+async def test_run(server: TestServer, capsys: pytest.CaptureFixture[str]) -> None:
+    """Test running the export command."""
+    args = argparse.Namespace(
+        homeassistant_url=str(server.make_url("")).rstrip("/"),
+        auth_token=AUTH_TOKEN,
+        format=binary.Format.YAML,
+        follow=False,
+    )
+    assert await export_inventory.run(args) == 0
+    inv = inventory.decode_inventory(capsys.readouterr().out)
+    assert inv.yaml() == EXPECTED_INVENTORY
+
+
+async def test_run_msgpack(
+    server: TestServer, capsysbinary: pytest.CaptureFixture[bytes]
+) -> None:
+    """Test running the export command with the binary format."""
+    args = argparse.Namespace(
+        homeassistant_url=str(server.make_url("")).rstrip("/"),
+        auth_token=AUTH_TOKEN,
+        format=binary.Format.MSGPACK,
+        follow=False,
+    )
+    assert await export_inventory.run(args) == 0
+    inv = binary.decode_inventory(capsysbinary.readouterr().out)
+    assert inv.yaml() == EXPECTED_INVENTORY
+
+
+async def test_run_follow(
+    follow_server: TestServer,
+    tmp_path: pathlib.Path,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    """Test recording state changes after the export until disconnected."""
+    changes_file = tmp_path / "changes.jsonl"
+    snapshot_dir = tmp_path / "snapshots"
+    args = argparse.Namespace(
+        homeassistant_url=str(follow_server.make_url("")).rstrip("/"),
+        auth_token=AUTH_TOKEN,
+        format=binary.Format.YAML,
+        follow=True,
+        changes=str(changes_file),
+        snapshots=str(snapshot_dir),
+        interval=3600,
+    )
+    assert await export_inventory.run(args) == 0
+    inv = inventory.decode_inventory(capsys.readouterr().out)
+    assert inv.yaml() == EXPECTED_INVENTORY
+
+    changes = [json.loads(line) for line in changes_file.read_text().splitlines()]
+    assert changes == [
+        {
+            "time": "2024-05-01T12:00:00+00:00",
+            "entity_id": "light.kitchen_light",
+            "state": "off",
+            "attributes": None,
+        },
+        {
+            "time": "2024-05-01T12:00:00+00:00",
+            "entity_id": "climate.thermostat",
+            "state": None,
+            "attributes": None,
+        },
+        {
+            "time": "2024-05-01T12:00:00+00:00",
+            "entity_id": "climate.thermostat",
+            "state": "cool",
+            "attributes": {"current_temperature": 24, "unit_of_measurement": "°C"},
+        },
+    ]
+
+    # The initial snapshot and the final snapshot when the connection closed
+    snapshots = sorted(snapshot_dir.iterdir())
+    assert [snapshot.name for snapshot in snapshots] == [
+        "inventory-00000.yaml",
+        "inventory-00001.yaml",
+    ]
+    assert inventory.load_inventory(snapshots[0]).yaml() == EXPECTED_INVENTORY
+    final = inventory.load_inventory(snapshots[1])
+    assert [
+        (entity.id, entity.state, entity.attributes) for entity in final.entities
+    ] == [
+        ("light.kitchen_light", "off", None),
+        (
+            "climate.thermostat",
+            "cool",
+            {"current_temperature": 24, "unit_of_measurement": "°C"},
+        ),
+    ]
+
+
+async def test_follow_periodic_snapshots(tmp_path: pathlib.Path) -> None:
+    """Test that snapshots are only written when the inventory changed."""
+    entities = {
+        "light.kitchen_light": inventory.Entity(id="light.kitchen_light", state="on")
+    }
+    follower = export_inventory.InventoryFollower(
+        inventory.Inventory(entities=list(entities.values())), entities, "°C"
+    )
+    snapshots = export_inventory._SnapshotWriter(tmp_path, binary.Format.YAML)
+    subscription: asyncio.Queue[dict[str, Any] | None] = asyncio.Queue()
+    task = asyncio.create_task(
+        export_inventory.follow_inventory(
+            subscription, follower, snapshots=snapshots, interval=0.01
+        )
+    )
+    subscription.put_nowait(EVENTS[0])
+    while not (tmp_path / "inventory-00000.yaml").exists():
+        await asyncio.sleep(0.01)
+    await asyncio.sleep(0.05)
+    subscription.put_nowait(None)
+    await task
+
+    # No snapshot when nothing changed since the previous snapshot
+    assert [path.name for path in tmp_path.iterdir()] == ["inventory-00000.yaml"]
+    inv = inventory.load_inventory(tmp_path / "inventory-00000.yaml")
+    assert inv.entities[0].state == "off"
+
+
+async def test_run_follow_requires_output() -> None:
+    """Test that following requires a change log or snapshot directory."""
+    args = argparse.Namespace(
+        homeassistant_url="http://localhost",
+        auth_token=AUTH_TOKEN,
+        format=binary.Format.YAML,
+        follow=True,
+        changes=None,
+        snapshots=None,
+        interval=3600,
+    )
+    assert await export_inventory.run(args) == 1
+
+
+@pytest.mark.parametrize(
+    ("text", "expected_members", "expected_items"),
+    [
+        (
+            '{"id": 5, "type": "result", "success": true, "result": [{"a": 1}, [2], 3]}',
+            {"id": 5, "type": "result", "success": True},
+            [{"a": 1}, [2], 3],
+        ),
+        (
+            ' { "id" : 6 , "success" : true , "result" : [ ] } ',
+            {"id": 6, "success": True},
+            [],
+        ),
+        (
+            '{"result": [1, 2], "id": 7, "success": true}',
+            {},
+            [1, 2],
+        ),
+    ],
+)
+def test_parse_envelope(
+    text: str, expected_members: dict[str, Any], expected_items: list[Any]
+) -> None:
+    """Test parsing a message without decoding the result."""
+    members, result_pos = export_inventory.parse_envelope(text)
+    assert members == expected_members
+    assert result_pos is not None
+    assert list(export_inventory.iter_json_array(text, result_pos)) == expected_items
+
+
+def test_parse_envelope_without_result() -> None:
+    """Test parsing a message that has no result."""
+    members, result_pos = export_inventory.parse_envelope('{"type": "auth_ok"}')
+    assert members == {"type": "auth_ok"}
+    assert result_pos is None
+
+
+async def test_stream_result_out_of_order() -> None:
+    """Test handling a streamed result that precedes the message id."""
+
+    class FakeWebsocket:
+        async def send_json(self, data: dict[str, Any]) -> None:
+            assert data == {"id": 1, "type": export_inventory.GET_STATES}
+
+    client = export_inventory.WebsocketClient(FakeWebsocket())  # type: ignore[arg-type]
+    future = await client.send(export_inventory.GET_STATES, stream=True)
+    client._handle_message(
+        '{"result": [{"entity_id": "light.a"}], "id": 1, "success": true}'
+    )
+    assert list(future.result()) == [{"entity_id": "light.a"}]
@@ -0,0 +1,131 @@
+"""Test for incremental."""
+
+import dataclasses
+import pathlib
+from unittest.mock import patch
+
+from synthetic_home import device_types, incremental, synthetic_home
+
+TEST_HOMES = pathlib.Path("tests/homes")
+HOME1 = TEST_HOMES / "home1.yaml"
+
+
+def test_incremental_build() -> None:
+    """Test that only changed devices are rebuilt."""
+
+    builder = incremental.IncrementalInventoryBuilder()
+    result = builder.build(synthetic_home.load_synthetic_home(HOME1))
+    expected = synthetic_home.build_inventory(synthetic_home.load_synthetic_home(HOME1))
+    assert result.inventory == expected
+    assert result.changed
+    assert result.reused == 0
+    assert len(result.rebuilt) == len(expected.devices)
+    entities = {entity.id: entity for entity in result.inventory.entities}
+
+    # Rebuilding the same home reuses every device
+    result = builder.build(synthetic_home.load_synthetic_home(HOME1))
+    assert result.inventory == expected
+    assert not result.changed
+    assert result.rebuilt == []
+    assert result.reused == len(expected.devices)
+
+    # Change the state of a single device
+    home = synthetic_home.load_synthetic_home(HOME1)
+    camera = home.devices["Backyard"][0]
+    registry = device_types.load_device_type_registry()
+    camera_state = registry.device_types["camera"].device_states[1]
+    home.devices["Backyard"][0] = synthetic_home.build_device_state(
+        synthetic_home.Device(
+            name=camera.name,
+            device_type=camera.device_type,
+            device_info=camera.device_info,
+            device_state=camera_state.name,
+        ),
+        registry,
+    )
+    result = builder.build(home)
+    assert result.changed
+    assert result.rebuilt == ["outdoor_camera"]
+    assert result.reused == len(expected.devices) - 1
+    for entity in result.inventory.entities:
+        if entity.device != "outdoor_camera":
+            assert entity is entities[entity.id]
+
+    expected = synthetic_home.build_inventory(home)
+    assert result.inventory.yaml() == expected.yaml()
+
+
+def test_device_id_deduplication() -> None:
+    """Test de-duplicated device ids stay correct when devices change."""
+
+    def make_home(first_area_devices: list[str]) -> synthetic_home.SyntheticHome:
+        return synthetic_home.SyntheticHome(
+            name="Home",
+            devices={
+                "Kitchen": [
+                    synthetic_home.Device(name=name, device_type="light")
+                    for name in first_area_devices
+                ],
+                "Bedroom": [synthetic_home.Device(name="Light", device_type="light")],
+            },
+        )
+
+    builder = incremental.IncrementalInventoryBuilder()
+    result = builder.build(make_home(["Light"]))
+    assert [device.id for device in result.inventory.devices] == [
+        "light",
+        "bedroom_light",
+    ]
+
+    # Renaming the first light changes the id of the second
+    result = builder.build(make_home(["Lamp"]))
+    assert [device.id for device in result.inventory.devices] == ["lamp", "light"]
+    assert sorted(result.rebuilt) == ["lamp", "light"]
+    assert result.removed == ["light"]
+    assert result.inventory == synthetic_home.build_inventory(make_home(["Lamp"]))
+
+    # Removing a device
+    result = builder.build(make_home([]))
+    assert [device.id for device in result.inventory.devices] == ["light"]
+    assert result.rebuilt == []
+    assert result.removed == ["lamp"]
+    assert result.changed
+
+
+def test_incremental_build_config() -> None:
+    """Test unchanged devices of a config are not built again."""
+    registry = device_types.load_device_type_registry()
+    expected = synthetic_home.build_inventory(synthetic_home.load_synthetic_home(HOME1))
+    builder = incremental.IncrementalInventoryBuilder()
+    result = builder.build(synthetic_home.load_synthetic_home_config(HOME1), registry)
+    assert result.inventory == expected
+
+    with patch(
+        "synthetic_home.incremental.build_device_state",
+        wraps=synthetic_home.build_device_state,
+    ) as mock_build:
+        result = builder.build(
+            synthetic_home.load_synthetic_home_config(HOME1), registry
+        )
+        assert not result.changed
+        assert result.reused == len(expected.devices)
+        assert not mock_build.called
+
+        # Changing the device state of one device only builds that device
+        config = synthetic_home.load_synthetic_home_config(HOME1)
+        config.devices["Backyard"][0].device_state = "motion-detected"
+        result = builder.build(config, registry)
+        assert result.rebuilt == ["outdoor_camera"]
+        assert mock_build.call_count == 1
+
+        # A reloaded device type is only rebuilt when it changed
+        camera = registry.device_types["camera"]
+        for camera_type, rebuilt in (
+            (dataclasses.replace(camera), []),
+            (dataclasses.replace(camera, desc="Changed"), ["outdoor_camera"]),
+        ):
+            reloaded = device_types.DeviceTypeRegistry(
+                device_types={**registry.device_types, "camera": camera_type}
+            )
+            result = builder.build(config, reloaded)
+            assert result.rebuilt == rebuilt
@@ -1,6 +1,13 @@
 """Test for inventory."""
 
+import io
+
+import pytest
+import slugify
+import yaml
+
 from synthetic_home import inventory
+from synthetic_home.exceptions import SyntheticHomeError
 
 INVENTORY = """
 ---
@@ -63,3 +70,230 @@ def test_todo_list_entity_attributes() -> None:
             },
         ]
     }
+
+
+def test_write_inventory() -> None:
+    """Test streaming an inventory matches the rendered yaml document."""
+    inv = inventory.decode_inventory(TODO_LIST_INVENTORY)
+    inv.language = "en"
+    inv.areas = inventory.decode_inventory(INVENTORY).areas
+
+    buf = io.StringIO()
+    inventory.write_inventory(inv, buf)
+    assert buf.getvalue() == inv.to_yaml(
+        omit_none=True,
+        encoder=lambda data: yaml.safe_dump(data, sort_keys=False, explicit_start=True),
+    )
+    assert inventory.decode_inventory(buf.getvalue()) == inv
+
+
+def test_multiple_inventories() -> None:
+    """Test writing and reading a multi-document inventory stream."""
+    inventories = [
+        inventory.decode_inventory(INVENTORY),
+        inventory.Inventory(),
+        inventory.decode_inventory(TODO_LIST_INVENTORY),
+    ]
+
+    buf = io.StringIO()
+    inventory.write_inventories(iter(inventories), buf)
+    assert buf.getvalue().count("---\n") == 3
+
+    buf.seek(0)
+    assert list(inventory.decode_inventories(buf)) == inventories
+
+
+INDEXED_INVENTORY = """
+---
+areas:
+- name: Kitchen
+  floor: Ground
+- name: Living Room
+  floor: Ground
+- name: Loft
+  floor: Upstairs
+devices:
+- name: Kitchen Light
+  area: kitchen
+- name: Speaker
+  area: living_room
+entities:
+- id: light.kitchen_light
+  device: kitchen_light
+- id: sensor.kitchen_light_power
+  device: kitchen_light
+- id: light.lamp
+  area: living_room
+- id: light.loft_lamp
+  area: loft
+  device: speaker
+- id: media_player.speaker
+  device: speaker
+- id: weather.home
+"""
+
+
+def test_inventory_index() -> None:
+    """Test lookups using the inventory index."""
+    inv = inventory.decode_inventory(INDEXED_INVENTORY)
+    index = inventory.InventoryIndex(inv)
+
+    def ids(entities: list[inventory.Entity]) -> list[str | None]:
+        return [entity.id for entity in entities]
+
+    assert index.floors == inv.floors
+    assert index.area_dict() == inv.area_dict()
+    assert index.device_dict() == inv.device_dict()
+    assert index.entity("light.lamp") is inv.entities[2]
+    assert index.entity("light.unknown") is None
+    assert index.area("loft") is inv.areas[2]
+    assert index.device("speaker") is inv.devices[1]
+    assert ids(index.area_entities("kitchen")) == [
+        "light.kitchen_light",
+        "sensor.kitchen_light_power",
+    ]
+    assert ids(index.area_entities("kitchen", "light")) == ["light.kitchen_light"]
+    assert ids(index.area_entities("living_room")) == [
+        "light.lamp",
+        "media_player.speaker",
+    ]
+    assert ids(index.area_entities(None)) == ["weather.home"]
+    assert ids(index.device_entities("speaker")) == [
+        "light.loft_lamp",
+        "media_player.speaker",
+    ]
+    assert ids(index.domain_entities("light")) == [
+        "light.kitchen_light",
+        "light.lamp",
+        "light.loft_lamp",
+    ]
+    assert ids(index.floor_entities("Ground", "light")) == [
+        "light.kitchen_light",
+        "light.lamp",
+    ]
+    assert ids(index.floor_entities("Upstairs")) == ["light.loft_lamp"]
+    assert [area.id for area in index.floor_areas("Ground")] == [
+        "kitchen",
+        "living_room",
+    ]
+    assert [device.id for device in index.area_devices("kitchen")] == ["kitchen_light"]
+
+
+def test_inventory_index_updates() -> None:
+    """Test changing the inventory through the index."""
+    inv = inventory.decode_inventory(INDEXED_INVENTORY)
+    index = inventory.InventoryIndex(inv)
+
+    # Moving a device moves the entities without their own area
+    index.add_device(inventory.Device(name="Speaker", area="loft"))
+    assert [entity.id for entity in index.area_entities("loft")] == [
+        "light.loft_lamp",
+        "media_player.speaker",
+    ]
+    assert index.area_entities("living_room") == [index.entity("light.lamp")]
+    assert len(inv.devices) == 2
+
+    removed = index.remove_entity("light.lamp")
+    assert removed.id == "light.lamp"
+    assert removed not in inv.entities
+    assert index.area_entities("living_room") == []
+    with pytest.raises(SyntheticHomeError, match="light.lamp"):
+        index.remove_entity("light.lamp")
+
+    entity = inventory.Entity(id="light.kitchen_light", area="loft", state="on")
+    index.add_entity(entity)
+    assert index.entity("light.kitchen_light") is entity
+    assert inv.entities.count(entity) == 1
+    assert [e.id for e in index.area_entities("kitchen")] == [
+        "sensor.kitchen_light_power"
+    ]
+
+    index.add_area(inventory.Area(name="Loft", floor="Ground"))
+    assert index.floors == {"Ground"}
+    assert len(index.floor_entities("Ground", "light")) == 2
+
+    # The index matches one rebuilt from the inventory
+    rebuilt = inventory.InventoryIndex(inv)
+    for area_id in [*index.area_dict(), None]:
+        assert index.area_entities(area_id) == rebuilt.area_entities(area_id)
+    assert index.domain_entities("light") == rebuilt.domain_entities("light")
+    assert index.floor_entities("Ground") == rebuilt.floor_entities("Ground")
+
+
+def test_inventory_index_removals() -> None:
+    """Test removing areas and devices through the index."""
+    inv = inventory.decode_inventory(INDEXED_INVENTORY)
+    index = inventory.InventoryIndex(inv)
+
+    # Entities of a removed device without their own area are in no area
+    removed = index.remove_device("speaker")
+    assert removed.id == "speaker"
+    assert removed not in inv.devices
+    assert index.device("speaker") is None
+    assert index.area_devices("living_room") == []
+    assert [entity.id for entity in index.area_entities("living_room")] == [
+        "light.lamp"
+    ]
+    assert [entity.id for entity in index.area_entities(None)] == [
+        "weather.home",
+        "media_player.speaker",
+    ]
+    assert [entity.id for entity in index.device_entities("speaker")] == [
+        "light.loft_lamp",
+        "media_player.speaker",
+    ]
+    with pytest.raises(SyntheticHomeError, match="speaker"):
+        index.remove_device("speaker")
+
+    removed_area = index.remove_area("loft")
+    assert removed_area.id == "loft"
+    assert removed_area not in inv.areas
+    assert index.area("loft") is None
+    assert index.floors == {"Ground"}
+    assert index.floor_areas("Upstairs") == []
+    assert index.floor_entities("Upstairs") == []
+    with pytest.raises(SyntheticHomeError, match="loft"):
+        index.remove_area("loft")
+
+    # The index matches one rebuilt from the inventory, in any order
+    rebuilt = inventory.InventoryIndex(inv)
+    assert index.area_dict() == rebuilt.area_dict()
+    assert index.device_dict() == rebuilt.device_dict()
+    assert index.floors == rebuilt.floors
+    for area_id in ["kitchen", "living_room", "loft", None]:
+        assert sorted(
+            str(entity.id) for entity in index.area_entities(area_id)
+        ) == sorted(str(entity.id) for entity in rebuilt.area_entities(area_id))
+        if area_id is not None:
+            assert index.area_devices(area_id) == rebuilt.area_devices(area_id)
+    assert index.device_entities("speaker") == rebuilt.device_entities("speaker")
+    assert index.floor_entities("Ground") == rebuilt.floor_entities("Ground")
+
+
+@pytest.mark.parametrize(
+    "name",
+    [
+        "Living Room",
+        "living_room",
+        "Kitchen -- Ceiling  Light",
+        "  Family Room Lamp (2) ",
+        "Bedroom #1/Closet",
+        "Tom's Office",
+        'The "Den"',
+        "Lights & Fans",
+        "R&amp;D Lab",
+        "Room 1,000",
+        "1,2,3 Sensors",
+        "Café Lamp",
+        "Straße",
+        "Ｆｕｌｌｗｉｄｔｈ",
+        "日本語",
+        "__",
+        "",
+    ],
+)
+def test_slugify_id(name: str) -> None:
+    """Test ids are identical to python-slugify."""
+    assert inventory.slugify_id(name) == slugify.slugify(name, separator="_")
+    # Cached result
+    assert inventory.slugify_id(name) == slugify.slugify(name, separator="_")
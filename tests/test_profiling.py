@@ -0,0 +1,83 @@
+"""Tests for the profiling module."""
+
+import json
+import pathlib
+import pstats
+
+import pytest
+
+from synthetic_home import profiling, synthetic_home
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOME = pathlib.Path("tests/homes/home1.yaml")
+
+
+def test_disabled() -> None:
+    """Test instrumentation does nothing when profiling is not active."""
+    with profiling.stage("stage"):
+        profiling.count("counter")
+
+    with profiling.profile() as prof:
+        pass
+    assert prof.to_dict() == {"stages": {}, "counters": {}}
+
+
+def test_profile_home_build(tmp_path: pathlib.Path) -> None:
+    """Test recording the stages of building a home."""
+    with profiling.profile() as prof:
+        home = synthetic_home.load_synthetic_home(TEST_HOME)
+        inv = synthetic_home.build_inventory(home)
+        inv.yaml()
+
+    devices = sum(len(devices) for _, devices in synthetic_home.home_areas(home))
+    result = prof.to_dict()
+    assert result["stages"].keys() >= {
+        "load_synthetic_home",
+        "yaml_decode",
+        "build_device_state",
+        "build_inventory",
+        "yaml_encode",
+    }
+    assert result["stages"]["build_device_state"]["calls"] == devices
+    assert result["stages"]["load_synthetic_home"]["calls"] == 1
+    assert result["counters"]["devices_built"] == devices
+    assert result["counters"]["slugify_calls"] >= len(inv.entities)
+    assert (
+        result["counters"].get("device_state_cache_hits", 0)
+        + result["counters"].get("device_state_cache_misses", 0)
+    ) > 0
+    assert "build_device_state" in prof.report()
+
+    prof.write_json(tmp_path / "profile.json")
+    assert json.loads((tmp_path / "profile.json").read_text()) == result
+    with pytest.raises(SyntheticHomeError, match="cprofile"):
+        prof.write_pstats(tmp_path / "profile.pstats")
+
+    # Nothing is recorded after the profile ends
+    synthetic_home.load_synthetic_home(TEST_HOME)
+    assert prof.to_dict() == result
+
+
+def test_nested_profile() -> None:
+    """Test a nested profile does not record into the outer profile."""
+    with profiling.profile() as outer:
+        profiling.count("outer")
+        with profiling.profile() as inner:
+            profiling.count("inner")
+        profiling.count("outer")
+
+    assert outer.counters == {"outer": 2}
+    assert inner.counters == {"inner": 1}
+
+
+def test_cprofile(tmp_path: pathlib.Path) -> None:
+    """Test writing a cProfile dump."""
+    with profiling.profile(cprofile=True) as prof:
+        synthetic_home.load_synthetic_home(TEST_HOME)
+
+    prof.write_pstats(tmp_path / "profile.pstats")
+    stats = pstats.Stats(str(tmp_path / "profile.pstats"))
+    assert any(
+        function == "load_synthetic_home"
+        for _, _, function in stats.stats  # type: ignore[attr-defined]
+    )
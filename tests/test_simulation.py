@@ -0,0 +1,149 @@
+"""Test for simulation."""
+
+import pathlib
+
+import pytest
+
+from synthetic_home import binary, simulation, synthetic_home
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+SMART_LOCK_HOME = TEST_HOMES / "smart-lock-example.yaml"
+DEVICE_ID = "front_door_lock"
+
+
+def expected_inventory(device_state: str) -> str:
+    """Build the inventory yaml for the home with the lock in the state."""
+    home = synthetic_home.load_synthetic_home(SMART_LOCK_HOME)
+    device = home.devices["Front door"][0]
+    device.device_state = device_state
+    home = synthetic_home.SyntheticHome(
+        name=home.name,
+        devices={"Front door": [device]},
+        device_type_registry=home.device_type_registry,
+    )
+    return synthetic_home.build_inventory(home).yaml()
+
+
+@pytest.fixture(name="simulator")
+def mock_simulator() -> simulation.Simulator:
+    """Fixture for a simulator of the smart lock home."""
+    return simulation.Simulator(synthetic_home.load_synthetic_home(SMART_LOCK_HOME))
+
+
+def test_set_state(simulator: simulation.Simulator) -> None:
+    """Test moving a device between device states."""
+    assert simulator.device_states == {DEVICE_ID: "locked"}
+    assert simulator.inventory().yaml() == expected_inventory("locked")
+    assert simulator.states["lock.front_door_lock"][0] == "locked"
+
+    changes = simulator.set_state(DEVICE_ID, "unlocked")
+    assert {change.entity_id: change.state for change in changes} == {
+        "lock.front_door_lock": "unlocked",
+        "binary_sensor.front_door_lock": True,
+    }
+    assert simulator.device_states == {DEVICE_ID: "unlocked"}
+    assert simulator.states["lock.front_door_lock"][0] == "unlocked"
+    assert simulator.inventory().yaml() == expected_inventory("unlocked")
+
+    # Setting the same state again does not change anything
+    assert simulator.set_state(DEVICE_ID, "unlocked") == ()
+
+    # Transitions are computed once and reused
+    back = simulator.set_state(DEVICE_ID, "locked")
+    simulator.set_state(DEVICE_ID, "unlocked")
+    assert simulator.set_state(DEVICE_ID, "locked") is back
+    assert simulator.inventory().yaml() == expected_inventory("locked")
+
+
+def test_invalid_events(simulator: simulation.Simulator) -> None:
+    """Test events for unknown devices or device states."""
+    with pytest.raises(SyntheticHomeError, match="not in the home"):
+        simulator.set_state("unknown", "locked")
+    with pytest.raises(SyntheticHomeError, match="no device state 'jammed'"):
+        simulator.set_state(DEVICE_ID, "jammed")
+    assert simulator.device_states == {DEVICE_ID: "locked"}
+
+
+def test_run_script(simulator: simulation.Simulator, tmp_path: pathlib.Path) -> None:
+    """Test replaying a script of timed events."""
+    script_file = tmp_path / "script.yaml"
+    script_file.write_text(
+        "---\n"
+        "events:\n"
+        "- {time: 0, device: front_door_lock, device_state: locked}\n"
+        "- {time: 60, device: front_door_lock, device_state: unlocked}\n"
+        "- {time: 120, device: front_door_lock, device_state: locked}\n"
+        "- {time: 120, device: front_door_lock, device_state: unlocked}\n"
+        "- {time: 180.5, device: front_door_lock, device_state: locked}\n"
+    )
+    steps = list(simulator.run(simulation.load_script(script_file)))
+    assert [step.time for step in steps] == [60, 120, 180.5]
+    assert [
+        [(change.entity_id, change.state) for change in step.changes] for step in steps
+    ] == [
+        [
+            ("lock.front_door_lock", "unlocked"),
+            ("binary_sensor.front_door_lock", True),
+        ],
+        [
+            ("lock.front_door_lock", "locked"),
+            ("binary_sensor.front_door_lock", False),
+            ("lock.front_door_lock", "unlocked"),
+            ("binary_sensor.front_door_lock", True),
+        ],
+        [
+            ("lock.front_door_lock", "locked"),
+            ("binary_sensor.front_door_lock", False),
+        ],
+    ]
+
+    with pytest.raises(SyntheticHomeError, match="before the previous event"):
+        list(
+            simulator.run(
+                [
+                    simulation.Event(time=10, device=DEVICE_ID, device_state="locked"),
+                    simulation.Event(time=5, device=DEVICE_ID, device_state="locked"),
+                ]
+            )
+        )
+
+
+def test_load_script_errors(tmp_path: pathlib.Path) -> None:
+    """Test loading invalid script files."""
+    with pytest.raises(SyntheticHomeError, match="does not exist"):
+        simulation.load_script(tmp_path / "missing.yaml")
+    script_file = tmp_path / "script.yaml"
+    script_file.write_text("events:\n- time: 0\n")
+    with pytest.raises(SyntheticHomeError, match="Could not parse"):
+        simulation.load_script(script_file)
+
+
+@pytest.mark.skipif(not binary.HAS_MSGPACK, reason="msgpack is not installed")
+def test_compiled_home() -> None:
+    """Test simulating a home loaded from the binary format."""
+    home = binary.decode_home(
+        binary.encode_home(synthetic_home.load_synthetic_home(SMART_LOCK_HOME))
+    )
+    simulator = simulation.Simulator(home)
+    simulator.set_state(DEVICE_ID, "unlocked")
+    assert simulator.inventory().yaml() == expected_inventory("unlocked")
+
+
+def test_custom_device_state() -> None:
+    """Test a device starting in a custom device state from the home."""
+    simulator = simulation.Simulator(
+        synthetic_home.load_synthetic_home(TEST_HOMES / "light-dimmable.yaml")
+    )
+    device_id = "family_room"
+    entity_id = "light.family_room"
+    assert simulator.device_states == {device_id: None}
+    assert simulator.states[entity_id][1]["brightness"] == 30
+
+    # The custom state is not the registry "on" state it was merged with
+    changes = simulator.set_state(device_id, "on")
+    assert [change.attributes["brightness"] for change in changes] == [100]
+    simulator.set_state(device_id, "off")
+    changes = simulator.set_state(device_id, "on")
+    assert [change.attributes["brightness"] for change in changes] == [100]
+    assert simulator.device_states == {device_id: "on"}
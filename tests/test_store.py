@@ -0,0 +1,154 @@
+"""Test for store."""
+
+import gc
+import pathlib
+import sqlite3
+import weakref
+from collections.abc import Generator
+
+import pytest
+
+from synthetic_home import inventory, store, synthetic_home, variations
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+TEST_FIXTURES = pathlib.Path("tests/fixtures")
+
+
+def test_store_variations(tmp_path: pathlib.Path) -> None:
+    """Test that variations of a home share most of their objects."""
+    state_variations = variations.StateVariations(
+        synthetic_home.load_synthetic_home(TEST_HOMES / "home1.yaml")
+    )
+    inventories = {
+        f"home1-{index}": state_variations.inventory(variation)
+        for index, variation in enumerate(
+            state_variations.variations(variations.Strategy.PAIRWISE)
+        )
+    }
+    store_file = tmp_path / "inventories.db"
+    with store.InventoryStore(store_file) as inventory_store:
+        inventory_store.put_many(inventories.items())
+        stats = inventory_store.stats()
+
+    assert stats.inventories == len(inventories)
+    assert stats.logical_bytes > stats.stored_bytes
+    assert stats.dedup_ratio > 1
+
+    # Inventories keep entity state types and are unchanged after reopening
+    with store.InventoryStore(store_file) as inventory_store:
+        assert inventory_store.ids() == sorted(inventories)
+        assert len(inventory_store) == len(inventories)
+        for inventory_id, inv in inventories.items():
+            assert inventory_id in inventory_store
+            assert inventory_store.get(inventory_id) == inv
+
+
+def test_put_replaces(tmp_path: pathlib.Path) -> None:
+    """Test storing an inventory with an existing id and no new objects."""
+    inv = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    with store.InventoryStore(tmp_path / "inventories.db") as inventory_store:
+        inventory_store.put("home", inventory.Inventory())
+        inventory_store.put("home", inv)
+        inventory_store.put("copy", inv)
+        assert inventory_store.get("home") == inv
+        assert inventory_store.get("copy") == inv
+        stats = inventory_store.stats()
+        assert stats.inventories == 2
+        assert stats.dedup_ratio > 1.9
+
+
+def test_put_many_mutated(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test storing inventories whose objects are changed in place between them."""
+    monkeypatch.setattr(store, "_FLUSH_SIZE", 2)
+    inv = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    entity = inv.entities[0]
+    assert entity.attributes is not None
+
+    def updates() -> Generator[tuple[str, inventory.Inventory]]:
+        for index in range(3):
+            entity.state = f"state-{index}"
+            entity.attributes["index"] = index
+            yield f"home-{index}", inv
+
+    with store.InventoryStore(tmp_path / "inventories.db") as inventory_store:
+        inventory_store.put_many(updates())
+        for index in range(3):
+            stored = inventory_store.get(f"home-{index}").entities[0]
+            assert stored.state == f"state-{index}"
+            assert stored.attributes == {**entity.attributes, "index": index}
+
+
+def test_put_many_forgets_objects(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test storing identical inventories does not keep every inventory in memory."""
+    monkeypatch.setattr(store, "_MEMO_SIZE", 4)
+    refs: list[weakref.ref[inventory.Entity]] = []
+
+    def copies() -> Generator[tuple[str, inventory.Inventory]]:
+        for index in range(10):
+            inv = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+            refs.append(weakref.ref(inv.entities[0]))
+            yield f"home-{index}", inv
+        gc.collect()
+        assert refs[0]() is None
+
+    with store.InventoryStore(tmp_path / "inventories.db") as inventory_store:
+        inventory_store.put_many(copies())
+        assert len(inventory_store) == 10
+        assert inventory_store.get("home-9") == inventory_store.get("home-0")
+
+
+def test_collect_garbage(tmp_path: pathlib.Path) -> None:
+    """Test removing objects that are no longer used by any inventory."""
+    inv = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    with store.InventoryStore(tmp_path / "inventories.db") as inventory_store:
+        inventory_store.put("home", inv)
+        inventory_store.put("copy", inv)
+        objects = inventory_store.stats().objects
+        assert inventory_store.collect_garbage() == 0
+
+        changed = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+        changed.entities[0].state = "unavailable"
+        inventory_store.put("home", changed)
+        inventory_store.put("copy", changed)
+        assert inventory_store.stats().objects == objects + 2
+        # The previous root and entity are no longer used
+        assert inventory_store.collect_garbage() == 2
+        assert inventory_store.stats().objects == objects
+
+    with store.InventoryStore(tmp_path / "inventories.db") as inventory_store:
+        assert inventory_store.get("home") == changed
+        assert inventory_store.get("copy") == changed
+
+
+def test_lazy_load(tmp_path: pathlib.Path) -> None:
+    """Test that sections of a stored inventory are read on first access."""
+    inv = inventory.load_inventory(TEST_FIXTURES / "home1.yaml")
+    with store.InventoryStore(tmp_path / "inventories.db") as inventory_store:
+        inventory_store.put("home", inv)
+        stored = inventory_store.load("home")
+        assert "entities" not in vars(stored)
+        assert stored.devices == inv.devices
+        assert "entities" not in vars(stored)
+        assert stored.entities == inv.entities
+        assert stored.to_inventory() == inv
+
+
+def test_errors(tmp_path: pathlib.Path) -> None:
+    """Test loading missing inventories and unsupported stores."""
+    store_file = tmp_path / "inventories.db"
+    with (
+        store.InventoryStore(store_file) as inventory_store,
+        pytest.raises(SyntheticHomeError, match="is not in store"),
+    ):
+        inventory_store.get("missing")
+
+    with sqlite3.connect(store_file) as db:
+        db.execute("UPDATE metadata SET value = '0' WHERE key = 'version'")
+    db.close()
+    with pytest.raises(SyntheticHomeError, match="Unsupported store version"):
+        store.InventoryStore(store_file)
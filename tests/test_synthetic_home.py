@@ -6,6 +6,7 @@ import pytest
 from syrupy import SnapshotAssertion
 
 from synthetic_home import device_types, inventory, synthetic_home
+from synthetic_home.exceptions import SyntheticHomeError
 
 TEST_HOMES = pathlib.Path("tests/homes")
 TEST_FIXTURES = pathlib.Path("tests/fixtures")
@@ -72,3 +73,145 @@ def test_device_state_to_entity_state(
                 inv = inventory.Inventory()
                 inv.entities = synthetic_home.build_entities(None, device)
                 assert inv.yaml() == snapshot
+
+
+def test_device_state_cache() -> None:
+    """Test resolved device states are cached by device type and state name."""
+
+    registry = device_types.load_device_type_registry()
+    cache = synthetic_home.device_state_cache
+    cache.cache_clear()
+
+    device = synthetic_home.Device(name="Lock", device_type="smart-lock")
+    default_lock = synthetic_home.build_device_state(device, registry)
+    assert cache.cache_info() == synthetic_home.CacheInfo(
+        hits=0, misses=1, maxsize=synthetic_home.DEVICE_STATE_CACHE_SIZE, currsize=1
+    )
+
+    # The default state is the first state of the device type
+    first_state = registry.device_types["smart-lock"].device_states[0].name
+    named_lock = synthetic_home.build_device_state(
+        synthetic_home.Device(
+            name="Other Lock", device_type="smart-lock", device_state=first_state
+        ),
+        registry,
+    )
+    assert cache.cache_info().hits == 1
+    assert named_lock.entity_entries == default_lock.entity_entries
+    assert named_lock.entity_entries is not default_lock.entity_entries
+    assert (
+        named_lock.entity_entries["lock"][0] is default_lock.entity_entries["lock"][0]
+    )
+
+    # Custom device states are not cached
+    synthetic_home.build_device_state(
+        synthetic_home.Device(
+            name="Custom Lock",
+            device_type="smart-lock",
+            device_state={"lock.lock": {"is_locked": False}},
+        ),
+        registry,
+    )
+    assert cache.cache_info().hits == 1
+    assert cache.cache_info().misses == 1
+
+    cache.cache_clear()
+    assert cache.cache_info().currsize == 0
+
+
+def test_device_state_cache_invalidation() -> None:
+    """Test the cache is bounded and ignores entries from an old registry."""
+
+    registry = device_types.load_device_type_registry()
+    cache = synthetic_home.DeviceStateCache(maxsize=2)
+    device_type = registry.device_types["camera"]
+    for device_state in device_type.device_states:
+        cache.resolve(device_type, device_state)
+    assert cache.cache_info().currsize == 2
+    assert cache.cache_info().misses == len(device_type.device_states)
+
+    # The first state was evicted and is resolved again
+    cache.resolve(device_type, device_type.device_states[0])
+    assert cache.cache_info().hits == 0
+
+    # A reloaded registry has new device type objects
+    reloaded_type = device_types.DeviceType.from_dict(
+        {
+            "device_type": "camera",
+            "desc": "Reloaded camera",
+            "device_states": {"idle": {"camera.camera": {"state": "idle"}}},
+            "entities": {"camera": {"camera": {}}},
+        }
+    )
+    entries = cache.resolve(reloaded_type, reloaded_type.device_states[0])
+    assert entries["camera"][0].attributes == {"state": "idle"}
+    assert cache.cache_info().hits == 0
+    assert cache.cache_info().misses == len(device_type.device_states) + 2
+
+
+def test_apply_device_states() -> None:
+    """Test setting the device state of every device of a type across homes."""
+    homes = [
+        synthetic_home.load_synthetic_home(home_file)
+        for home_file in sorted(TEST_HOMES.glob("*.yaml"))
+    ]
+    device_states = {"light": "on", "hvac": "cooling", "smart-lock": "unlocked"}
+    result = synthetic_home.apply_device_states(homes, device_states)
+    assert len(result) == len(homes)
+
+    for home_file, home, updated in zip(
+        sorted(TEST_HOMES.glob("*.yaml")), homes, result, strict=True
+    ):
+        # The home built with each device in the state has the same inventory
+        expected = synthetic_home.load_synthetic_home(home_file)
+        for devices in [*expected.devices.values(), expected.services]:
+            for i, device in enumerate(devices):
+                if (state := device_states.get(device.device_type or "")) is not None:
+                    devices[i] = synthetic_home.build_device_state(
+                        synthetic_home.Device(
+                            name=device.name,
+                            device_type=device.device_type,
+                            device_info=device.device_info,
+                            device_state=state,
+                        ),
+                        expected.device_type_registry,  # type: ignore[arg-type]
+                    )
+        assert (
+            synthetic_home.build_inventory(updated).yaml()
+            == synthetic_home.build_inventory(expected).yaml()
+        ), home_file
+        # Devices of other types are shared with the original home
+        for devices, updated_devices in zip(
+            home.devices.values(), updated.devices.values(), strict=True
+        ):
+            for device, updated_device in zip(devices, updated_devices, strict=True):
+                if device.device_type not in device_states:
+                    assert updated_device is device
+
+    with pytest.raises(SyntheticHomeError, match="not found"):
+        synthetic_home.apply_device_states(homes, {"unknown": "on"})
+    with pytest.raises(SyntheticHomeError, match="no device state 'jammed'"):
+        synthetic_home.apply_device_states(homes, {"smart-lock": "jammed"})
+
+
+def test_apply_device_states_home_registry(tmp_path: pathlib.Path) -> None:
+    """Test device states are resolved with each home's own registry."""
+    light = (device_types.DEVICE_TYPES_RESOURCE_PATH / "light.yaml").read_text()
+    (tmp_path / "my-light.yaml").write_text(
+        light.replace("device_type: light", "device_type: my-light")
+    )
+    registry = device_types.load_lazy_registry(
+        [tmp_path, device_types.DEVICE_TYPES_RESOURCE_PATH]
+    )
+    home = synthetic_home.SyntheticHome(
+        name="Home",
+        devices={
+            "Kitchen": [synthetic_home.Device(name="Lamp", device_type="my-light")]
+        },
+        device_type_registry=registry,
+    )
+    (updated,) = synthetic_home.apply_device_states([home], {"my-light": "off"})
+    device = updated.devices["Kitchen"][0]
+    assert isinstance(device.device_state, device_types.DeviceState)
+    assert device.device_state.name == "off"
+    assert updated.device_type_registry is registry
@@ -1,14 +1,29 @@
 """Tests for the sythethic-home `create_inventory` command."""
 
 import asyncio
+import io
+import json
 import logging
 import pathlib
 import shlex
+import shutil
 import subprocess
+from collections.abc import Callable
 
 import pytest
 from syrupy.assertion import SnapshotAssertion
 
+from synthetic_home import (
+    archive,
+    binary,
+    device_types,
+    inventory,
+    store,
+    synthetic_home,
+    yaml_util,
+)
+from synthetic_home.tool import create_inventory
+
 _LOGGER = logging.getLogger(__name__)
 
 BIN = "synthetic-home"
@@ -48,3 +63,321 @@ async def test_build(home_filename: pathlib.Path, snapshot: SnapshotAssertion) -
     result = await run([BIN, "create_inventory", str(home_filename)])
     str_result = result.decode("utf-8")
     assert str_result == snapshot
+
+
+async def test_build_batch(tmp_path: pathlib.Path) -> None:
+    """Test building a batch of inventories."""
+    await run(
+        [
+            BIN,
+            "create_inventory",
+            "--batch",
+            str(TEST_HOMES / "light-*.yaml"),
+            "--out",
+            str(tmp_path / "out"),
+            "--jobs",
+            "2",
+        ]
+    )
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == sorted(
+        path.name for path in TEST_HOMES.glob("light-*.yaml")
+    )
+
+
+async def test_build_multiple() -> None:
+    """Test building a multi-document stream of inventories."""
+    home_filenames = sorted(TEST_HOMES.glob("light-*.yaml"))
+    result = await run(
+        [BIN, "create_inventory", *[str(filename) for filename in home_filenames]]
+    )
+    documents = list(inventory.decode_inventories(result.decode("utf-8")))
+    assert len(documents) == len(home_filenames)
+    for document, home_filename in zip(documents, home_filenames):
+        home = synthetic_home.load_synthetic_home(home_filename)
+        assert document == synthetic_home.build_inventory(home)
+
+
+async def wait_for(predicate: Callable[[], bool], timeout: float = 10) -> None:
+    """Wait for the predicate to become true."""
+    async with asyncio.timeout(timeout):
+        while not predicate():
+            await asyncio.sleep(0.01)
+
+
+async def test_watch(tmp_path: pathlib.Path) -> None:
+    """Test rebuilding inventories when a home or device type changes."""
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    homes_dir = tmp_path / "homes"
+    homes_dir.mkdir()
+    light_home = homes_dir / "light.yaml"
+    light_home.write_text((TEST_HOMES / "light-example.yaml").read_text())
+    lock_home = homes_dir / "lock.yaml"
+    lock_home.write_text((TEST_HOMES / "smart-lock-example.yaml").read_text())
+    output_dir = tmp_path / "out"
+
+    watcher = create_inventory.InventoryWatcher(
+        [light_home, lock_home], output_dir, registry_paths=[registry_dir]
+    )
+    task = asyncio.create_task(watcher.watch(interval=0.01, debounce=0.05))
+    light_output = output_dir / "light.yaml"
+    lock_output = output_dir / "lock.yaml"
+    await wait_for(lambda: light_output.exists() and lock_output.exists())
+    assert light_output.read_text().strip() == (
+        (pathlib.Path("tests/fixtures") / "light-example.yaml").read_text().strip()
+    )
+    lock_content = lock_output.read_text()
+    lock_mtime = lock_output.stat().st_mtime_ns
+
+    # Changing the home rewrites only its inventory
+    light_home.write_text(
+        light_home.read_text().replace("- name: Family Room", "- name: Ceiling Light")
+    )
+    await wait_for(lambda: "ceiling_light" in light_output.read_text())
+
+    # Changing a device type rebuilds the homes that use it
+    light_type = registry_dir / "light.yaml"
+    light_type.write_text(
+        light_type.read_text().replace(
+            "color_mode: onoff", "color_mode: onoff\n      brightness: 50"
+        )
+    )
+    await wait_for(lambda: "brightness: 50" in light_output.read_text())
+
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+    assert lock_output.read_text() == lock_content
+    assert lock_output.stat().st_mtime_ns == lock_mtime
+
+
+def test_watch_fixed_device_type(tmp_path: pathlib.Path) -> None:
+    """Test fixing a broken device type rebuilds the homes that failed."""
+    registry_dir = tmp_path / "registry"
+    shutil.copytree(device_types.DEVICE_TYPES_RESOURCE_PATH, registry_dir)
+    light_type = registry_dir / "light.yaml"
+    light = light_type.read_text()
+    light_type.write_text(light.replace("device_type: light", "device_type: broken"))
+    home_file = tmp_path / "home.yaml"
+    home_file.write_text((TEST_HOMES / "light-example.yaml").read_text())
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    watcher = create_inventory.InventoryWatcher(
+        [home_file], output_dir, registry_paths=[registry_dir]
+    )
+    watcher.build(home_file)
+    assert not (output_dir / "home.yaml").exists()
+
+    light_type.write_text(light)
+    watcher.on_change({light_type})
+    assert "light.family_room" in (output_dir / "home.yaml").read_text()
+
+
+def test_watch_registry_search_paths(
+    tmp_path: pathlib.Path, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    """Test the watcher loads device types from the registry search paths."""
+    custom_dir = tmp_path / "custom"
+    custom_dir.mkdir()
+    light = (device_types.DEVICE_TYPES_RESOURCE_PATH / "light.yaml").read_text()
+    custom_file = custom_dir / "my-light.yaml"
+    custom_file.write_text(light.replace("device_type: light", "device_type: my-light"))
+    monkeypatch.setenv(device_types.REGISTRY_PATH_ENV, str(custom_dir))
+    home_file = tmp_path / "home.yaml"
+    home_file.write_text(
+        (TEST_HOMES / "light-example.yaml")
+        .read_text()
+        .replace("device_type: light", "device_type: my-light")
+    )
+    output_dir = tmp_path / "out"
+    output_dir.mkdir()
+
+    watcher = create_inventory.InventoryWatcher([home_file], output_dir)
+    assert custom_file in watcher.watched_files()
+    watcher.build(home_file)
+    assert "light.family_room" in (output_dir / "home.yaml").read_text()
+
+
+async def test_create_variations() -> None:
+    """Test writing device state variations of a home."""
+    home_filename = TEST_HOMES / "home1.yaml"
+    result = await run(
+        [BIN, "create_variations", str(home_filename), "--strategy", "pairwise"]
+    )
+    documents = list(yaml_util.load_all(result.decode("utf-8")))
+    assert len(documents) > 1
+    assert documents[0]["variation"] == 0
+    assert documents[0]["entities"] == []
+    assert all(document["entities"] for document in documents[1:])
+
+    result = await run(
+        [
+            BIN,
+            "create_variations",
+            str(home_filename),
+            "--strategy",
+            "sample",
+            "--samples",
+            "3",
+            "--format",
+            "full",
+        ]
+    )
+    inventories = list(inventory.decode_inventories(result.decode("utf-8")))
+    assert len(inventories) == 3
+    home = synthetic_home.load_synthetic_home(home_filename)
+    expected = synthetic_home.build_inventory(home)
+    for inv in inventories:
+        assert inv.devices == expected.devices
+
+
+async def test_build_msgpack(tmp_path: pathlib.Path) -> None:
+    """Test building inventories in the binary format."""
+    home_filenames = sorted(TEST_HOMES.glob("light-*.yaml"))
+    result = await run(
+        [
+            BIN,
+            "create_inventory",
+            "--format",
+            "msgpack",
+            *[str(filename) for filename in home_filenames],
+        ]
+    )
+    documents = list(binary.decode_stream(io.BytesIO(result)))
+    assert len(documents) == len(home_filenames)
+    for document, home_filename in zip(documents, home_filenames):
+        home = synthetic_home.load_synthetic_home(home_filename)
+        assert document == synthetic_home.build_inventory(home)
+
+    await run(
+        [
+            BIN,
+            "create_inventory",
+            "--batch",
+            str(TEST_HOMES / "light-*.yaml"),
+            "--out",
+            str(tmp_path / "out"),
+            "--format",
+            "msgpack",
+        ]
+    )
+    assert sorted(path.name for path in (tmp_path / "out").iterdir()) == sorted(
+        f"{path.stem}.msgpack" for path in home_filenames
+    )
+
+
+async def test_list_device_types() -> None:
+    """Test listing a single device type."""
+    result = await run([BIN, "list_device_types", "--device_type", "light"])
+    data = yaml_util.load(result.decode("utf-8"))
+    assert list(data) == ["light"]
+    assert data["light"]["device_type"] == "light"
+
+
+async def test_list_all_device_types(tmp_path: pathlib.Path) -> None:
+    """Test listing every device type from the registry snapshot."""
+    result = await run([BIN, "list_device_types"])
+    data = yaml_util.load(result.decode("utf-8"))
+    assert set(data) == set(device_types.load_device_type_registry().device_types)
+    assert len(list((tmp_path / "cache").glob("registry-*.pickle"))) == 1
+
+
+async def test_profile(tmp_path: pathlib.Path) -> None:
+    """Test writing a profile of an action."""
+    profile_file = tmp_path / "profile.json"
+    await run(
+        [
+            BIN,
+            "--profile",
+            str(profile_file),
+            "create_inventory",
+            str(TEST_HOMES / "home1.yaml"),
+        ]
+    )
+    result = json.loads(profile_file.read_text())
+    assert "build_inventory" in result["stages"]
+    assert result["counters"]["devices_built"] > 0
+
+    pstats_file = tmp_path / "profile.pstats"
+    await run(
+        [
+            BIN,
+            "--profile",
+            str(pstats_file),
+            "--profile-format",
+            "pstats",
+            "create_inventory",
+            str(TEST_HOMES / "home1.yaml"),
+        ]
+    )
+    assert pstats_file.stat().st_size > 0
+
+
+async def test_diff_and_patch_inventory(tmp_path: pathlib.Path) -> None:
+    """Test writing a patch between inventories and applying it."""
+    base = inventory.load_inventory(pathlib.Path("tests/fixtures/home1.yaml"))
+    base_file = tmp_path / "base.yaml"
+    base_file.write_text(base.yaml())
+    target = inventory.decode_inventory(base.yaml())
+    target.entities[0].state = "unavailable"
+    target.entities.pop()
+    target_file = tmp_path / "target.yaml"
+    target_file.write_text(target.yaml())
+
+    result = await run([BIN, "diff_inventory", str(base_file), str(target_file)])
+    patch = yaml_util.load(result.decode("utf-8"))
+    assert list(patch) == ["entities"]
+    assert patch["entities"]["removed"] == [base.entities[-1].id]
+    patch_file = tmp_path / "patch.yaml"
+    patch_file.write_bytes(result)
+
+    result = await run([BIN, "patch_inventory", str(base_file), str(patch_file)])
+    assert result.decode("utf-8") == target.yaml()
+
+
+async def test_build_store(tmp_path: pathlib.Path) -> None:
+    """Test adding inventories to a store."""
+    store_file = tmp_path / "inventories.db"
+    await run(
+        [
+            BIN,
+            "create_inventory",
+            "tests/homes/home1.yaml",
+            "tests/homes/fan-example.yaml",
+            "--store",
+            str(store_file),
+        ]
+    )
+    with store.InventoryStore(store_file) as inventory_store:
+        assert inventory_store.ids() == ["fan-example", "home1"]
+        assert inventory_store.get("home1") == synthetic_home.build_inventory(
+            synthetic_home.load_synthetic_home(pathlib.Path("tests/homes/home1.yaml"))
+        )
+
+
+async def test_build_archive(tmp_path: pathlib.Path) -> None:
+    """Test appending inventories to an archive and reading them back."""
+    archive_file = tmp_path / "inventories.archive"
+    for _ in range(2):
+        await run(
+            [
+                BIN,
+                "create_inventory",
+                "tests/homes/home1.yaml",
+                "tests/homes/fan-example.yaml",
+                "--archive",
+                str(archive_file),
+                "--compact",
+            ]
+        )
+    with archive.InventoryArchive(archive_file) as reader:
+        assert reader.ids() == ["home1", "fan-example"]
+        assert reader.load("home1") == synthetic_home.build_inventory(
+            synthetic_home.load_synthetic_home(pathlib.Path("tests/homes/home1.yaml"))
+        )
+
+    result = await run(
+        [BIN, "diff_inventory", f"{archive_file}#home1", f"{archive_file}#home1"]
+    )
+    assert result.decode() == "---\n"
@@ -0,0 +1,132 @@
+"""Test for variations."""
+
+import itertools
+import pathlib
+import sys
+
+import pytest
+
+from synthetic_home import synthetic_home, variations
+from synthetic_home.exceptions import SyntheticHomeError
+
+TEST_HOMES = pathlib.Path("tests/homes")
+HOME1 = TEST_HOMES / "home1.yaml"
+
+
+@pytest.fixture(name="state_variations")
+def mock_state_variations() -> variations.StateVariations:
+    """Fixture for the variations of the test home."""
+    return variations.StateVariations(synthetic_home.load_synthetic_home(HOME1))
+
+
+def expected_inventory(device_states: dict[str, str]) -> str:
+    """Build the inventory yaml for a home with the devices in the states."""
+    home = synthetic_home.load_synthetic_home(HOME1)
+    registry = home.device_type_registry
+    assert registry
+    for devices in home.devices.values():
+        for i, device in enumerate(devices):
+            device_id = device.name.lower().replace(" ", "_")
+            if (state := device_states.get(device_id)) is not None:
+                devices[i] = synthetic_home.build_device_state(
+                    synthetic_home.Device(
+                        name=device.name,
+                        device_type=device.device_type,
+                        device_info=device.device_info,
+                        device_state=state,
+                    ),
+                    registry,
+                )
+    return synthetic_home.build_inventory(home).yaml()
+
+
+def test_product(state_variations: variations.StateVariations) -> None:
+    """Test enumerating every combination of device states."""
+    assert state_variations.axes
+    results = list(state_variations.variations())
+    assert len(results) == state_variations.count
+    assert len({tuple(v.device_states.values()) for v in results}) == len(results)
+
+    # The first variation is the base home
+    assert results[0].entities == []
+    assert state_variations.inventory(results[0]) == state_variations.base
+    base_entities = {entity.id: entity for entity in state_variations.base.entities}
+
+    for variation in itertools.islice(results, 1, None, 7):
+        inv = state_variations.inventory(variation)
+        assert inv.yaml() == expected_inventory(variation.device_states)
+        changed = {entity.id for entity in variation.entities}
+        assert changed
+        for entity in inv.entities:
+            if entity.id not in changed:
+                assert entity is base_entities[entity.id]
+
+
+def test_pairwise(state_variations: variations.StateVariations) -> None:
+    """Test every pair of device states is covered."""
+    results = list(state_variations.variations(variations.Strategy.PAIRWISE))
+    assert len(results) < state_variations.count
+    axes = state_variations.axes
+    covered = {
+        (
+            a.device_id,
+            v.device_states[a.device_id],
+            b.device_id,
+            v.device_states[b.device_id],
+        )
+        for v in results
+        for a, b in itertools.combinations(axes, 2)
+    }
+    assert covered == {
+        (a.device_id, x, b.device_id, y)
+        for a, b in itertools.combinations(axes, 2)
+        for x in a.states
+        for y in b.states
+    }
+
+
+def test_sample(state_variations: variations.StateVariations) -> None:
+    """Test sampling distinct combinations is reproducible."""
+    results = list(
+        state_variations.variations(variations.Strategy.SAMPLE, samples=10, seed=1)
+    )
+    assert len(results) == 10
+    assert len({tuple(v.device_states.values()) for v in results}) == 10
+    again = state_variations.variations(variations.Strategy.SAMPLE, samples=10, seed=1)
+    assert [v.device_states for v in again] == [v.device_states for v in results]
+
+    with pytest.raises(SyntheticHomeError, match="samples"):
+        list(state_variations.variations(variations.Strategy.SAMPLE))
+
+
+def test_sample_large() -> None:
+    """Test sampling a home with more combinations than fit in an index."""
+    home = synthetic_home.SyntheticHome(
+        name="Locks",
+        devices={
+            "Hallway": [
+                synthetic_home.Device(name=f"Lock {i}", device_type="smart-lock")
+                for i in range(70)
+            ]
+        },
+    )
+    state_variations = variations.StateVariations(home)
+    assert state_variations.count > sys.maxsize
+    results = list(
+        state_variations.variations(variations.Strategy.SAMPLE, samples=5, seed=1)
+    )
+    assert len({tuple(v.device_states.values()) for v in results}) == 5
+
+
+def test_device_ids() -> None:
+    """Test limiting the varied devices."""
+    home = synthetic_home.load_synthetic_home(HOME1)
+    state_variations = variations.StateVariations(home, ["outdoor_camera"])
+    assert [axis.device_id for axis in state_variations.axes] == ["outdoor_camera"]
+    results = list(state_variations.variations())
+    assert len(results) == len(state_variations.axes[0].states)
+    for variation in results[1:]:
+        assert {entity.device for entity in variation.entities} == {"outdoor_camera"}
+
+    with pytest.raises(SyntheticHomeError, match="unknown"):
+        variations.StateVariations(home, ["unknown"])
@@ -0,0 +1,69 @@
+"""Test for yaml_util."""
+
+import pathlib
+
+import pytest
+import yaml
+
+from synthetic_home import synthetic_home, yaml_util
+
+TEST_HOMES = pathlib.Path("tests/homes")
+TEST_FIXTURES = pathlib.Path("tests/fixtures")
+
+
+@pytest.fixture(name="pure_python", params=[False, True], ids=["default", "pure"])
+def mock_pure_python(
+    request: pytest.FixtureRequest, monkeypatch: pytest.MonkeyPatch
+) -> bool:
+    """Fixture to run with and without the libyaml C bindings."""
+    if request.param:
+        monkeypatch.setattr(yaml_util, "SafeLoader", yaml.SafeLoader)
+        monkeypatch.setattr(yaml_util, "SafeDumper", yaml.SafeDumper)
+    return bool(request.param)
+
+
+@pytest.mark.parametrize(
+    ("home_filename"),
+    list(TEST_HOMES.glob("*.yaml")),
+    ids=[str(filename) for filename in TEST_HOMES.glob("*.yaml")],
+)
+def test_inventory_output(home_filename: pathlib.Path, pure_python: bool) -> None:
+    """Test the inventory output is identical for either yaml implementation."""
+
+    inventory_content = (TEST_FIXTURES / home_filename.name).read_text().strip()
+    home = synthetic_home.load_synthetic_home(home_filename)
+    generated_yaml = synthetic_home.build_inventory(home).yaml()
+    assert generated_yaml.strip() == inventory_content
+
+
+@pytest.mark.parametrize(
+    "value",
+    [
+        "°F",
+        "A plain string " * 10,
+        "Wrapped \xe9scaped string " * 8,
+        "\xe9" * 120,
+        "tab\tseparated " * 10,
+        'quote " and \\ backslash ' * 6,
+        "",
+        "yes",
+        "1.0",
+        1.5,
+        True,
+        ["a", {"b": "c"}],
+    ],
+)
+def test_dump_matches_pure_python(value: object) -> None:
+    """Test dumping matches the pure python output including line wrapping."""
+
+    data = [{"name": value, "attributes": {"nested": value}}]
+    assert yaml_util.dump(data) == yaml.dump(
+        data, Dumper=yaml.SafeDumper, sort_keys=False
+    )
+    assert yaml_util.load(yaml_util.dump(data)) == data
+
+
+def test_load_all() -> None:
+    """Test loading a multi-document stream."""
+
+    assert list(yaml_util.load_all("---\na: 1\n---\nb: 2\n")) == [{"a": 1}, {"b": 2}]